@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Compare the git status backend with the three commands it replaced
+
+Usage: benchmark_git_status.py [-n RUNS] [REPOSITORY]
+
+Times Git.data_status_subpaths(), which parses a single
+"git status --porcelain=v2" while it runs, against the former
+implementation with two "git ls-files" calls and "git status --porcelain",
+and prints the paths whose status differs.  The only expected differences
+are empty untracked directories, which "git ls-files --directory" listed
+but git status never reports.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from ranger.ext.vcs.git import Git  # NOQA pylint: disable=wrong-import-position
+
+
+class Repository(Git):  # pylint: disable=abstract-method
+    """A Git backend without a directory object"""
+
+    def __init__(self, path):  # pylint: disable=super-init-not-called
+        self.path = self.root = path
+        self.repotype = 'git'
+
+    def legacy_status_subpaths(self):
+        """The former implementation, running three commands"""
+        statuses = {}
+
+        # Ignored directories
+        paths = self._run([
+            'ls-files', '-z', '--others', '--directory', '--ignored', '--exclude-standard'
+        ]).split('\0')[:-1]
+        for path in paths:
+            if path.endswith('/'):
+                statuses[os.path.normpath(path)] = 'ignored'
+
+        # Empty directories
+        paths = self._run(
+            ['ls-files', '-z', '--others', '--directory', '--exclude-standard']).split('\0')[:-1]
+        for path in paths:
+            if path.endswith('/'):
+                statuses[os.path.normpath(path)] = 'none'
+
+        # Paths with status
+        lines = self._run(['status', '--porcelain', '-z', '--ignored']).split('\0')[:-1]
+        skip = False
+        for line in lines:
+            if skip:
+                skip = False
+                continue
+            statuses[os.path.normpath(line[3:])] = self._status_translate(line[:2])
+            if line.startswith('R'):
+                skip = True
+
+        return statuses
+
+
+def best_of(runs, function):
+    best = None
+    for _ in range(runs):
+        start = time.time()
+        result = function()
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('repository', nargs='?', default='.')
+    args = parser.parse_args()
+
+    repo = Repository(os.path.abspath(args.repository))
+    legacy_time, legacy = best_of(args.runs, repo.legacy_status_subpaths)
+    new_time, new = best_of(args.runs, repo.data_status_subpaths)
+
+    print("three commands:    %8.1fms  %d paths" % (legacy_time * 1000, len(legacy)))
+    print("porcelain v2:      %8.1fms  %d paths" % (new_time * 1000, len(new)))
+    differences = sorted(set(legacy.items()) ^ set(new.items()))
+    for path in sorted(set(path for path, _ in differences)):
+        print("  %s: %s -> %s" % (path, legacy.get(path), new.get(path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+"""Benchmark drawing the browser widgets without a terminal
+
+Usage: benchmark_render.py [-n FRAMES] [--size COLSxLINES] [--viewmode MODE]
+                           [--tabs N] [--entries N] [--dirs R]
+                           [--names ascii|cjk|mixed] [--name-width N]
+                           [--linemode NAME] [--vcs] [--tags R]
+                           [--set OPTION=VALUE] [--keep] [SCENARIO ...]
+
+Generates a directory with the given number of entries, whose names have
+about the given display width and consist of ASCII or CJK characters, or
+both.  Then it runs ranger's UI on a fake curses screen and draws FRAMES
+frames for every scenario:
+
+    full    draw everything again, like after ^L
+    idle    draw without any change
+    move    move the cursor down by one entry
+    page    move the cursor down by half a page, which scrolls the columns
+    jump    move the cursor to random entries
+    resize  change the size of the terminal by a few cells
+
+Only UI.redraw() is timed, moving the cursor and loading directories are
+not.  For every scenario, the mean and the maximum time per frame, the
+number of curses calls per frame, the bytes of text given to curses per
+frame and the bytes of the cells that changed on the screen per frame are
+printed.  The last number is roughly what curses sends to the terminal,
+without the escape sequences for moving the cursor and setting attributes.
+
+The fake curses screen cuts text off at the right edge of a window instead
+of wrapping it.  With --vcs, the entries get version control states
+without a repository, so no VCS process is started.  Previews of files are
+turned off, since they would start processes too.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import argparse
+import curses
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+ACS_CHARS = {
+    'ACS_HLINE': '-', 'ACS_VLINE': '|', 'ACS_ULCORNER': '+', 'ACS_URCORNER': '+',
+    'ACS_LLCORNER': '+', 'ACS_LRCORNER': '+', 'ACS_TTEE': '+', 'ACS_BTEE': '+',
+}
+
+
+def install_fake_curses():
+    """Replace the functions of the curses module which need a terminal.
+    This has to happen before ranger.gui is imported."""
+    def nothing(*_):
+        return None
+
+    curses.setupterm = nothing
+    curses.init_pair = nothing
+    curses.color_pair = lambda pair: pair << 8
+    curses.tigetflag = lambda capname: 0
+    curses.tigetnum = lambda capname: 256 if capname == 'colors' else -1
+    curses.tigetstr = nothing
+    for name, char in ACS_CHARS.items():
+        if not hasattr(curses, name):
+            setattr(curses, name, ord(char))
+
+
+install_fake_curses()
+
+# pylint: disable=wrong-import-position
+import ranger  # NOQA
+import ranger.core.shared  # NOQA
+from ranger.container.settings import Settings  # NOQA
+from ranger.container.tags import Tags  # NOQA
+from ranger.core.fm import FM  # NOQA
+from ranger.core.main import load_settings  # NOQA
+from ranger.ext.openstruct import OpenStruct  # NOQA
+from ranger.ext.widestring import uwid  # NOQA
+from ranger.gui.displayable import DisplayableContainer  # NOQA
+from ranger.gui.ui import UI  # NOQA
+# pylint: enable=wrong-import-position
+
+SCENARIOS = ('full', 'idle', 'move', 'page', 'jump', 'resize')
+EXTENSIONS = ('', '.txt', '.py', '.jpg', '.mp3', '.tar.gz', '.pdf', '.sh')
+VCS_STATUSES = (None, None, None, 'changed', 'staged', 'untracked', 'ignored', 'conflict')
+VCS_REMOTE_STATUSES = ('sync', 'ahead', 'behind', 'diverged', 'none')
+BLANK = (' ', 0)
+
+
+class Screen(object):
+    """The cells of a fake terminal and the statistics of the calls that
+    were made to draw them"""
+
+    def __init__(self, hei, wid):
+        self.calls = Counter()
+        self.written = 0
+        self.output = 0
+        self.hei = self.wid = 0
+        self.cells = self.shown = None
+        self.resize(hei, wid)
+        self.window = Window(self, None, 0, 0, hei, wid)
+
+    def resize(self, hei, wid):
+        """Change the size, which makes the terminal draw everything again"""
+        self.hei, self.wid = hei, wid
+        self.cells = [[BLANK] * wid for _ in range(hei)]
+        self.shown = [None] * hei
+
+    def reset_statistics(self):
+        self.calls.clear()
+        self.written = 0
+        self.output = 0
+
+    def refresh(self):
+        """Show the cells that changed since the last refresh"""
+        for y, row in enumerate(self.cells):
+            shown = self.shown[y]
+            if shown == row:
+                continue
+            for x, cell in enumerate(row):
+                if shown is None or shown[x] != cell:
+                    self.output += len(cell[0].encode('utf-8', 'surrogateescape'))
+            self.shown[y] = list(row)
+
+
+def recorded(method):
+    """Count the calls of a method of Window"""
+    name = method.__name__
+
+    def wrapper(self, *args):
+        self.screen.calls[name] += 1
+        return method(self, *args)
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class Window(object):  # pylint: disable=too-many-instance-attributes,too-many-public-methods
+    """A curses window on a Screen, which implements the methods ranger
+    uses.  Windows made with derwin() share the cells of the screen."""
+
+    def __init__(self, screen, parent, y, x, hei, wid):  # pylint: disable=too-many-arguments
+        self.screen = screen
+        self.parent = parent
+        self.y, self.x = y, x
+        self.hei, self.wid = hei, wid
+        self.cursor = (0, 0)
+        self.attr = 0
+        self.scrolling = False
+
+    def _origin(self):
+        if self.parent is None:
+            return self.y, self.x
+        y, x = self.parent._origin()  # pylint: disable=protected-access
+        return y + self.y, x + self.x
+
+    def _visible(self):
+        """Returns the origin and the size of the part of the window which
+        is on the screen"""
+        top, left = self._origin()
+        return (top, left, max(0, min(self.hei, self.screen.hei - top)),
+                max(0, min(self.wid, self.screen.wid - left)))
+
+    def _row(self, y):
+        """Returns the cells of the screen row y of the window, the column
+        where the window starts and the visible width"""
+        top, left, hei, wid = self._visible()
+        if not 0 <= y < hei:
+            raise curses.error("row outside of the screen")
+        return self.screen.cells[top + y], left, wid
+
+    def _move(self, y, x):
+        if not (0 <= y < self.hei and 0 <= x <= self.wid):
+            raise curses.error("move outside of the window")
+        self.cursor = (y, x)
+
+    def _write(self, text, attr, limit=None):
+        if isinstance(text, int):
+            # Without a terminal, the ACS_* constants are ASCII characters
+            text = chr(text & 0xff)
+        elif isinstance(text, bytes):
+            text = text.decode('utf-8', 'replace')
+        if limit is not None and limit >= 0:
+            text = text[:limit]
+        if attr is None:
+            attr = self.attr
+        self.screen.written += len(text.encode('utf-8', 'surrogateescape'))
+        y, x = self.cursor
+        row, left, wid = self._row(y)
+        for char in text:
+            width = uwid(char)
+            if width == 0:
+                if x > 0:
+                    previous = row[left + x - 1]
+                    row[left + x - 1] = (previous[0] + char, previous[1])
+                continue
+            if x + width > wid:
+                break
+            row[left + x] = (char, attr)
+            if width == 2:
+                row[left + x + 1] = ('', attr)
+            x += width
+        self.cursor = (y, x)
+
+    def _fill(self, y, start):
+        try:
+            row, left, wid = self._row(y)
+        except curses.error:
+            return
+        if start < wid:
+            row[left + start:left + wid] = [BLANK] * (wid - start)
+
+    @recorded
+    def addstr(self, *args):
+        if isinstance(args[0], int):
+            self._move(args[0], args[1])
+            args = args[2:]
+        self._write(args[0], args[1] if len(args) > 1 else None)
+
+    @recorded
+    def addnstr(self, *args):
+        if isinstance(args[0], int):
+            self._move(args[0], args[1])
+            args = args[2:]
+        self._write(args[0], args[2] if len(args) > 2 else None, args[1])
+
+    @recorded
+    def addch(self, *args):
+        if len(args) >= 3:
+            self._move(args[0], args[1])
+            args = args[2:]
+        self._write(args[0], args[1] if len(args) > 1 else None)
+
+    @recorded
+    def hline(self, *args):
+        if len(args) == 4:
+            self._move(args[0], args[1])
+            args = args[2:]
+        char, count = args
+        cursor = self.cursor
+        self._write(chr(char & 0xff) * count, None)
+        self.cursor = cursor
+
+    @recorded
+    def vline(self, *args):
+        if len(args) == 4:
+            self._move(args[0], args[1])
+            args = args[2:]
+        char, count = args
+        y, x = self.cursor
+        for line in range(y, min(self.hei, y + count)):
+            self.cursor = (line, x)
+            self._write(char, None)
+        self.cursor = (y, x)
+
+    @recorded
+    def attrset(self, attr):
+        self.attr = attr
+
+    @recorded
+    def chgat(self, *args):
+        y, x = self.cursor
+        count = -1
+        if len(args) == 2:
+            count = args[0]
+        elif len(args) >= 3:
+            y, x = args[0], args[1]
+            if len(args) == 4:
+                count = args[2]
+        row, left, wid = self._row(y)
+        stop = wid if count < 0 else min(wid, x + count)
+        for pos in range(left + x, left + stop):
+            row[pos] = (row[pos][0], args[-1])
+
+    @recorded
+    def clrtoeol(self):
+        y, x = self.cursor
+        self._fill(y, x)
+
+    @recorded
+    def erase(self):
+        for y in range(self.hei):
+            self._fill(y, 0)
+        self.cursor = (0, 0)
+
+    @recorded
+    def scrollok(self, flag):
+        self.scrolling = bool(flag)
+
+    @recorded
+    def scroll(self, lines=1):
+        if not self.scrolling:
+            raise curses.error("scrolling is not enabled")
+        top, left, hei, wid = self._visible()
+        rows = [self.screen.cells[top + y][left:left + wid] for y in range(hei)]
+        blank = [BLANK] * wid
+        if lines > 0:
+            rows = rows[lines:] + [blank] * min(lines, hei)
+        else:
+            rows = [blank] * min(-lines, hei) + rows[:lines]
+        for y, cells in enumerate(rows[:hei]):
+            self.screen.cells[top + y][left:left + wid] = cells
+
+    @recorded
+    def move(self, y, x):
+        self._move(y, x)
+
+    @recorded
+    def getyx(self):
+        return self.cursor
+
+    @recorded
+    def getmaxyx(self):
+        return self.hei, self.wid
+
+    @recorded
+    def getparyx(self):
+        return self.y, self.x
+
+    @recorded
+    def derwin(self, *args):
+        if len(args) == 2:
+            return Window(self.screen, self, args[0], args[1],
+                          self.hei - args[0], self.wid - args[1])
+        hei, wid, y, x = args
+        return Window(self.screen, self, y, x, hei, wid)
+
+    @recorded
+    def mvderwin(self, y, x):
+        top, left = self.parent._origin()  # pylint: disable=protected-access
+        if top + y + self.hei > self.screen.hei or left + x + self.wid > self.screen.wid:
+            raise curses.error("window outside of the screen")
+        self.y, self.x = y, x
+
+    @recorded
+    def resize(self, hei, wid):
+        top, left = self._origin()
+        if self.parent is not None \
+                and (top + hei > self.screen.hei or left + wid > self.screen.wid):
+            raise curses.error("window outside of the screen")
+        self.hei, self.wid = hei, wid
+
+    @recorded
+    def redrawwin(self):
+        top, _ = self._origin()
+        for y in range(top, min(self.screen.hei, top + self.hei)):
+            self.screen.shown[y] = None
+
+    @recorded
+    def refresh(self):
+        self.screen.refresh()
+
+    @recorded
+    def getch(self):  # pylint: disable=no-self-use
+        return -1
+
+    @recorded
+    def touchwin(self):
+        pass
+
+    @recorded
+    def keypad(self, flag):
+        pass
+
+    @recorded
+    def leaveok(self, flag):
+        pass
+
+    @recorded
+    def nodelay(self, flag):
+        pass
+
+
+class HeadlessUI(UI):
+    """A UI which draws on a Screen instead of the terminal"""
+
+    def __init__(self, screen, fm=None):
+        UI.__init__(self, fm=fm)
+        self.screen = screen
+
+    def setup_curses(self):
+        self.win = self.screen.window
+        self.keymaps.use_keymap('browser')
+        DisplayableContainer.__init__(self, None)
+
+    def initialize(self):
+        if not self.is_set_up:
+            self.is_set_up = True
+            self.setup()
+        self.update_size()
+        self.is_on = True
+
+    def suspend(self):
+        self.is_on = False
+
+    def set_load_mode(self, boolean):
+        self.load_mode = bool(boolean)
+
+    def resize_screen(self, hei, wid):
+        self.screen.resize(hei, wid)
+        self.win.resize(hei, wid)
+        self.update_size()
+
+
+def make_name(rng, kind, width):
+    """A random name of about the given display width"""
+    width = max(2, int(width * rng.uniform(0.5, 1.5)))
+    if kind == 'mixed':
+        kind = rng.choice(('ascii', 'cjk'))
+    if kind == 'cjk':
+        return u''.join(u'%c' % rng.randint(0x4e00, 0x9fa5) for _ in range(width // 2))
+    return u''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789_-')
+                    for _ in range(width))
+
+
+def generate(path, args):
+    """Create the entries of the directory at path"""
+    rng = random.Random(0)
+    os.makedirs(path)
+    for i in range(args.entries):
+        name = u'%s%d' % (make_name(rng, args.names, args.name_width), i)
+        if rng.random() < args.dirs:
+            os.makedirs(os.path.join(path, name))
+            for j in range(20):
+                with open(os.path.join(path, name, 'f%d' % j), 'wb'):
+                    pass
+        else:
+            with open(os.path.join(path, name + rng.choice(EXTENSIONS)), 'wb') as fobj:
+                fobj.write(b'x' * rng.randint(0, 100000))
+
+
+def make_fm(screen, path, args):
+    """Returns an initialized FM with a HeadlessUI in the directory path"""
+    ranger.args = OpenStruct(clean=True, debug=True, confdir=None, datadir=None,
+                             cachedir=None, choosedir=None, profile=False)
+    ranger.core.shared.SettingsAware.settings_set(Settings())
+    fm = FM(ui=HeadlessUI(screen), paths=[path])
+    ranger.core.shared.FileManagerAware.fm_set(fm)
+    load_settings(fm, clean=True)
+    fm.settings.preview_files = False
+    fm.settings.preview_images = False
+    fm.settings.viewmode = args.viewmode
+    for option in args.set:
+        fm.execute_console('set ' + option.replace('=', ' ', 1))
+    fm.initialize()
+    # The tags are stored in a directory of their own, since changing the
+    # parent of path would make ranger load it again
+    datadir = os.path.join(os.path.dirname(path), 'data')
+    os.makedirs(datadir)
+    fm.tags = Tags(os.path.join(datadir, 'tagged'))
+    fm.tags.dump()
+    fm.enter_dir(path)
+    for _ in range(args.tabs - 1):
+        fm.tab_new(path=path)
+    fm.tab_open(1)
+    return fm
+
+
+def load(fm, args):
+    """Load the directories which are shown and give their entries the
+    linemode, VCS states and tags"""
+    while fm.loader.has_work():
+        fm.loader.work()
+    rng = random.Random(0)
+    for dirobj in fm.directories.values():
+        if not dirobj.content_loaded or getattr(dirobj, 'benchmark_prepared', False):
+            continue
+        dirobj.benchmark_prepared = True
+        for fsobj in dirobj.files_all or ():
+            fsobj.linemode = args.linemode
+            if args.vcs:
+                fsobj.vcsstatus = rng.choice(VCS_STATUSES)
+                if fsobj.is_directory:
+                    fsobj.vcsremotestatus = rng.choice(VCS_REMOTE_STATUSES)
+        if args.vcs:
+            dirobj.vcs = OpenStruct(track=True, rootvcs=OpenStruct(provisional=False))
+            dirobj.has_vcschild = True
+        if args.tags:
+            fm.tags.add(*[fsobj.realpath for fsobj in dirobj.files_all or ()
+                          if rng.random() < args.tags])
+
+
+def step(fm, scenario, frame, rng):
+    """Change what is shown for the next frame of the scenario"""
+    directory = fm.thisdir
+    if scenario == 'full':
+        fm.ui.browser.request_clear()
+    elif scenario == 'move':
+        if directory.pointer + 1 >= len(directory):
+            fm.move(to=0)
+        else:
+            fm.move(down=1)
+    elif scenario == 'page':
+        if directory.pointer + 1 >= len(directory):
+            fm.move(to=0)
+        else:
+            fm.move(down=0.5, pages=True)
+    elif scenario == 'jump':
+        fm.move(to=rng.randrange(len(directory)))
+    elif scenario == 'resize':
+        hei, wid = fm.ui.termsize
+        change = (frame % 5 + 1) * (1 if frame % 2 else -1)
+        fm.ui.resize_screen(max(5, hei + change), max(20, wid + 2 * change))
+
+
+def run(fm, scenario, args):
+    """Returns a list of (duration, calls, written bytes, output bytes)"""
+    rng = random.Random(0)
+    screen = fm.ui.screen
+    fm.move(to=0)
+    fm.ui.resize_screen(args.lines, args.columns)
+    load(fm, args)
+    fm.ui.redraw()
+    frames = []
+    for frame in range(args.frames):
+        step(fm, scenario, frame, rng)
+        load(fm, args)
+        screen.reset_statistics()
+        start = time.time()
+        fm.ui.redraw()
+        duration = time.time() - start
+        frames.append((duration, sum(screen.calls.values()), screen.written, screen.output))
+    return frames
+
+
+def parse_size(size):
+    columns, _, lines = size.partition('x')
+    return int(columns), int(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help="one of %s, all by default" % ', '.join(SCENARIOS))
+    parser.add_argument('-n', '--frames', type=int, default=200)
+    parser.add_argument('--size', type=parse_size, default=(120, 40))
+    parser.add_argument('--viewmode', choices=UI.ALLOWED_VIEWMODES, default='miller')
+    parser.add_argument('--tabs', type=int, default=1)
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--dirs', type=float, default=0.1,
+                        help="the ratio of entries which are directories")
+    parser.add_argument('--names', choices=('ascii', 'cjk', 'mixed'), default='ascii')
+    parser.add_argument('--name-width', type=int, default=24)
+    parser.add_argument('--linemode', default='filename')
+    parser.add_argument('--vcs', action='store_true')
+    parser.add_argument('--tags', type=float, default=0.0,
+                        help="the ratio of entries which are tagged")
+    parser.add_argument('--set', action='append', default=[], metavar='OPTION=VALUE')
+    parser.add_argument('--keep', action='store_true',
+                        help="don't delete the generated directory")
+    args = parser.parse_args()
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error("unknown scenario: %s" % scenario)
+    args.scenarios = args.scenarios or SCENARIOS
+    args.columns, args.lines = args.size
+
+    tmpdir = tempfile.mkdtemp(prefix='ranger-render-benchmark.')
+    path = os.path.join(tmpdir, 'directory')
+    fm = None
+    try:
+        generate(path, args)
+        screen = Screen(args.lines, args.columns)
+        fm = make_fm(screen, path, args)
+        print("%d entries, %dx%d, %s view" % (
+            args.entries, args.columns, args.lines, args.viewmode))
+        print("%-8s %10s %10s %8s %9s %9s" % (
+            'scenario', 'time', 'max', 'calls', 'written', 'output'))
+        for scenario in args.scenarios:
+            frames = run(fm, scenario, args)
+            count = len(frames) or 1
+            print("%-8s %8.2fms %8.2fms %8d %8dB %8dB" % (
+                scenario,
+                sum(frame[0] for frame in frames) * 1000 / count,
+                max(frame[0] for frame in frames) * 1000 if frames else 0,
+                sum(frame[1] for frame in frames) // count,
+                sum(frame[2] for frame in frames) // count,
+                sum(frame[3] for frame in frames) // count))
+    finally:
+        if fm is not None:
+            fm.destroy()
+        if args.keep:
+            print("Kept %s" % path)
+        else:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""Benchmark the VCS subsystem on a synthetic git repository
+
+Usage: benchmark_vcs.py [-n RUNS] [--files N] [--depth D] [--dirty R]
+                        [--untracked R] [--ignored R] [--submodules N] [--keep]
+
+Generates a local git repository with the given number of files spread
+over a directory tree of the given depth, modifies, adds and ignores the
+given ratios of files and optionally adds submodules.  Then it times the
+steps ranger takes for every repository: creating the VcsRoot and
+init_root(), the first check_outdated() and update_root(), update_tree()
+over all directories, status_subpath() for every path, check_outdated()
+without any changes, and check_outdated() and update_root() after a file
+was modified.  For every step, the best wall time of all runs and the
+number of processes started are printed.
+
+Only git and a POSIX system are needed, nothing is fetched from the
+network.  The repository is deleted afterwards, unless --keep is given.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from io import open
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+# pylint: disable=wrong-import-position
+import ranger  # NOQA
+import ranger.container.settings  # NOQA
+import ranger.core.fm  # NOQA
+import ranger.core.shared  # NOQA
+from ranger.container.file import File  # NOQA
+from ranger.ext.openstruct import OpenStruct  # NOQA
+# pylint: enable=wrong-import-position
+
+GIT = ['git', '-c', 'user.name=ranger', '-c', 'user.email=ranger@localhost',
+       '-c', 'protocol.file.allow=always', '-c', 'init.defaultBranch=main']
+
+
+class Counter(object):  # pylint: disable=too-few-public-methods
+    """Counts the processes started with subprocess.Popen"""
+
+    def __init__(self):
+        self.count = 0
+        self._init = subprocess.Popen.__init__
+        counter = self
+
+        def init(self, *args, **kwargs):
+            counter.count += 1
+            counter._init(self, *args, **kwargs)  # pylint: disable=protected-access
+
+        subprocess.Popen.__init__ = init
+
+
+def git(path, *args):
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        subprocess.check_call(GIT + list(args), cwd=path, stdout=devnull, stderr=devnull)
+
+
+def write(path, content):
+    with open(path, 'w', encoding='utf-8') as fobj:
+        fobj.write(content)
+
+
+def generate(path, args):  # pylint: disable=too-many-locals
+    """Create the repository at path, returns the paths of all directories"""
+    rng = random.Random(0)
+    # The number of subdirectories per directory, so that the leaves are
+    # at the given depth and hold about 20 files each
+    fanout = max(2, int(round((args.files / 20.0) ** (1.0 / max(args.depth, 1)))))
+    directories = ['']
+    level = ['']
+    for _ in range(args.depth):
+        level = [os.path.join(parent, 'd%d' % i) for parent in level for i in range(fanout)]
+        directories.extend(level)
+    for directory in directories:
+        if not os.path.isdir(os.path.join(path, directory)):
+            os.makedirs(os.path.join(path, directory))
+
+    files = [os.path.join(rng.choice(directories), 'f%d.txt' % i) for i in range(args.files)]
+    for name in files:
+        write(os.path.join(path, name), u'%s\n' % name)
+    write(os.path.join(path, '.gitignore'), u'*.ignored\nbuild/\n')
+    git(path, 'init', '-q')
+    git(path, 'add', '-A')
+    git(path, 'commit', '-q', '-m', 'Initial commit')
+
+    for i in range(args.submodules):
+        subpath = os.path.join(os.path.dirname(path), 'sub%d' % i)
+        os.makedirs(subpath)
+        write(os.path.join(subpath, 'file'), u'submodule\n')
+        git(subpath, 'init', '-q')
+        git(subpath, 'add', '-A')
+        git(subpath, 'commit', '-q', '-m', 'Submodule')
+        git(path, 'submodule', 'add', '-q', subpath, 'modules/sub%d' % i)
+    if args.submodules:
+        git(path, 'commit', '-q', '-m', 'Add submodules')
+        directories.append('modules')
+
+    for name in rng.sample(files, int(len(files) * args.dirty)):
+        write(os.path.join(path, name), u'modified\n')
+    for i in range(int(len(files) * args.untracked)):
+        write(os.path.join(path, rng.choice(directories), 'new%d.txt' % i), u'new\n')
+    for i in range(int(len(files) * args.ignored)):
+        write(os.path.join(path, rng.choice(directories), 'file%d.ignored' % i), u'ignored\n')
+    os.makedirs(os.path.join(path, 'build'))
+    write(os.path.join(path, 'build', 'output'), u'ignored\n')
+    return [os.path.join(path, directory) if directory else path for directory in directories]
+
+
+def make_fm(cachedir):
+    """Returns a FM without UI that's aware of version control systems"""
+    ranger.args = OpenStruct(clean=True, debug=False, confdir=None, datadir=None,
+                             cachedir=cachedir)
+    settings = ranger.container.settings.Settings()
+    ranger.core.shared.SettingsAware.settings_set(settings)
+    fm = ranger.core.fm.FM(ui=OpenStruct())
+    ranger.core.shared.FileManagerAware.fm_set(fm)
+    settings.vcs_aware = True
+    return fm
+
+
+def load(fm, directories):
+    """Mark the directories as loaded, without sorting or filtering them"""
+    for path in directories:
+        dirobj = fm.get_directory(path)
+        dirobj.files_all = [
+            fm.get_directory(os.path.join(path, name)) if os.path.isdir(os.path.join(path, name))
+            else File(os.path.join(path, name))
+            for name in sorted(os.listdir(path)) if name != '.git'
+        ]
+        dirobj.content_loaded = True
+
+
+def run(repository, directories, cachedir):
+    """Returns a list of (step, duration, processes)"""
+    counter = Counter()
+    results = []
+    state = {}
+
+    def step(name, function):
+        counter.count = 0
+        start = time.time()
+        function()
+        results.append((name, time.time() - start, counter.count))
+
+    fm = make_fm(cachedir)
+    load(fm, directories)
+
+    def init():
+        state['vcs'] = vcs = fm.get_directory(repository).vcs
+        vcs.init_root()
+
+    def update():
+        vcs = state['vcs']
+        vcs.check_outdated()
+        vcs.update_root()
+
+    def lookups():
+        vcs = state['vcs']
+        for path in directories:
+            for fsobj in fm.get_directory(path).files_all:
+                vcs.status_subpath(fsobj.path, is_directory=fsobj.is_directory)
+
+    def modify():
+        vcs = state['vcs']
+        write(os.path.join(directories[-1], 'benchmark.txt'), u'%f\n' % time.time())
+        if vcs.check_outdated():
+            vcs.update_root()
+
+    step('init_root', init)
+    step('update_root', update)
+    step('update_tree', lambda: state['vcs'].update_tree())
+    step('status_subpath', lookups)
+    step('check_outdated', lambda: state['vcs'].check_outdated())
+    step('modify + update', modify)
+    os.remove(os.path.join(directories[-1], 'benchmark.txt'))
+    subprocess.Popen.__init__ = counter._init  # pylint: disable=protected-access
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--runs', type=int, default=3)
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--dirty', type=float, default=0.01)
+    parser.add_argument('--untracked', type=float, default=0.01)
+    parser.add_argument('--ignored', type=float, default=0.01)
+    parser.add_argument('--submodules', type=int, default=0)
+    parser.add_argument('--keep', action='store_true',
+                        help="don't delete the generated repository")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='ranger-vcs-benchmark.')
+    repository = os.path.join(tmpdir, 'repository')
+    try:
+        start = time.time()
+        directories = generate(repository, args)
+        print("Generated %d files in %d directories in %s (%.1fs)" % (
+            args.files, len(directories), repository, time.time() - start))
+        # Let the timestamps of the generated files settle, so git doesn't
+        # consider them racily clean
+        time.sleep(1)
+
+        best = {}
+        order = []
+        for _ in range(args.runs):
+            cachedir = tempfile.mkdtemp(dir=tmpdir)
+            for name, duration, processes in run(repository, directories, cachedir):
+                if name not in best:
+                    order.append(name)
+                if name not in best or duration < best[name][0]:
+                    best[name] = (duration, processes)
+        print("%-16s %10s %10s" % ('step', 'time', 'processes'))
+        for name in order:
+            duration, processes = best[name]
+            print("%-16s %8.1fms %10d" % (name, duration * 1000, processes))
+    finally:
+        if args.keep:
+            print("Kept %s" % repository)
+        else:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -183,4 +183,7 @@ class Default(ColorScheme):
             elif context.vcsunknown:
                 fg = red
 
+        if context.vcsprovisional and not context.selected:
+            attr |= dim
+
         return fg, bg, attr
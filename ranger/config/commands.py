@@ -777,7 +777,8 @@ class trash(Command):
     """:trash
 
     Tries to move the selection or the files passed in arguments (if any) to
-    the trash, using rifle rules with label "trash".
+    the trash, following the freedesktop.org trash specification, or using
+    the rifle rules with label "trash" if rifle.conf has any for them.
     The arguments use a shell-like escaping.
 
     "Selection" is defined as all the "marked files" (by default, you
@@ -825,14 +826,23 @@ class trash(Command):
             )
         else:
             # no need for a confirmation, just delete
-            self._trash_files_catch_arg_list_error(files)
+            self._trash(files)
 
     def tab(self, tabnum):
         return self._tab_directory_content()
 
     def _question_callback(self, files, answer):
         if answer.lower() == 'y':
+            self._trash(files)
+
+    def _trash(self, files):
+        paths = [f.path for f in files]
+        # COMPAT: rifle used to do the trashing, so rules with label "trash"
+        # in the user's rifle.conf still take precedence
+        if any(label == 'trash' for _, _, label, _ in self.fm.rifle.list_commands(paths)):
             self._trash_files_catch_arg_list_error(files)
+        else:
+            self.fm.move_to_trash(paths)
 
     def _trash_files_catch_arg_list_error(self, files):
         """
@@ -849,6 +859,34 @@ class trash(Command):
                 raise
 
 
+class trash_browse(Command):
+    """:trash_browse
+
+    Enter the files/ directory of the home trash.  Files in there are shown
+    with their original path and deletion date and can be put back with
+    :trash_restore.
+    """
+
+    def execute(self):
+        trash_dir = self.fm.trash.home
+        try:
+            trash_dir.create()
+        except OSError as ex:
+            self.fm.notify("Cannot open the trash: %s" % ex, bad=True)
+            return
+        self.fm.cd(trash_dir.files_path)
+
+
+class trash_restore(Command):
+    """:trash_restore
+
+    Move the selected trashed files back to where they were trashed from.
+    """
+
+    def execute(self):
+        self.fm.restore_from_trash()
+
+
 class jump_non(Command):
     """:jump_non [-FLAGS...]
 
@@ -1216,27 +1254,30 @@ class chmod(Command):
 
 
 class bulkrename(Command):
-    """:bulkrename
+    """:bulkrename [-w]
 
     This command opens a list of selected files in an external editor.
-    After you edit and save the file, it will generate a shell script
-    which does bulk renaming according to the changes you did in the file.
+    After you edit and save the file, the renames are planned so that no
+    file gets overwritten, even if names are swapped.
 
-    This shell script is opened in an editor for you to review.
-    After you close it, it will be executed.
+    The planned renames are opened in an editor for you to review.  After
+    you close it, the files are renamed.  Clear the file to abort.  If any
+    rename fails, all files are renamed back.  With -w, the renamed files
+    are listed in the pager afterwards.
     """
 
     def __init__(self, *args, **kwargs):
         super(bulkrename, self).__init__(*args, **kwargs)
+        # COMPAT: the flags used to be passed to the shell script doing the
+        # renames.  -w waited for a key after its "mv -v" output, so it now
+        # shows the renames in the pager.  Other flags are ignored.
         self.flags, _ = self.parse_flags()
-        if not self.flags:
-            self.flags = "w"
 
     def execute(self):
-        # pylint: disable=too-many-locals,too-many-statements,too-many-branches
+        # pylint: disable=too-many-locals
         import tempfile
         from ranger.container.file import File
-        from ranger.ext.shell_escape import shell_escape as esc
+        from ranger.ext.bulk_rename import plan_renames, apply_renames, RenameError
 
         # Create and edit the file list
         filenames = [f.relative_path for f in self.fm.thistab.get_selection()]
@@ -1253,63 +1294,69 @@ class bulkrename(Command):
         ) as listfile:
             new_filenames = listfile.read().split("\n")
         os.unlink(listpath)
+        if new_filenames and not new_filenames[-1]:
+            new_filenames.pop()
+        if len(new_filenames) != len(filenames):
+            self.fm.notify("The number of lines changed, nothing was renamed!", bad=True)
+            return
         if all(a == b for a, b in zip(filenames, new_filenames)):
             self.fm.notify("No renaming to be done!")
             return
 
-        # Generate script
-        with tempfile.NamedTemporaryFile() as cmdfile:
-            script_lines = []
-            script_lines.append("# This file will be executed when you close"
-                                " the editor.")
-            script_lines.append("# Please double-check everything, clear the"
-                                " file to abort.")
-            new_dirs = []
-            for old, new in zip(filenames, new_filenames):
-                if old != new:
-                    basepath, _ = os.path.split(new)
-                    if (basepath and basepath not in new_dirs
-                            and not os.path.isdir(basepath)):
-                        script_lines.append("mkdir -vp -- {dir}".format(
-                            dir=esc(basepath)))
-                        new_dirs.append(basepath)
-                    script_lines.append("mv -vi -- {old} {new}".format(
-                        old=esc(old), new=esc(new)))
-            # Make sure not to forget the ending newline
-            script_content = "\n".join(script_lines) + "\n"
+        # Plan the renames
+        cwd = self.fm.thisdir
+        renames = [(os.path.join(cwd.path, old), os.path.join(cwd.path, new))
+                   for old, new in zip(filenames, new_filenames) if old != new]
+        try:
+            steps = plan_renames(renames)
+        except RenameError as ex:
+            self.fm.notify(ex, bad=True)
+            return
+
+        # Let the user review the plan
+        with tempfile.NamedTemporaryFile() as planfile:
+            plan_lines = [
+                "# These renames will be done when you close the editor.",
+                "# Please double-check everything, clear the file to abort.",
+            ]
+            plan_lines.extend("{0} -> {1}".format(
+                os.path.relpath(old, cwd.path), os.path.relpath(new, cwd.path))
+                for old, new in steps)
+            plan_content = "\n".join(plan_lines) + "\n"
             if PY3:
-                cmdfile.write(script_content.encode(encoding="utf-8",
-                                                    errors="surrogateescape"))
+                planfile.write(plan_content.encode(encoding="utf-8",
+                                                   errors="surrogateescape"))
             else:
-                cmdfile.write(script_content)
-            cmdfile.flush()
-
-            # Open the script and let the user review it, then check if the
-            # script was modified by the user
-            self.fm.execute_file([File(cmdfile.name)], app='editor')
-            cmdfile.seek(0)
-            script_was_edited = (script_content != cmdfile.read())
-
-            # Do the renaming
-            self.fm.run(['/bin/sh', cmdfile.name], flags=self.flags)
-
-        # Retag the files, but only if the script wasn't changed during review,
-        # because only then we know which are the source and destination files.
-        if not script_was_edited:
-            tags_changed = False
-            for old, new in zip(filenames, new_filenames):
-                if old != new:
-                    oldpath = self.fm.thisdir.path + '/' + old
-                    newpath = self.fm.thisdir.path + '/' + new
-                    if oldpath in self.fm.tags:
-                        old_tag = self.fm.tags.tags[oldpath]
-                        self.fm.tags.remove(oldpath)
-                        self.fm.tags.tags[newpath] = old_tag
-                        tags_changed = True
-            if tags_changed:
-                self.fm.tags.dump()
-        else:
-            fm.notify("files have not been retagged")
+                planfile.write(plan_content)
+            planfile.flush()
+            self.fm.execute_file([File(planfile.name)], app='editor')
+            with open(planfile.name, "r", encoding="utf-8",
+                      errors="surrogateescape") as fobj:
+                reviewed = fobj.read()
+
+        if not reviewed.strip():
+            self.fm.notify("Aborted, nothing was renamed.")
+            return
+        if reviewed != plan_content:
+            self.fm.notify("The plan was edited, nothing was renamed! "
+                           "Change the file list instead.", bad=True)
+            return
+
+        # Do the renaming
+        try:
+            apply_renames(steps)
+        except RenameError as ex:
+            self.fm.notify(ex, bad=True)
+            return
+        self.fm.tags.update_paths(renames)
+        self.fm.metadata.update_paths(renames)
+        cwd.content_outdated = True
+        self.fm.notify("Renamed %d files" % len(renames))
+        if 'w' in self.flags:
+            pager = self.fm.ui.open_pager()
+            pager.set_source(["renamed '{0}' -> '{1}'".format(
+                os.path.relpath(old, cwd.path), os.path.relpath(new, cwd.path))
+                for old, new in renames])
 
 
 class relink(Command):
@@ -0,0 +1,124 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Remembers the sha256 checksums that were computed while copying files.
+
+A checksum is only handed out while the size and mtime of the file are the
+same as when it was recorded.  The duplicate filters use them to avoid
+reading files again.  Only the MAX_CHECKSUMS most recently added checksums
+are kept, and the ones of files which no longer exist are dropped.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+from collections import OrderedDict
+from io import open
+
+from ranger.core.shared import FileManagerAware
+from ranger.ext.fsencoding import fsdecode, fsencode
+
+MAX_CHECKSUMS = 10000
+
+
+class Checksums(FileManagerAware):
+    """Maps paths to (size, mtime_ns, sha256 hexdigest)
+
+    The data is kept in a file with one "<digest> <size> <mtime_ns> <path>"
+    line per file, the oldest first, with the paths as they are stored in the
+    file system.  Without a filename, nothing is saved.  The file is only
+    written when the checksums changed.
+    """
+
+    def __init__(self, filename=None, max_checksums=MAX_CHECKSUMS):
+        self._filename = filename
+        self.max_checksums = max_checksums
+        self._checksums = None
+        self._changed = False
+
+    def _load(self):
+        self._checksums = OrderedDict()
+        if self._filename is None or not os.path.exists(self._filename):
+            return
+        try:
+            with open(self._filename, 'rb') as fobj:
+                for line in fobj:
+                    try:
+                        digest, size, mtime, path = line.rstrip(b'\n').split(b' ', 3)
+                        self._checksums[fsdecode(path)] = (
+                            int(size), int(mtime), str(digest.decode('ascii')))
+                    except (ValueError, UnicodeError):
+                        continue
+        except (OSError, IOError) as err:
+            self.fm.notify(err, bad=True)
+        self._limit()
+
+    def _limit(self):
+        while len(self._checksums) > self.max_checksums:
+            self._checksums.popitem(last=False)
+            self._changed = True
+
+    @property
+    def checksums(self):
+        if self._checksums is None:
+            self._load()
+        return self._checksums
+
+    @staticmethod
+    def _stat_key(path):
+        stat = os.stat(path)
+        return stat.st_size, getattr(stat, 'st_mtime_ns', int(stat.st_mtime * 1e9))
+
+    def add(self, path, digest):
+        """Remember the checksum of path, which must exist"""
+        try:
+            size, mtime = self._stat_key(path)
+        except OSError:
+            return
+        entry = (size, mtime, digest)
+        if self.checksums.get(path) == entry:
+            return
+        # Move it to the end, so the recently added ones are kept
+        self._checksums.pop(path, None)
+        self._checksums[path] = entry
+        self._changed = True
+        self._limit()
+
+    def get(self, path):
+        """Return the checksum of path or None if it's unknown or outdated"""
+        try:
+            size, mtime, digest = self.checksums[path]
+        except KeyError:
+            return None
+        try:
+            if (size, mtime) != self._stat_key(path):
+                return None
+        except OSError:
+            return None
+        return digest
+
+    def prune(self):
+        """Forget the checksums of files which no longer exist"""
+        for path in [path for path in self.checksums if not os.path.exists(path)]:
+            del self._checksums[path]
+            self._changed = True
+
+    def dump(self):
+        """Save the checksums if they changed since they were loaded"""
+        if self._filename is None or self._checksums is None or not self._changed:
+            return
+        self.prune()
+        try:
+            with open(self._filename, 'wb') as fobj:
+                for path, (size, mtime, digest) in self._checksums.items():
+                    try:
+                        path = fsencode(path)
+                    except UnicodeError:
+                        continue
+                    if b'\n' in path:
+                        continue
+                    fobj.write(('%s %d %d ' % (digest, size, mtime)).encode('ascii')
+                               + path + b'\n')
+            self._changed = False
+        except (OSError, IOError, UnicodeError) as err:
+            self.fm.notify(err, bad=True)
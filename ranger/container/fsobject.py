@@ -13,7 +13,7 @@ from time import time
 from ranger.core.linemode import (
     DEFAULT_LINEMODE, DefaultLinemode, TitleLinemode,
     PermissionsLinemode, FileInfoLinemode, MtimeLinemode, SizeMtimeLinemode,
-    HumanReadableMtimeLinemode, SizeHumanReadableMtimeLinemode
+    HumanReadableMtimeLinemode, SizeHumanReadableMtimeLinemode, TrashLinemode
 )
 from ranger.core.shared import FileManagerAware, SettingsAware
 from ranger.ext.shell_escape import shell_escape
@@ -87,6 +87,9 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
     size = 0
 
     last_load_time = -1
+    # Incremented whenever the object is loaded, so rows rendered before
+    # aren't taken from the render cache
+    display_version = 0
 
     vcsstatus = None
     vcsremotestatus = None
@@ -95,7 +98,7 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         (linemode.name, linemode()) for linemode in
         [DefaultLinemode, TitleLinemode, PermissionsLinemode, FileInfoLinemode,
          MtimeLinemode, SizeMtimeLinemode, HumanReadableMtimeLinemode,
-         SizeHumanReadableMtimeLinemode]
+         SizeHumanReadableMtimeLinemode, TrashLinemode]
     )
 
     def __init__(self, path, preload=None, path_is_abs=False, basename_is_rel_to=None):
@@ -108,7 +111,6 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         else:
             self.relative_path = relpath(path, basename_is_rel_to)
         self.preload = preload
-        self.display_data = {}
 
     def __repr__(self):
         return "<{0} {1}>".format(self.__class__.__name__, self.path)
@@ -254,6 +256,28 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
             self.set_mimetype()
             return self._mimetype_tuple
 
+    # COMPAT: the rendered rows used to be kept here, and plugins reset this
+    # to {} to get the object drawn again.  Assigning or deleting it now
+    # drops its cached rows, reading it has no effect.
+    @property
+    def display_data(self):
+        return {}
+
+    @display_data.setter
+    def display_data(self, _):
+        self.forget_rendered()
+
+    @display_data.deleter
+    def display_data(self):
+        self.forget_rendered()
+
+    def forget_rendered(self):
+        """Draw this object again instead of using its cached rows"""
+        self.display_version += 1
+        render_cache = getattr(self.fm.ui, 'render_cache', None)
+        if render_cache is not None:
+            render_cache.forget(self)
+
     def mark(self, _):
         directory = self.fm.get_directory(self.dirname)
         directory.mark_item(self)
@@ -282,7 +306,7 @@ class FileSystemObject(  # pylint: disable=too-many-instance-attributes,too-many
         if self.settings.freeze_files:
             return
 
-        self.display_data = {}
+        self.display_version += 1
         self.fm.update_preview(self.path)
 
         # Get the stat object, either from preload or from [l]stat
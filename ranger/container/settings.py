@@ -54,6 +54,7 @@ ALLOWED_SETTINGS = {
     'iterm2_font_height': int,
     'line_numbers': str,
     'max_console_history_size': (int, type(None)),
+    'max_fps': int,
     'max_history_size': (int, type(None)),
     'metadata_deep_search': bool,
     'mouse_enabled': bool,
@@ -94,6 +95,8 @@ ALLOWED_SETTINGS = {
     'vcs_backend_hg': str,
     'vcs_backend_svn': str,
     'vcs_msg_length': int,
+    'vcs_scoped_status': bool,
+    'verify_copies': bool,
     'viewmode': str,
     'w3m_delay': float,
     'w3m_offset': int,
@@ -114,18 +114,29 @@ class Tags(FileManagerAware):
         return result
 
     def update_path(self, path_old, path_new):
+        self.update_paths([(path_old, path_new)])
+
+    def update_paths(self, pairs):
+        """Update tags after moving each path_old of (path_old, path_new)
+
+        Tags of files inside moved directories are updated as well.  The tags
+        file is written at most once, however many paths were moved.
+        """
+        renamed = dict(pairs)
+        if not renamed:
+            return
         self.sync()
         changed = False
-        for path, tag in self.tags.items():
-            pnew = None
-            if path == path_old:
-                pnew = path_new
-            elif path.startswith(path_old + sep):
-                pnew = path_new + path[len(path_old):]
-            if pnew:
-                # pylint: disable=unnecessary-dict-index-lookup
+        for path, tag in list(self.tags.items()):
+            # Look for the path itself or its closest moved parent directory
+            parent = path
+            while parent not in renamed:
+                parent, _, _ = parent.rpartition(sep)
+                if not parent:
+                    break
+            else:
                 del self.tags[path]
-                self.tags[pnew] = tag
+                self.tags[renamed[parent] + path[len(parent):]] = tag
                 changed = True
         if changed:
             self.dump()
@@ -6,6 +6,7 @@
 from __future__ import (absolute_import, division, print_function)
 
 import codecs
+import errno
 import os
 import re
 import shlex
@@ -13,12 +14,14 @@ import shutil
 import string
 import tempfile
 from hashlib import sha512
+from functools import partial
 from inspect import cleandoc
 from io import open
 from logging import getLogger
 from os import link, symlink, listdir, stat
 from os.path import join, isdir, realpath, exists
 from stat import S_IEXEC
+from time import strftime
 
 import ranger
 from ranger import PY3
@@ -28,6 +31,7 @@ from ranger.container.settings import ALLOWED_SETTINGS, ALLOWED_VALUES
 from ranger.core.loader import CommandLoader, CopyLoader
 from ranger.core.shared import FileManagerAware, SettingsAware
 from ranger.core.tab import Tab
+from ranger.ext.copy_journal import CopyJournal
 from ranger.ext.direction import Direction
 from ranger.ext.get_executables import get_executables
 from ranger.ext.keybinding_parser import key_to_string, construct_keybinding
@@ -37,6 +41,7 @@ from ranger.ext.relative_symlink import relative_symlink
 from ranger.ext.rifle import squash_flags, ASK_COMMAND
 from ranger.ext.safe_path import get_safe_path
 from ranger.ext.shell_escape import shell_quote
+from ranger.ext.trash import TrashError, DATE_FORMAT as TRASH_DATE_FORMAT
 
 LOG = getLogger(__name__)
 
@@ -1607,22 +1612,75 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
                 link(source_path,
                      next_available_filename(target_path))
 
-    def paste(self, overwrite=False, append=False, dest=None, make_safe_path=get_safe_path):
+    def paste(self, overwrite=False, append=False,  # pylint: disable=too-many-arguments
+              dest=None, make_safe_path=get_safe_path, verify=None):
         """:paste
 
         Paste the selected items into the current directory or to dest
-        if provided.
+        if provided.  If verify is True, every copied file is read back and
+        compared by its checksum.  It defaults to the verify_copies setting.
         """
         if dest is None:
             dest = self.thistab.path
+        if verify is None:
+            verify = self.settings.verify_copies
         if isdir(dest):
+            journal = self._create_copy_journal(
+                dest, [fobj.path for fobj in self.copy_buffer], self.do_cut, overwrite,
+                verify)
             loadable = CopyLoader(self.copy_buffer, self.do_cut, overwrite,
-                                  dest, make_safe_path)
+                                  dest, make_safe_path, journal=journal, verify=verify)
             self.loader.add(loadable, append=append)
             self.do_cut = False
         else:
             self.notify('Failed to paste. The destination is invalid.', bad=True)
 
+    def _create_copy_journal(self, dest, sources,  # pylint: disable=too-many-arguments
+                             do_cut, overwrite, verify=False):
+        if ranger.args.clean or not sources:
+            return None
+        try:
+            return CopyJournal.create(self.datapath('copy_journals'), dest,
+                                      sources, do_cut=do_cut, overwrite=overwrite,
+                                      verify=verify)
+        except (OSError, IOError, TypeError, ValueError) as ex:
+            # Paste without a journal rather than not at all
+            LOG.debug("Failed to create copy journal: %s", ex)
+            return None
+
+    def resume_copies(self, by_hash=False):
+        """:resume_copies [by_hash=False]
+
+        Continue copy and move operations that were interrupted, e.g. because
+        ranger was killed.  Files that already arrived at their destination
+        (same size and mtime) are skipped.  If by_hash is True, files that
+        weren't journaled as finished are also compared by their checksum.
+        """
+        if ranger.args.clean:
+            self.notify("Copy journals are not available in clean mode", bad=True)
+            return
+        active = set(item.journal.path for item in self.loader.queue
+                     if getattr(item, 'journal', None) is not None)
+        count = 0
+        for journal in CopyJournal.find(self.datapath('copy_journals')):
+            if journal.path in active:
+                continue
+            journal.by_hash = by_hash
+            sources = [path for path in journal.pending_sources()
+                       if os.path.lexists(path)]
+            if not sources or not isdir(journal.dest):
+                journal.finish()
+                continue
+            loadable = CopyLoader([File(path) for path in sources], journal.do_cut,
+                                  journal.overwrite, journal.dest, journal=journal,
+                                  verify=journal.verify)
+            self.loader.add(loadable, append=True)
+            count += 1
+        if count:
+            self.notify("Resuming %d interrupted operation%s" % (count, 's' * (count > 1)))
+        else:
+            self.notify("No interrupted copy or move operations found")
+
     def delete(self, files=None):
         # XXX: warn when deleting mount points/unseen marked files?
         # COMPAT: old command.py use fm.delete() without arguments
@@ -1649,6 +1707,96 @@ class Actions(  # pylint: disable=too-many-instance-attributes,too-many-public-m
                     self.notify(err)
         self.thistab.ensure_correct_pointer()
 
+    def move_to_trash(self, files=None):
+        """:move_to_trash
+
+        Move the selection or the given paths to the trash, following the
+        freedesktop.org trash specification.  Files are renamed into the
+        trash of their own file system.  If that's not possible, they're
+        moved to the home trash in the background.
+        """
+        if files is None:
+            files = [fobj.path for fobj in self.thistab.get_selection()]
+        files = [os.path.abspath(path) for path in files]
+        deletion_date = strftime(TRASH_DATE_FORMAT)
+        moved = []
+        for path in files:
+            try:
+                trash_dir, same_device = self.trash.trash_dir_for(path)
+                trash_dir.create()
+                if same_device:
+                    moved.append((path, trash_dir.put(path, deletion_date)))
+                    continue
+            except OSError as ex:
+                if ex.errno != errno.EXDEV:
+                    self.notify("Failed to trash %s: %s" % (path, ex.strerror), bad=True)
+                    continue
+            try:
+                target = trash_dir.reserve(path, deletion_date)
+            except OSError as ex:
+                self.notify("Failed to trash %s: %s" % (path, ex.strerror), bad=True)
+                continue
+            self._move_with_loader(path, target)
+        self.tags.update_paths(moved)
+        files = set(files)
+        self.copy_buffer = set(fobj for fobj in self.copy_buffer if fobj.path not in files)
+        self.thistab.ensure_correct_pointer()
+
+    def restore_from_trash(self, files=None):
+        """:restore_from_trash
+
+        Move the selected files in the files/ directory of a trash back to
+        the place where they were trashed from.
+        """
+        if files is None:
+            files = [fobj.path for fobj in self.thistab.get_selection()]
+        moved = []
+        for path in (os.path.abspath(path) for path in files):
+            info = self.trash.info(path)
+            if info is None:
+                self.notify("Not a trashed file: %s" % path, bad=True)
+                continue
+            trash_dir = self.trash.trash_dir_of(path)
+            try:
+                moved.append((path, trash_dir.restore(path, info.path)))
+            except TrashError as ex:
+                self.notify(ex, bad=True)
+            except OSError as ex:
+                if ex.errno != errno.EXDEV:
+                    self.notify("Failed to restore %s: %s" % (path, ex.strerror), bad=True)
+                    continue
+                self._move_with_loader(path, info.path, partial(self._restore_done, trash_dir))
+        self.tags.update_paths(moved)
+        self.thistab.ensure_correct_pointer()
+
+    @staticmethod
+    def _restore_done(trash_dir, path):
+        if not os.path.lexists(path):
+            trash_dir.unreserve(path)
+
+    def _move_with_loader(self, src, dst, callback=None):
+        """Move src to the exact path dst with a CopyLoader
+
+        The optional callback is called with src once the loader is done.
+        """
+        fobj = File(src)
+        dest = os.path.dirname(dst)
+        default_dst = join(dest, fobj.basename)
+
+        def make_safe_path(path):
+            return dst if path == default_dst else get_safe_path(path)
+
+        loadable = CopyLoader(set([fobj]), do_cut=True, dest=dest,
+                              make_safe_path=make_safe_path,
+                              journal=self._create_copy_journal(dest, [src], True, False))
+        if callback is not None:
+            def after(signal):
+                if signal.loadable is loadable:
+                    callback(src)
+                    raise ReferenceError
+            self.signal_bind('loader.after', after)
+        self.loader.add(loadable, append=True)
+
     def mkdir(self, name):
         try:
             os.makedirs(os.path.join(self.thisdir.path, name))
@@ -6,13 +6,14 @@
 from __future__ import (absolute_import, division, print_function)
 
 import re
+from collections import deque
 # pylint: disable=invalid-name
 try:
     from itertools import izip_longest as zip_longest
 except ImportError:
     from itertools import zip_longest
 # pylint: enable=invalid-name
-from os.path import abspath
+from os.path import abspath, getsize
 
 from ranger.container.directory import accept_file, InodeFilterConstants
 from ranger.core.shared import FileManagerAware
@@ -99,8 +100,40 @@ class HashFilter(BaseFilter, FileManagerAware):
         return "<Filter: hash {fp}>".format(fp=self.filepath)
 
 
-def group_by_hash(fsobjects):
+def _file_size(fobj):
+    try:
+        return getsize(fobj.path)
+    except OSError:
+        return None
+
+
+def group_by_hash(fsobjects, get_digest=None):
+    """Group the files with the same content
+
+    get_digest can return a known sha256 hexdigest of a file or None.
+    Files with a known digest aren't read at all, and other files are only
+    hashed completely if their size matches one of them.
+    """
     hashes = {}
+    if get_digest is not None:
+        unknown = []
+        for fobj in fsobjects:
+            digest = None if fobj.is_directory else get_digest(fobj.path)
+            if digest is None:
+                unknown.append(fobj)
+            else:
+                hashes.setdefault(digest, []).append((fobj, iter(())))
+        if hashes:
+            known_sizes = set(_file_size(dups[0][0]) for dups in hashes.values())
+            fsobjects = []
+            for fobj in unknown:
+                if not fobj.is_directory and _file_size(fobj) in known_sizes:
+                    digest = deque(hash_chunks(fobj.path), maxlen=1).pop()
+                    hashes.setdefault(digest, []).append((fobj, iter(())))
+                else:
+                    fsobjects.append(fobj)
+        else:
+            fsobjects = unknown
     for fobj in fsobjects:
         chunks = hash_chunks(fobj.path)
         chunk = next(chunks)
@@ -144,7 +177,7 @@ class DuplicateFilter(BaseFilter, FileManagerAware):
 
     def get_duplicates(self):
         duplicates = set()
-        for dups in group_by_hash(self.fm.thisdir.files_all):
+        for dups in group_by_hash(self.fm.thisdir.files_all, self.fm.checksums.get):
             if len(dups) >= 2:
                 duplicates.update(dups)
         return duplicates
@@ -163,7 +196,7 @@ class UniqueFilter(BaseFilter, FileManagerAware):
 
     def get_unique(self):
         unique = set()
-        for dups in group_by_hash(self.fm.thisdir.files_all):
+        for dups in group_by_hash(self.fm.thisdir.files_all, self.fm.checksums.get):
             try:
                 unique.add(min(dups, key=lambda fobj: fobj.stat.st_ctime))
             except ValueError:
@@ -18,6 +18,7 @@ from time import time
 import ranger.api
 from ranger.container import settings
 from ranger.container.bookmarks import Bookmarks
+from ranger.container.checksums import Checksums
 from ranger.container.directory import Directory
 from ranger.container.tags import Tags, TagsDummy
 from ranger.core.actions import Actions
@@ -29,6 +30,7 @@ from ranger.ext import logutils
 from ranger.ext.img_display import get_image_displayer
 from ranger.ext.rifle import Rifle
 from ranger.ext.signals import SignalDispatcher
+from ranger.ext.trash import Trash
 from ranger.gui.ui import UI
 
 
@@ -62,6 +64,7 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         self.copy_buffer = set()
         self.do_cut = False
         self.metadata = MetadataManager()
+        self.trash = Trash()
         self.image_displayer = None
         self.run = None
         self.rifle = None
@@ -116,6 +119,9 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         elif self.tags is None:
             self.tags = Tags(self.datapath('tagged'))
 
+        self.checksums = Checksums(
+            None if ranger.args.clean else self.datapath('checksums'))
+
         if self.bookmarks is None:
             if ranger.args.clean:
                 bookmarkfile = None
@@ -391,7 +397,7 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
         It consists of:
         1. reloading bookmarks if outdated
         2. letting the loader work
-        3. drawing and finalizing ui
+        3. drawing and finalizing ui, at most max_fps times per second
         4. reading and handling user input
         5. after X loops: collecting unused directory objects
         """
@@ -414,12 +420,12 @@ class FM(Actions,  # pylint: disable=too-many-instance-attributes
                 else:
                     throbber(remove=True)
 
-                ui.redraw()
+                if ui.frame_due():
+                    ui.redraw()
+                    ui.draw_images()
 
                 ui.set_load_mode(not loader.paused and loader.has_work())
 
-                ui.draw_images()
-
                 ui.handle_input()
 
                 if zombies:
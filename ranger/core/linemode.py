@@ -8,6 +8,7 @@ from __future__ import (absolute_import, division, print_function)
 from abc import ABCMeta, abstractproperty, abstractmethod
 from datetime import datetime
 
+from ranger.core.shared import FileManagerAware
 from ranger.ext.human_readable import human_readable, human_readable_time
 from ranger.ext import spawn
 
@@ -157,3 +158,19 @@ class SizeHumanReadableMtimeLinemode(LinemodeBase):
             return '?'
         size = human_readable(fobj.size)
         return "%s %11s" % (size, human_readable_time(fobj.stat.st_mtime))
+
+
+class TrashLinemode(LinemodeBase, FileManagerAware):
+    name = "trash"
+
+    def filetitle(self, fobj, metadata):
+        info = self.fm.trash.info(fobj.path)
+        if info is None:
+            return fobj.relative_path
+        return info.path
+
+    def infostring(self, fobj, metadata):
+        info = self.fm.trash.info(fobj.path)
+        if info is None or not info.deletion_date:
+            raise NotImplementedError
+        return info.deletion_date.replace('T', ' ')[:16]
@@ -9,6 +9,7 @@ import os.path
 import select
 from collections import deque
 from io import open
+from logging import getLogger
 from subprocess import Popen, PIPE
 from time import time, sleep
 
@@ -25,6 +26,9 @@ from ranger.ext.safe_path import get_safe_path
 from ranger.ext.signals import SignalDispatcher
 
 
+LOG = getLogger(__name__)
+
+
 class Loadable(object):
     paused = False
     progressbar_supported = False
@@ -54,13 +58,17 @@ class CopyLoader(Loadable, FileManagerAware):  # pylint: disable=too-many-instan
     progressbar_supported = True
 
     def __init__(self, copy_buffer, do_cut=False, overwrite=False, dest=None,
-                 make_safe_path=get_safe_path):
+                 make_safe_path=get_safe_path, journal=None, verify=False):
         self.copy_buffer = tuple(copy_buffer)
         self.do_cut = do_cut
         self.original_copy_buffer = copy_buffer
         self.original_path = dest if dest is not None else self.fm.thistab.path
         self.overwrite = overwrite
         self.make_safe_path = make_safe_path
+        self.journal = journal
+        self.verify = verify
+        self.errors = []
+        self.mismatches = 0
         self.percent = 0
         if self.copy_buffer:
             self.one_file = self.copy_buffer[0]
@@ -84,6 +92,82 @@ class CopyLoader(Loadable, FileManagerAware):  # pylint: disable=too-many-instan
                 size += max(step, math.ceil(fstat.st_size / step) * step)
         return size
 
+    def get_description(self):
+        if self.mismatches:
+            return "{0} [{1} checksum mismatches]".format(self.description, self.mismatches)
+        if self.errors:
+            return "{0} [{1} errors]".format(self.description, len(self.errors))
+        return self.description
+
+    def _on_verified(self, src, dst, digest):
+        self.fm.checksums.add(src, digest)
+        self.fm.checksums.add(dst, digest)
+
+    def _report(self, error):
+        from ranger.ext import shutil_generatorized as shutil_g
+        problems = error.args[0]
+        if not isinstance(problems, list):
+            problems = [(None, None, str(problems))]
+        for src, dst, why in problems:
+            self.errors.append((src, dst, why))
+            if why == shutil_g.CHECKSUM_MISMATCH:
+                self.mismatches += 1
+                LOG.error("Checksum mismatch: %s -> %s", src, dst)
+            else:
+                LOG.error("Error while copying %s -> %s: %s", src, dst, why)
+
+    def _destination(self, fobj):
+        """Return the path that fobj will be copied or moved to
+
+        This resolves the name the same way shutil_generatorized does and
+        remembers it in the journal.  A journaled destination is reused, so
+        that resumed operations continue where they stopped.
+        """
+        if self.journal is not None and fobj.path in self.journal.pairs:
+            return self.journal.pairs[fobj.path], True
+        dst = os.path.join(self.original_path, fobj.basename)
+        if not self.overwrite:
+            dst = self.make_safe_path(dst)
+        if self.journal is not None:
+            self.journal.set_pair(fobj.path, dst)
+        return dst, False
+
+    def _move_tags(self, src, dst):
+        for path in self.fm.tags.tags:
+            if path == src or str(path).startswith(src):
+                tag = self.fm.tags.tags[path]
+                self.fm.tags.remove(path)
+                new_path = path.replace(src, dst)
+                self.fm.tags.tags[new_path] = tag
+                self.fm.tags.dump()
+
+    def _copy(self, fobj, dst, resumed, **kw):
+        from ranger.ext import shutil_generatorized as shutil_g
+        if resumed:
+            # Copy into the journaled destination, finishing partial files
+            kw['overwrite'] = True
+        else:
+            kw['overwrite'] = self.overwrite
+            kw['make_safe_path'] = self.make_safe_path
+        if os.path.isdir(fobj.path) and not os.path.islink(fobj.path):
+            return shutil_g.copytree(src=fobj.path, dst=dst, symlinks=True, **kw)
+        if resumed:
+            return shutil_g.copy2(fobj.path, dst, symlinks=True, **kw)
+        return shutil_g.copy2(fobj.path, self.original_path, symlinks=True, **kw)
+
+    def _move(self, fobj, dst, resumed, **kw):
+        from ranger.ext import shutil_generatorized as shutil_g
+        if not resumed:
+            return shutil_g.move(src=fobj.path, dst=self.original_path,
+                                 overwrite=self.overwrite,
+                                 make_safe_path=self.make_safe_path, **kw)
+        if not os.path.lexists(dst):
+            return shutil_g.move(src=fobj.path, dst=dst, overwrite=True, **kw)
+        # An interrupted cross-device move, continue moving the rest
+        if os.path.isdir(fobj.path) and not os.path.islink(fobj.path):
+            return shutil_g.movetree(fobj.path, dst, overwrite=True, **kw)
+        return shutil_g.movefile(fobj.path, dst, **kw)
+
     def generate(self):
         if not self.copy_buffer:
             return
@@ -100,49 +184,52 @@ class CopyLoader(Loadable, FileManagerAware):  # pylint: disable=too-many-instan
                 self.description = "moving: " + self.one_file.path + size_str
             else:
                 self.description = "moving files from: " + self.one_file.dirname + size_str
-            for fobj in self.copy_buffer:
-                for path in self.fm.tags.tags:
-                    if path == fobj.path or str(path).startswith(fobj.path):
-                        tag = self.fm.tags.tags[path]
-                        self.fm.tags.remove(path)
-                        new_path = path.replace(
-                            fobj.path,
-                            os.path.join(self.original_path, fobj.basename))
-                        self.fm.tags.tags[new_path] = tag
-                        self.fm.tags.dump()
-                n = 0
-                for n in shutil_g.move(src=fobj.path, dst=self.original_path,
-                                       overwrite=self.overwrite,
-                                       make_safe_path=self.make_safe_path):
-                    self.percent = ((done + n) / size) * 100.
-                    yield
-                done += n
+            operation = self._move
         else:
             if len(self.copy_buffer) == 1:
                 self.description = "copying: " + self.one_file.path + size_str
             else:
                 self.description = "copying files from: " + self.one_file.dirname + size_str
-            for fobj in self.copy_buffer:
-                if os.path.isdir(fobj.path) and not os.path.islink(fobj.path):
-                    n = 0
-                    for n in shutil_g.copytree(
-                            src=fobj.path,
-                            dst=os.path.join(self.original_path, fobj.basename),
-                            symlinks=True,
-                            overwrite=self.overwrite,
-                            make_safe_path=self.make_safe_path,
-                    ):
-                        self.percent = ((done + n) / size) * 100.
-                        yield
-                    done += n
-                else:
-                    n = 0
-                    for n in shutil_g.copy2(fobj.path, self.original_path,
-                                            symlinks=True, overwrite=self.overwrite,
-                                            make_safe_path=self.make_safe_path):
-                        self.percent = ((done + n) / size) * 100.
-                        yield
-                    done += n
+            operation = self._copy
+        for fobj in self.copy_buffer:
+            dst, resumed = self._destination(fobj)
+            hooks = {}
+            if self.journal is not None:
+                journal = self.journal
+                hooks['on_done'] = lambda src, _: journal.mark_done(src)
+                if resumed:
+                    hooks['skip'] = self.journal.is_copied
+            if self.verify:
+                hooks['on_verified'] = self._on_verified
+            if self.do_cut:
+                self._move_tags(fobj.path, dst)
+            n = 0
+            try:
+                for n in operation(fobj, dst, resumed, **hooks):
+                    self.percent = ((done + n) / size) * 100.
+                    yield
+            except shutil_g.Error as ex:
+                if not self.verify:
+                    raise
+                # Go on with the other files, the journal keeps this one
+                # pending so it can be retried with :resume_copies
+                done += n
+                self._report(ex)
+                continue
+            done += n
+            if self.journal is not None:
+                self.journal.mark_complete(fobj.path)
+        if self.verify:
+            self.fm.checksums.dump()
+            if self.errors:
+                self.fm.notify("{0}: {1} checksum mismatches, {2} errors, see the log".format(
+                    self.description, self.mismatches, len(self.errors) - self.mismatches),
+                    bad=True)
+        if self.journal is not None:
+            if self.errors:
+                self.journal.checkpoint()
+            else:
+                self.journal.finish()
         cwd = self.fm.get_directory(self.original_path)
         cwd.load_content()
 
@@ -5,23 +5,105 @@
 A Metadata Manager that reads information about files from a json database.
 
 The database is contained in a local .metadata.json file.
+
+The metadata of a file is handed out as an immutable MetadataEntry.  The
+same entry is returned until the metadata changes, and every entry has its
+own version number, so callers can cache what they derived from it.
+get_metadata() used to return a mutable copy, a DefaultOpenStruct; code
+that changes what it gets can call copy() for one:
+
+>>> entry = MetadataEntry({'title': 'Title'}, 3)
+>>> entry.title, entry.year, entry['title'], entry.version
+('Title', None, 'Title', 3)
+>>> entry.title = 'Other'
+Traceback (most recent call last):
+...
+AttributeError: Metadata entries are immutable, change a copy()
+>>> changed = entry.copy()
+>>> changed.title = 'Other'
+>>> changed.title, entry.title
+('Other', 'Title')
+>>> bool(EMPTY_ENTRY), EMPTY_ENTRY.version
+(False, 0)
 """
 
 # TODO: Better error handling if a json file can't be decoded
-# TODO: Update metadata keys if a file gets renamed/moved
 # TODO: A global metadata file, maybe as a replacement for tags
 
 from __future__ import (absolute_import, division, print_function)
 
 import copy
+from collections import OrderedDict
 from io import open
 from os.path import join, dirname, exists, basename
 
-from ranger.ext.openstruct import DefaultOpenStruct as ostruct
+from ranger.ext.openstruct import DefaultOpenStruct
 
 
 METADATA_FILE_NAME = ".metadata.json"
 DEEP_SEARCH_DEFAULT = False
+# How many MetadataEntry objects are kept for reuse
+MAX_ENTRIES = 4096
+
+
+class MetadataEntry(object):
+    """The metadata of a file at one point in time
+
+    Works like a read-only dict whose keys are also attributes, missing
+    attributes are None.  version is unique for every entry with data.
+    """
+
+    __slots__ = ('_data', 'version')
+
+    def __init__(self, data, version):
+        object.__setattr__(self, '_data', copy.deepcopy(data))
+        object.__setattr__(self, 'version', version)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._data.get(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Metadata entries are immutable, change a copy()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Metadata entries are immutable, change a copy()")
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "<{0} {1} {2!r}>".format(self.__class__.__name__, self.version, self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def items(self):
+        return self._data.items()
+
+    # COMPAT: get_metadata() returned a mutable DefaultOpenStruct
+    def copy(self):
+        """Returns the data as a mutable DefaultOpenStruct"""
+        return DefaultOpenStruct(copy.deepcopy(self._data))
+
+
+EMPTY_ENTRY = MetadataEntry({}, 0)
 
 
 class MetadataManager(object):
@@ -31,20 +113,35 @@ class MetadataManager(object):
         self.metadata_cache = {}
         # metafile_cache maps .metadata.json filenames to their entries
         self.metafile_cache = {}
+        # entries maps filenames to the MetadataEntry handed out for them,
+        # the least recently used ones first
+        self.entries = OrderedDict()
         self.deep_search = DEEP_SEARCH_DEFAULT
+        self._version = 0
 
     def reset(self):
         self.metadata_cache.clear()
         self.metafile_cache.clear()
+        self.entries.clear()
 
     def get_metadata(self, filename):
-        try:
-            return ostruct(copy.deepcopy(self.metadata_cache[filename]))
-        except KeyError:
+        """Returns the MetadataEntry of the file, which is empty if it has
+        no metadata"""
+        entry = self.entries.pop(filename, None)
+        if entry is None:
             try:
-                return ostruct(copy.deepcopy(self._get_entry(filename)))
+                data = self._get_entry(filename)
             except KeyError:
-                return ostruct()
+                data = None
+            if data:
+                self._version += 1
+                entry = MetadataEntry(data, self._version)
+            else:
+                entry = EMPTY_ENTRY
+        self.entries[filename] = entry
+        while len(self.entries) > MAX_ENTRIES:
+            self.entries.popitem(last=False)
+        return entry
 
     def set_metadata(self, filename, update_dict):
         if not self.deep_search:
@@ -85,10 +182,61 @@ class MetadataManager(object):
         # Full update of the cache, to be on the safe side:
         self.metadata_cache[filename] = entry
         self.metafile_cache[metafile] = entries
+        # Other files may share the entry when they are matched by basename
+        self._forget_entries(metafile)
 
         with open(metafile, "w", encoding="utf-8") as fobj:
             json.dump(entries, fobj, check_circular=True, indent=2)
 
+    def update_paths(self, pairs):
+        """Move the metadata of files that were renamed from old to new
+
+        Only the .metadata.json file in the directory of each file is
+        considered.  Every affected .metadata.json file is written once.
+        """
+        import json
+
+        contents = {}
+        changed = {}
+        moved = []
+
+        def get_content(metafile):
+            if metafile not in contents:
+                contents[metafile] = self._get_metafile_content(metafile)
+            return contents[metafile]
+
+        # Take all entries out first, so that swapped names keep their data
+        for old, new in pairs:
+            metafile = join(dirname(old), METADATA_FILE_NAME)
+            entries = get_content(metafile)
+            for key in (old, basename(old)):
+                if key in entries:
+                    moved.append((new, entries.pop(key)))
+                    changed[metafile] = entries
+                    self.metadata_cache.pop(old, None)
+                    break
+        for new, entry in moved:
+            metafile = join(dirname(new), METADATA_FILE_NAME)
+            entries = get_content(metafile)
+            entries[basename(new)] = entry
+            changed[metafile] = self.metafile_cache[metafile] = entries
+            self.metadata_cache[new] = entry
+
+        for metafile, entries in changed.items():
+            self._forget_entries(metafile)
+            with open(metafile, "w", encoding="utf-8") as fobj:
+                json.dump(entries, fobj, check_circular=True, indent=2)
+
+    def _forget_entries(self, metafile):
+        """Forget the entries handed out for the files that metafile can
+        hold the metadata of"""
+        directory = dirname(metafile)
+        prefix = directory.rstrip('/') + '/'
+        for filename in [filename for filename in self.entries
+                         if dirname(filename) == directory
+                         or (self.deep_search and filename.startswith(prefix))]:
+            del self.entries[filename]
+
     def _get_entry(self, filename):
         if filename in self.metadata_cache:
             return self.metadata_cache[filename]
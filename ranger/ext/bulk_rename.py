@@ -0,0 +1,167 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Plan and apply many renames at once.
+
+plan_renames() orders a list of (old, new) pairs so that no rename overwrites
+a file that still has to be renamed itself.  Chains (a->b, b->c) are done
+back to front and cycles (a->b, b->a) are broken up with a temporary name:
+
+>>> plan_renames([('a', 'b'), ('b', 'c')], exists=lambda path: False)
+[('b', 'c'), ('a', 'b')]
+>>> plan_renames([('a', 'b'), ('b', 'a')], exists=lambda path: False)
+[('a', '.a.ranger-rename'), ('b', 'a'), ('.a.ranger-rename', 'b')]
+
+Renames that would overwrite files or clash with each other are refused:
+
+>>> try:
+...     plan_renames([('a', 'c'), ('b', 'c')], exists=lambda path: False)
+... except RenameError as ex:
+...     print(ex)
+a and b would both be renamed to c
+>>> try:
+...     plan_renames([('a', 'b')], exists=lambda path: path == 'b')
+... except RenameError as ex:
+...     print(ex)
+Can't rename a: b already exists
+
+apply_renames() executes such a plan with os.rename() and undoes all renames
+if one of them fails.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+from collections import deque
+
+TEMP_SUFFIX = '.ranger-rename'
+
+
+class RenameError(Exception):
+    pass
+
+
+def _temporary_name(path, taken, exists):
+    head, tail = os.path.split(path)
+    candidate = os.path.join(head, '.' + tail + TEMP_SUFFIX)
+    counter = 0
+    while candidate in taken or exists(candidate):
+        counter += 1
+        candidate = os.path.join(head, '.{0}{1}{2}'.format(tail, TEMP_SUFFIX, counter))
+    return candidate
+
+
+def plan_renames(renames, exists=os.path.lexists):
+    """Return the (old, new) steps that perform the given renames
+
+    Pairs with old == new are dropped.  Raises RenameError if the renames
+    can't be done without overwriting files.
+    """
+    # pylint: disable=too-many-branches
+    order = []
+    targets = {}
+    for old, new in renames:
+        if old == new:
+            continue
+        if not new or new.endswith(os.sep):
+            raise RenameError("Can't rename %s to an empty name" % old)
+        if old in targets:
+            raise RenameError("%s is renamed twice" % old)
+        targets[old] = new
+        order.append(old)
+
+    sources = {}
+    for old in order:
+        new = targets[old]
+        if new in sources:
+            raise RenameError("%s and %s would both be renamed to %s"
+                              % (sources[new], old, new))
+        sources[new] = old
+        if new not in targets and exists(new):
+            raise RenameError("Can't rename %s: %s already exists" % (old, new))
+
+    for directory in set(os.path.dirname(old) for old in order):
+        parent = directory
+        while parent and parent != os.path.dirname(parent):
+            if parent in targets:
+                raise RenameError("Can't rename both %s and its content in %s"
+                                  % (parent, directory))
+            parent = os.path.dirname(parent)
+
+    steps = []
+    taken = set(targets) | set(sources)
+    pending = dict(targets)
+    ready = deque(old for old in order if targets[old] not in targets)
+    cycles = deque(order)
+    while pending:
+        while ready:
+            old = ready.popleft()
+            new = pending.pop(old)
+            steps.append((old, new))
+            # The old name is free now, so a rename waiting for it can go on
+            waiting = sources.get(old)
+            if waiting is not None and waiting in pending:
+                ready.append(waiting)
+        # Everything left belongs to a cycle.  Move one of its members out of
+        # the way, which turns the cycle into a chain.
+        while cycles and cycles[0] not in pending:
+            cycles.popleft()
+        if not cycles:
+            break
+        old = cycles.popleft()
+        temp = _temporary_name(old, taken, exists)
+        taken.add(temp)
+        steps.append((old, temp))
+        new = pending.pop(old)
+        pending[temp] = new
+        sources[new] = temp
+        ready.append(sources[old])
+    return steps
+
+
+def _makedirs(path, created, known):
+    """Create path and its parents, appending them to the list created"""
+    missing = []
+    while path and path not in known and not os.path.isdir(path):
+        missing.append(path)
+        path = os.path.dirname(path)
+    for directory in reversed(missing):
+        os.mkdir(directory)
+        created.append(directory)
+        known.add(directory)
+    known.add(path)
+
+
+def apply_renames(steps):
+    """Perform the steps returned by plan_renames()
+
+    Missing target directories are created.  If a step fails, all previous
+    steps are undone, created directories are removed again and a
+    RenameError is raised.
+    """
+    done = []
+    created = []
+    known_dirs = set()
+    try:
+        for old, new in steps:
+            _makedirs(os.path.dirname(new), created, known_dirs)
+            if os.path.lexists(new):
+                raise RenameError("%s already exists" % new)
+            os.rename(old, new)
+            done.append((old, new))
+    except (OSError, RenameError) as ex:
+        failed = []
+        for old, new in reversed(done):
+            try:
+                os.rename(new, old)
+            except OSError:
+                failed.append(new)
+        for directory in reversed(created):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        if failed:
+            raise RenameError("Renaming failed (%s) and these files could not be "
+                              "renamed back: %s" % (ex, ", ".join(failed)))
+        raise RenameError("Renaming failed, nothing was renamed: %s" % ex)
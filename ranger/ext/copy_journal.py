@@ -0,0 +1,219 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""A journal that records the progress of copy and move operations.
+
+The journal is an append-only file of JSON lines.  The first line describes
+the operation (sources, destination directory, cut/overwrite flags), every
+following line records either the resolved destination of a top-level item
+("pair"), a batch of finished files ("done") or a finished top-level item
+("complete").  Finished files are buffered and only written out at bounded
+intervals, so the journal costs next to nothing on large operations.
+
+If ranger dies in the middle of an operation, the journal stays behind and
+the operation can be continued later, skipping the files that already
+arrived at their destination.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import json
+import os
+import tempfile
+from collections import deque
+from io import open
+from time import time
+
+from ranger.ext.hash import hash_chunks
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_VERSION = 1
+
+# Some file systems (e.g. FAT) only store mtimes with a 2 second resolution
+MTIME_TOLERANCE = 2.0
+
+
+def _file_hash(path):
+    return deque(hash_chunks(path), maxlen=1).pop()
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as ex:
+        return ex.errno == 1  # EPERM: exists, but belongs to someone else
+    return True
+
+
+class CopyJournal(object):  # pylint: disable=too-many-instance-attributes
+    """Records which files of a copy/move operation have been finished
+
+    Use CopyJournal.create() to start a journal for a new operation and
+    CopyJournal.find() to load the journals of unfinished operations.
+    """
+
+    checkpoint_interval = 1.0  # seconds
+    checkpoint_files = 1000
+
+    def __init__(self, path, dest, sources,  # pylint: disable=too-many-arguments
+                 do_cut=False, overwrite=False, pid=None, verify=False):
+        self.path = path
+        self.dest = dest
+        self.sources = list(sources)
+        self.do_cut = do_cut
+        self.overwrite = overwrite
+        self.verify = verify
+        self.pid = os.getpid() if pid is None else pid
+        self.pairs = {}
+        self.complete = set()
+        self.done = set()
+        self.by_hash = False
+        self._pending = []
+        self._last_checkpoint = time()
+
+    @classmethod
+    def create(cls, directory, dest, sources,  # pylint: disable=too-many-arguments
+               do_cut=False, overwrite=False, verify=False):
+        """Create a new journal file in the given directory"""
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+        fd, path = tempfile.mkstemp(suffix=JOURNAL_SUFFIX, dir=directory)
+        os.close(fd)
+        journal = cls(path, dest, sources, do_cut=do_cut, overwrite=overwrite,
+                      verify=verify)
+        journal._write([{
+            'version': JOURNAL_VERSION,
+            'pid': journal.pid,
+            'dest': dest,
+            'sources': journal.sources,
+            'do_cut': do_cut,
+            'overwrite': overwrite,
+            'verify': verify,
+        }])
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """Read a journal file, raising ValueError if it is unusable"""
+        with open(path, 'r', encoding='utf-8') as fobj:
+            lines = fobj.read().split('\n')
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            raise ValueError("Corrupt copy journal %s" % path)
+        if header.get('version') != JOURNAL_VERSION:
+            raise ValueError("Unknown copy journal version in %s" % path)
+        journal = cls(path, header['dest'], header['sources'],
+                      do_cut=header['do_cut'], overwrite=header['overwrite'],
+                      pid=header['pid'], verify=header.get('verify', False))
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Most likely the last line, cut off by a crash
+                continue
+            if 'pair' in entry:
+                src, dst = entry['pair']
+                journal.pairs[src] = dst
+            elif 'done' in entry:
+                journal.done.update(entry['done'])
+            elif 'complete' in entry:
+                journal.complete.add(entry['complete'])
+        return journal
+
+    @classmethod
+    def find(cls, directory):
+        """Yield the journals of unfinished operations
+
+        Journals of other ranger processes that are still running are left
+        alone.
+        """
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(JOURNAL_SUFFIX):
+                continue
+            try:
+                journal = cls.load(os.path.join(directory, name))
+            except (OSError, IOError, ValueError, KeyError):
+                continue
+            if journal.pid != os.getpid() and _process_exists(journal.pid):
+                continue
+            yield journal
+
+    def _write(self, entries):
+        with open(self.path, 'a', encoding='utf-8') as fobj:
+            for entry in entries:
+                # ASCII only, so it is a text string on Python 2 too
+                fobj.write(u'%s\n' % json.dumps(entry, ensure_ascii=True))
+            fobj.flush()
+            os.fsync(fobj.fileno())
+
+    def pending_sources(self):
+        """Return the sources that haven't been completed yet"""
+        return [src for src in self.sources if src not in self.complete]
+
+    def set_pair(self, src, dst):
+        """Record the resolved destination of a top-level item
+
+        This is written immediately, because resuming with a different
+        destination would produce a second copy.
+        """
+        self.pairs[src] = dst
+        self._write([{'pair': [src, dst]}])
+
+    def mark_done(self, src):
+        """Record that a file has been copied completely"""
+        self._pending.append(src)
+        if len(self._pending) >= self.checkpoint_files \
+                or time() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def mark_complete(self, src):
+        """Record that a top-level item has been copied completely"""
+        self.complete.add(src)
+        self.checkpoint([{'complete': src}])
+
+    def checkpoint(self, extra=()):
+        entries = []
+        if self._pending:
+            self.done.update(self._pending)
+            entries.append({'done': self._pending})
+            self._pending = []
+        entries.extend(extra)
+        if entries:
+            self._write(entries)
+        self._last_checkpoint = time()
+
+    def is_copied(self, src, dst):
+        """Does dst already hold a finished copy of src?
+
+        The size and mtime must match.  With by_hash set, the contents are
+        compared too, unless the journal knows the file was finished.
+        """
+        try:
+            src_stat = os.lstat(src)
+            dst_stat = os.lstat(dst)
+        except OSError:
+            return False
+        if src_stat.st_size != dst_stat.st_size \
+                or abs(src_stat.st_mtime - dst_stat.st_mtime) >= MTIME_TOLERANCE:
+            return False
+        if self.by_hash and src not in self.done:
+            try:
+                return _file_hash(src) == _file_hash(dst)
+            except (OSError, IOError):
+                return False
+        return True
+
+    def finish(self):
+        """Remove the journal after the operation finished successfully"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,29 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Convert paths between the native string type and bytes
+
+Like os.fsencode() and os.fsdecode() of Python 3, which map undecodable
+bytes to surrogates.  On Python 2, paths are byte strings already.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import sys
+
+
+def fsencode(path):
+    """Returns path as bytes"""
+    if isinstance(path, bytes):
+        return path
+    if hasattr(os, 'fsencode'):
+        return os.fsencode(path)
+    return path.encode(sys.getfilesystemencoding() or 'utf-8')
+
+
+def fsdecode(path):
+    """Returns path as a native string, bytes on Python 2"""
+    if hasattr(os, 'fsdecode'):
+        return os.fsdecode(path)
+    return path
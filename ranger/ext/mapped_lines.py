@@ -0,0 +1,255 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""The lines of a large file, read through a memory map
+
+MappedLines behaves like a read-only list of the lines of a file, without
+reading the whole file into memory.  A background thread reads the file in
+blocks and counts the newlines of every block.  Finding line n is a binary
+search over these counts, followed by a scan inside one block, and only the
+requested line is decoded.  The index needs a few bytes per block of
+BLOCK_SIZE bytes, and the file is only mapped, so memory use stays small
+even for files of several gigabytes.
+
+Lines are split at "\\n" only and keep no line terminator.  While the index
+is being built, len() counts the lines indexed so far, but lines past them
+can be read already.
+
+Reading pages of a mapped file past its end kills the process with SIGBUS,
+so the size of the file is checked before the map is read.  Once the file
+got shorter, reading lines raises TruncatedError.
+
+>>> import tempfile
+>>> with tempfile.NamedTemporaryFile(suffix='.txt') as tmp:
+...     _ = tmp.write(b'first\\nsecond\\n\\nlast')
+...     tmp.flush()
+...     lines = MappedLines(tmp.name, block_size=4)
+...     _ = lines.wait()
+...     (len(lines), lines[0], lines[1], lines[2], lines[3], lines[-1])
+(4, 'first', 'second', '', 'last', 'last')
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from io import open
+
+BLOCK_SIZE = 1 << 16
+READ_SIZE = 1 << 20
+# How many mapped files are kept for reuse
+MAX_MAPPED_FILES = 4
+
+
+def _counts_array():
+    """An array of 64 bit counts.  Python 2 has no typecode for them on
+    32 bit systems, then a list is used."""
+    for typecode in ('L', 'Q'):
+        try:
+            if array(typecode).itemsize >= 8:
+                return array(typecode, [0])
+        except ValueError:
+            pass
+    return [0]
+
+
+class TruncatedError(IOError):
+    """The mapped file got shorter, so its lines can't be read anymore"""
+
+
+class MappedLines(object):  # pylint: disable=too-many-instance-attributes
+    """The lines of the file at path, decoded with encoding"""
+
+    def __init__(self, path, encoding='utf-8', block_size=BLOCK_SIZE):
+        self.path = path
+        self.encoding = encoding
+        self.block_size = block_size
+        # Kept open to check the size of the mapped file, not the one at path
+        self._file = open(path, 'rb', buffering=0)
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            self._map = mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.truncated = False
+        # _counts[i] is the number of newlines before block i
+        self._counts = _counts_array()
+        self.complete = False
+        self._total = None
+        # The width of the longest line that was read
+        self.max_width = 0
+        # The last line that was looked up, for reading consecutive lines
+        self._last = (0, 0)
+        self._stop = threading.Event()
+        # How many pagers show these lines, and whether get_mapped_lines()
+        # keeps them for reuse.  Without either, they are closed.
+        self.holders = 0
+        self.cached = True
+        self._thread = threading.Thread(target=self._build_index, name='MappedLines')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _build_index(self):
+        """Count the newlines of every block.  The file is read instead of
+        the map, so the indexed pages don't stay mapped."""
+        count = 0
+        buf = b''
+        try:
+            with open(self.path, 'rb') as fobj:
+                while not self._stop.is_set():
+                    data = fobj.read(READ_SIZE)
+                    if not data:
+                        break
+                    buf += data
+                    start = 0
+                    while len(buf) - start >= self.block_size \
+                            and len(self._counts) * self.block_size < self.size:
+                        count += buf.count(b'\n', start, start + self.block_size)
+                        self._counts.append(count)
+                        start += self.block_size
+                    buf = buf[start:]
+        except (IOError, OSError):
+            return
+        if self._stop.is_set():
+            return
+        count += buf.count(b'\n')
+        try:
+            self.check()
+            if self.size and self._map[self.size - 1:self.size] != b'\n':
+                count += 1
+        except (IOError, OSError, ValueError):
+            # Truncated or closed meanwhile
+            return
+        self._total = count
+        self.complete = True
+
+    def wait(self, timeout=None):
+        """Wait until the index is complete"""
+        self._thread.join(timeout)
+        return self.complete
+
+    def stop(self):
+        """Stop building the index"""
+        self._stop.set()
+
+    def close(self):
+        """Stop building the index and release the map and the file"""
+        self._stop.set()
+        self._map.close()
+        self._file.close()
+
+    def check(self):
+        """Raise TruncatedError if the file is shorter than the map now"""
+        if not self.truncated and os.fstat(self._file.fileno()).st_size < self.size:
+            self.truncated = True
+        if self.truncated:
+            raise TruncatedError("%s was truncated" % self.path)
+
+    def __len__(self):
+        if self._total is not None:
+            return self._total
+        return self._counts[-1]
+
+    def _find_start(self, n):
+        """Returns the offset where line n starts, or None"""
+        last_n, last_start = self._last
+        if last_n <= n < last_n + 64:
+            pos = last_start
+            skip = n - last_n
+        else:
+            block = max(0, bisect_left(self._counts, n) - 1)
+            pos = block * self.block_size
+            skip = n - self._counts[block]
+        for _ in range(skip):
+            pos = self._map.find(b'\n', pos)
+            if pos < 0:
+                return None
+            pos += 1
+        if pos >= self.size and (n or not self.size):
+            return None
+        return pos
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[i] for i in range(*n.indices(len(self)))]
+        if n < 0:
+            n += len(self)
+        if n < 0 or (self._total is not None and n >= self._total):
+            raise IndexError(n)
+        self.check()
+        start = self._find_start(n)
+        if start is None:
+            raise IndexError(n)
+        self._last = (n, start)
+        end = self._map.find(b'\n', start)
+        if end < 0:
+            end = self.size
+        line = self._map[start:end].decode(self.encoding, 'replace')
+        if len(line) > self.max_width:
+            self.max_width = len(line)
+        return line
+
+    def __iter__(self):
+        i = 0
+        while True:
+            try:
+                yield self[i]
+            except IndexError:
+                return
+            i += 1
+
+
+_MAPPED = OrderedDict()
+_MAPPED_LOCK = threading.Lock()
+
+
+def get_mapped_lines(path, encoding='utf-8'):
+    """Returns the MappedLines of the regular file at path, reusing the ones
+    of files which didn't change.  Raises OSError or ValueError if the file
+    can't be mapped.
+
+    Every call must be followed by one call of release_mapped_lines() once
+    the lines aren't used anymore.
+    """
+    stat = os.stat(path)
+    key = (path, encoding, stat.st_size, stat.st_mtime, stat.st_ino)
+    with _MAPPED_LOCK:
+        lines = _MAPPED.pop(key, None)
+        if lines is not None and lines.truncated:
+            _uncache(lines)
+            lines = None
+        if lines is None:
+            lines = MappedLines(path, encoding)
+        _MAPPED[key] = lines
+        lines.holders += 1
+        while len(_MAPPED) > MAX_MAPPED_FILES:
+            _uncache(_MAPPED.popitem(last=False)[1])
+    return lines
+
+
+def release_mapped_lines(lines):
+    """The caller of get_mapped_lines() doesn't use lines anymore"""
+    with _MAPPED_LOCK:
+        lines.holders -= 1
+        if lines.cached and lines.truncated:
+            # Can't be read anymore, so there's no point in keeping it
+            for key, cached in list(_MAPPED.items()):
+                if cached is lines:
+                    del _MAPPED[key]
+            _uncache(lines)
+        elif lines.holders <= 0 and not lines.cached:
+            lines.close()
+
+
+def _uncache(lines):
+    """Evict lines from the reuse cache, closing them if nobody uses them"""
+  
+    lines.cached = False
+    lines.stop()
+    if lines.holders <= 0:
+        lines.close()
@@ -6,13 +6,25 @@ from __future__ import (absolute_import, division, print_function)
 import os
 import stat
 import sys
+import hashlib
 from shutil import (_samefile, rmtree, _basename, _destinsrc, Error, SpecialFileError)
 from ranger.ext.safe_path import get_safe_path
 
 __all__ = ["copyfileobj", "copyfile", "copystat", "copy2", "BLOCK_SIZE",
-           "copytree", "move", "rmtree", "Error", "SpecialFileError"]
+           "copytree", "move", "movefile", "movetree", "rmtree", "Error",
+           "SpecialFileError", "ChecksumError", "CHECKSUM_MISMATCH"]
 
 BLOCK_SIZE = 16 * 1024
+# The chunk size of ranger.ext.hash.hash_chunks
+VERIFY_BLOCK_SIZE = 64 * 1024
+CHECKSUM_MISMATCH = "checksum mismatch"
+
+
+class ChecksumError(Error):
+    """The data read back from a copy differs from the data written to it"""
+
+    def __init__(self, src, dst):
+        Error.__init__(self, [(src, dst, CHECKSUM_MISMATCH)])
 
 
 if sys.version_info < (3, 3):
@@ -97,20 +109,64 @@ else:
             pass
 
 
-def copyfileobj(fsrc, fdst, length=BLOCK_SIZE):
-    """copy data from file-like object fsrc to file-like object fdst"""
+def copyfileobj(fsrc, fdst, length=BLOCK_SIZE, hasher=None):
+    """copy data from file-like object fsrc to file-like object fdst
+
+    If a hashlib object is given as hasher, it's updated with the data.
+    """
     done = 0
     while 1:
         buf = fsrc.read(length)
         if not buf:
             break
         fdst.write(buf)
+        if hasher is not None:
+            hasher.update(buf)
         done += len(buf)
         yield done
 
 
-def copyfile(src, dst):
-    """Copy data from src to dst"""
+def _drop_cache(fd):
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)  # pylint: disable=no-member
+        except OSError:
+            pass
+
+
+def verify_checksum(src, dst, hasher, done=0):
+    """Read dst back and compare it to the data that was hashed by hasher.
+
+    The file is expected to be synced to the disk already.  Its pages are
+    dropped from the page cache before reading, where supported, so the data
+    is really read from the disk.  Raises a ChecksumError on mismatch.
+    Yields done after every chunk to stay interruptible.
+
+    """
+    check = hashlib.new(hasher.name)
+    fd = os.open(dst, os.O_RDONLY)
+    try:
+        _drop_cache(fd)
+        while 1:
+            buf = os.read(fd, VERIFY_BLOCK_SIZE)
+            if not buf:
+                break
+            check.update(buf)
+            yield done
+        _drop_cache(fd)
+    finally:
+        os.close(fd)
+    if check.digest() != hasher.digest():
+        raise ChecksumError(src, dst)
+
+
+def copyfile(src, dst, hasher=None):
+    """Copy data from src to dst
+
+    If a hashlib object is given as hasher, the data is hashed while copying
+    and dst is read back and compared afterwards.
+
+    """
     if _samefile(src, dst):
         raise Error("`%s` and `%s` are the same file" % (src, dst))
 
@@ -125,17 +181,34 @@ def copyfile(src, dst):
             if stat.S_ISFIFO(st.st_mode):
                 raise SpecialFileError("`%s` is a named pipe" % fn)
 
+    done = 0
     with open(src, 'rb') as fsrc:
         with open(dst, 'wb') as fdst:
-            for done in copyfileobj(fsrc, fdst):
+            for done in copyfileobj(fsrc, fdst, hasher=hasher):
                 yield done
+            if hasher is not None:
+                fdst.flush()
+                os.fsync(fdst.fileno())
+    if hasher is not None:
+        for done in verify_checksum(src, dst, hasher, done):
+            yield done
 
 
-def copy2(src, dst, overwrite=False, symlinks=False, make_safe_path=get_safe_path):
+def copy2(src, dst, overwrite=False, symlinks=False,  # pylint: disable=too-many-arguments
+          make_safe_path=get_safe_path, skip=None, on_done=None, on_verified=None):
     """Copy data and all stat info ("cp -p src dst").
 
     The destination may be a directory.
 
+    The optional skip argument is a callable.  If skip(src, dst) returns
+    true, the file is considered copied already and left alone.  The
+    optional on_done argument is called with (src, dst) once a regular file
+    has been copied or skipped.
+
+    If on_verified is given, the data is hashed with sha256 while copying,
+    the copy is read back and compared, and on_verified is called with
+    (src, dst, hexdigest).  A ChecksumError is raised on mismatch.
+
     """
     if os.path.isdir(dst):
         dst = os.path.join(dst, os.path.basename(src))
@@ -146,14 +219,24 @@ def copy2(src, dst, overwrite=False, symlinks=False, make_safe_path=get_safe_pat
         if overwrite and os.path.lexists(dst):
             os.unlink(dst)
         os.symlink(linkto, dst)
+    elif skip is not None and skip(src, dst):
+        yield os.path.getsize(src)
+        if on_done is not None:
+            on_done(src, dst)
     else:
-        for done in copyfile(src, dst):
+        hasher = None if on_verified is None else hashlib.sha256()
+        for done in copyfile(src, dst, hasher=hasher):
             yield done
         copystat(src, dst)
+        if hasher is not None:
+            on_verified(src, dst, hasher.hexdigest())
+        if on_done is not None:
+            on_done(src, dst)
 
 
-def copytree(src, dst,  # pylint: disable=too-many-locals,too-many-branches
-             symlinks=False, ignore=None, overwrite=False, make_safe_path=get_safe_path):
+def copytree(src, dst,  # pylint: disable=too-many-locals,too-many-branches,too-many-arguments
+             symlinks=False, ignore=None, overwrite=False, make_safe_path=get_safe_path,
+             skip=None, on_done=None, on_verified=None):
     """Recursively copy a directory tree using copy2().
 
     The destination directory must not already exist.
@@ -176,6 +259,9 @@ def copytree(src, dst,  # pylint: disable=too-many-locals,too-many-branches
     list of names relative to the `src` directory that should
     not be copied.
 
+    The optional skip, on_done and on_verified arguments are passed on to
+    copy2().
+
     XXX Consider this example code rather than the ultimate tool.
 
     """
@@ -208,14 +294,16 @@ def copytree(src, dst,  # pylint: disable=too-many-locals,too-many-branches
             elif os.path.isdir(srcname):
                 n = 0
                 for n in copytree(srcname, dstname, symlinks, ignore, overwrite,
-                                  make_safe_path):
+                                  make_safe_path, skip=skip, on_done=on_done,
+                                  on_verified=on_verified):
                     yield done + n
                 done += n
             else:
                 # Will raise a SpecialFileError for unsupported file types
                 n = 0
                 for n in copy2(srcname, dstname, overwrite=overwrite, symlinks=symlinks,
-                               make_safe_path=make_safe_path):
+                               make_safe_path=make_safe_path, skip=skip,
+                               on_done=on_done, on_verified=on_verified):
                     yield done + n
                 done += n
         # catch the Error from the recursive copytree so that we can
@@ -232,7 +320,111 @@ def copytree(src, dst,  # pylint: disable=too-many-locals,too-many-branches
         raise Error(errors)
 
 
-def move(src, dst, overwrite=False, make_safe_path=get_safe_path):
+def _verify_copy(src, dst):
+    """Raise an Error if dst doesn't look like a complete copy of src"""
+    src_size = os.path.getsize(src)
+    dst_size = os.path.getsize(dst)
+    if src_size != dst_size:
+        raise Error([(src, dst, "incomplete copy (%d of %d bytes), keeping the source"
+                      % (dst_size, src_size))])
+
+
+def movefile(src, dst, skip=None, on_done=None, on_verified=None):
+    """Move a single file by copying it to dst and removing the source.
+
+    Unlike move(), dst is the final path and is overwritten if it exists.
+    The source is only removed once the copy has been verified.  If the
+    generator is closed in the middle of the file, the partial copy is
+    removed and the source stays intact.  With on_verified, the copy is
+    verified by checksum as described in copy2().
+
+    """
+    if os.path.islink(src):
+        for done in copy2(src, dst, overwrite=True, symlinks=True):
+            yield done
+    elif skip is not None and skip(src, dst):
+        yield os.path.getsize(src)
+    else:
+        try:
+            for done in copy2(src, dst, overwrite=True, symlinks=True,
+                              on_verified=on_verified):
+                yield done
+        except GeneratorExit:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            raise
+        _verify_copy(src, dst)
+        if on_done is not None:
+            on_done(src, dst)
+    os.unlink(src)
+
+
+def movetree(src, dst,  # pylint: disable=too-many-locals,too-many-branches,too-many-arguments
+             overwrite=False, make_safe_path=get_safe_path, skip=None, on_done=None,
+             on_verified=None):
+    """Recursively move a directory tree one file at a time using movefile().
+
+    This is used when src and dst are on different file systems.  Every file
+    is removed from the source as soon as it has been copied, and emptied
+    source directories are removed as well, so at no point more than one
+    file exists twice.  If the generator is closed, the files that were
+    moved so far stay at dst and the rest stays at src.
+
+    If exception(s) occur, an Error is raised with a list of reasons.
+
+    """
+    names = os.listdir(src)
+
+    try:
+        os.makedirs(dst)
+    except OSError:
+        if not overwrite:
+            dst = make_safe_path(dst)
+            os.makedirs(dst)
+    errors = []
+    done = 0
+    for name in names:
+        srcname = os.path.join(src, name)
+        dstname = os.path.join(dst, name)
+        try:
+            if os.path.isdir(srcname) and not os.path.islink(srcname):
+                n = 0
+                for n in movetree(srcname, dstname, overwrite, make_safe_path,
+                                  skip=skip, on_done=on_done,
+                                  on_verified=on_verified):
+                    yield done + n
+                done += n
+            else:
+                if not overwrite:
+                    dstname = make_safe_path(dstname)
+                n = 0
+                for n in movefile(srcname, dstname, skip=skip, on_done=on_done,
+                                  on_verified=on_verified):
+                    yield done + n
+                done += n
+        # catch the Error from the recursive movetree so that we can
+        # continue with other files
+        except Error as err:
+            errors.extend(err.args[0])
+        except EnvironmentError as why:
+            errors.append((srcname, dstname, str(why)))
+    try:
+        copystat(src, dst)
+    except OSError as why:
+        errors.append((src, dst, str(why)))
+    if not errors:
+        try:
+            os.rmdir(src)
+        except OSError as why:
+            errors.append((src, dst, str(why)))
+    if errors:
+        raise Error(errors)
+
+
+def move(src, dst, overwrite=False,  # pylint: disable=too-many-arguments
+         make_safe_path=get_safe_path, skip=None, on_done=None, on_verified=None):
     """Recursively move a file or directory to another location. This is
     similar to the Unix "mv" command.
 
@@ -244,10 +436,14 @@ def move(src, dst, overwrite=False, make_safe_path=get_safe_path):
     overwritten depending on os.rename() semantics.
 
     If the destination is on our current filesystem, then rename() is used.
-    Otherwise, src is copied to the destination and then removed.
+    Otherwise, src is moved file by file with movetree() or movefile(), so
+    each file is removed right after it has been copied.
     A lot more could be done here...  A look at a mv.c shows a lot of
     the issues this implementation glosses over.
 
+    The optional skip, on_done and on_verified arguments are passed on to
+    movefile() when the files have to be copied.
+
     """
     real_dst = dst
     if os.path.isdir(dst):
@@ -266,12 +462,11 @@ def move(src, dst, overwrite=False, make_safe_path=get_safe_path):
         if os.path.isdir(src):
             if _destinsrc(src, dst):
                 raise Error("Cannot move a directory '%s' into itself '%s'." % (src, dst))
-            for done in copytree(src, real_dst, symlinks=True, overwrite=overwrite,
-                                 make_safe_path=make_safe_path):
+            for done in movetree(src, real_dst, overwrite=overwrite,
+                                 make_safe_path=make_safe_path, skip=skip,
+                                 on_done=on_done, on_verified=on_verified):
                 yield done
-            rmtree(src)
         else:
-            for done in copy2(src, real_dst, symlinks=True, overwrite=overwrite,
-                              make_safe_path=make_safe_path):
+            for done in movefile(src, real_dst, skip=skip, on_done=on_done,
+                                 on_verified=on_verified):
                 yield done
-            os.unlink(src)
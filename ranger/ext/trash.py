@@ -0,0 +1,315 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""An implementation of the freedesktop.org trash specification.
+
+See https://specifications.freedesktop.org/trash-spec/trashspec-latest.html
+
+Files are moved into the trash directory on the same device whenever
+possible: the home trash ($XDG_DATA_HOME/Trash) for files on the same file
+system as the home trash, otherwise $topdir/.Trash/$uid or
+$topdir/.Trash-$uid of the file's mount point.  Every trashed file gets a
+.trashinfo file in the info/ subdirectory which records the original path
+and the deletion date.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import errno
+import os
+import stat
+from io import open
+from time import strftime
+
+from ranger.ext.fsencoding import fsdecode, fsencode
+from ranger.ext.mount_path import mount_path
+
+try:
+    from urllib.parse import quote, unquote_to_bytes
+except ImportError:
+    from urllib import quote, unquote as unquote_to_bytes  # pylint: disable=ungrouped-imports
+
+INFO_SUFFIX = '.trashinfo'
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class TrashError(Exception):
+    pass
+
+
+def home_trash_path():
+    """Return the path of the home trash"""
+    data_home = os.environ.get('XDG_DATA_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(data_home, 'Trash')
+
+
+def _existing_device(path):
+    """Return the device of path or of its nearest existing parent"""
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise
+            path = parent
+
+
+class TrashInfo(object):  # pylint: disable=too-few-public-methods
+    """The contents of a .trashinfo file"""
+
+    def __init__(self, path, deletion_date):
+        self.path = path
+        self.deletion_date = deletion_date
+
+    @classmethod
+    def parse(cls, fobj, topdir=None):
+        path = None
+        deletion_date = None
+        in_section = False
+        for line in fobj:
+            line = line.strip()
+            if line.startswith('['):
+                in_section = line == '[Trash Info]'
+            elif in_section and line.startswith('Path='):
+                path = fsdecode(unquote_to_bytes(line[5:]))
+            elif in_section and line.startswith('DeletionDate='):
+                deletion_date = line[13:]
+        if path is None:
+            return None
+        if topdir is not None and not os.path.isabs(path):
+            path = os.path.join(topdir, path)
+        return cls(path, deletion_date)
+
+    def format(self, topdir=None):
+        path = self.path
+        if topdir is not None:
+            path = os.path.relpath(path, topdir)
+        return u'[Trash Info]\nPath={0}\nDeletionDate={1}\n'.format(
+            quote(fsencode(path), safe='/'), self.deletion_date)
+
+
+class TrashDir(object):
+    """A trash directory with its files/ and info/ subdirectories
+
+    topdir is the mount point for trash directories on other file systems
+    than the home trash.  Their .trashinfo files store paths relative to it.
+    """
+
+    def __init__(self, path, topdir=None):
+        self.path = path
+        self.topdir = topdir
+        self.files_path = os.path.join(path, 'files')
+        self.info_path = os.path.join(path, 'info')
+        self._index = {}
+        self._index_mtime = None
+
+    def __repr__(self):
+        return "<TrashDir {0}>".format(self.path)
+
+    def create(self):
+        for path in (self.path, self.files_path, self.info_path):
+            try:
+                os.makedirs(path, 0o700)
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+
+    def reserve(self, path, deletion_date=None):
+        """Create the .trashinfo file for path and return the target path
+
+        The .trashinfo file is created exclusively, so concurrent trashers
+        never pick the same name.  The file has to be moved to the returned
+        path afterwards.
+        """
+        if deletion_date is None:
+            deletion_date = strftime(DATE_FORMAT)
+        content = TrashInfo(path, deletion_date).format(self.topdir)
+        basename = os.path.basename(path)
+        name = basename
+        counter = 1
+        while True:
+            info_file = os.path.join(self.info_path, name + INFO_SUFFIX)
+            if not os.path.lexists(os.path.join(self.files_path, name)):
+                try:
+                    fd = os.open(info_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                except OSError as ex:
+                    if ex.errno != errno.EEXIST:
+                        raise
+                else:
+                    with open(fd, 'w', encoding='utf-8') as fobj:
+                        fobj.write(content)
+                    return os.path.join(self.files_path, name)
+            name = '{0}_{1}'.format(basename, counter)
+            counter += 1
+
+    def unreserve(self, trashed_path):
+        """Remove the .trashinfo file belonging to a path in files/"""
+        try:
+            os.remove(self.info_file(trashed_path))
+        except OSError:
+            pass
+
+    def info_file(self, trashed_path):
+        return os.path.join(self.info_path, os.path.basename(trashed_path) + INFO_SUFFIX)
+
+    def put(self, path, deletion_date=None):
+        """Move path into the trash with a single rename
+
+        Returns the path inside files/.  Raises OSError if the path can't be
+        renamed, e.g. because it's on another device.
+        """
+        target = self.reserve(path, deletion_date)
+        try:
+            os.rename(path, target)
+        except OSError:
+            self.unreserve(target)
+            raise
+        return target
+
+    def index(self):
+        """Return a dict mapping the names in files/ to their TrashInfo
+
+        The index is cached and only updated for new or removed .trashinfo
+        files when the info/ directory changes.
+        """
+        try:
+            mtime = os.stat(self.info_path).st_mtime
+        except OSError:
+            self._index = {}
+            self._index_mtime = None
+            return self._index
+        if mtime == self._index_mtime:
+            return self._index
+        index = {}
+        for info_name in os.listdir(self.info_path):
+            if not info_name.endswith(INFO_SUFFIX):
+                continue
+            name = info_name[:-len(INFO_SUFFIX)]
+            if name in self._index:
+                index[name] = self._index[name]
+                continue
+            try:
+                with open(os.path.join(self.info_path, info_name), 'r',
+                          encoding='utf-8', errors='replace') as fobj:
+                    info = TrashInfo.parse(fobj, self.topdir)
+            except (OSError, IOError):
+                continue
+            if info is not None:
+                index[name] = info
+        self._index = index
+        self._index_mtime = mtime
+        return index
+
+    def restore(self, trashed_path, dest=None):
+        """Move a file from files/ back to its original path with rename
+
+        Returns the restored path.  Raises TrashError if there's nothing to
+        restore or if the original path is occupied, OSError if the rename
+        fails.
+        """
+        if dest is None:
+            info = self.index().get(os.path.basename(trashed_path))
+            if info is None:
+                raise TrashError("No trash info for %s" % trashed_path)
+            dest = info.path
+        if os.path.lexists(dest):
+            raise TrashError("Can't restore %s: file already exists!" % dest)
+        try:
+            os.makedirs(os.path.dirname(dest))
+        except OSError:
+            pass
+        os.rename(trashed_path, dest)
+        self.unreserve(trashed_path)
+        return dest
+
+
+class Trash(object):
+    """Finds the right trash directory for a path and caches them per device"""
+
+    def __init__(self, uid=None):
+        self.uid = os.getuid() if uid is None else uid
+        self.home = TrashDir(home_trash_path())
+        self._by_device = {}
+        self._trash_dirs = {}
+
+    def _topdir_trash(self, topdir):
+        """Return the trash directory of a mount point or None if unusable"""
+        shared = os.path.join(topdir, '.Trash')
+        try:
+            shared_stat = os.lstat(shared)
+        except OSError:
+            pass
+        else:
+            if stat.S_ISDIR(shared_stat.st_mode) and shared_stat.st_mode & stat.S_ISVTX:
+                trash_dir = TrashDir(os.path.join(shared, str(self.uid)), topdir)
+                try:
+                    trash_dir.create()
+                except OSError:
+                    pass
+                else:
+                    return trash_dir
+        trash_dir = TrashDir(os.path.join(topdir, '.Trash-%d' % self.uid), topdir)
+        try:
+            trash_dir.create()
+            own_stat = os.lstat(trash_dir.path)
+        except OSError:
+            return None
+        if not stat.S_ISDIR(own_stat.st_mode) or own_stat.st_uid != self.uid:
+            return None
+        return trash_dir
+
+    def trash_dir_for(self, path):
+        """Return (trash_dir, same_device) for the given path
+
+        Falls back to the home trash on another device if the mount point
+        has no usable trash directory.
+        """
+        device = os.lstat(path).st_dev
+        try:
+            return self._by_device[device], True
+        except KeyError:
+            pass
+        trash_dir = None
+        if _existing_device(self.home.path) == device:
+            trash_dir = self.home
+        else:
+            trash_dir = self._topdir_trash(mount_path(os.path.dirname(path)))
+        if trash_dir is None:
+            return self.home, False
+        self._by_device[device] = trash_dir
+        return trash_dir, True
+
+    def trash_dirs(self):
+        """Return the home trash and all known trash directories of mounts"""
+        result = [self.home]
+        result.extend(trash_dir for trash_dir in self._by_device.values()
+                      if trash_dir is not self.home)
+        return result
+
+    def trash_dir_of(self, trashed_path):
+        """Return the TrashDir that contains trashed_path in its files/"""
+        files_path = os.path.dirname(trashed_path)
+        if os.path.basename(files_path) != 'files':
+            return None
+        path = os.path.dirname(files_path)
+        try:
+            return self._trash_dirs[path]
+        except KeyError:
+            pass
+        if not os.path.isdir(os.path.join(path, 'info')):
+            return None
+        if path == self.home.path:
+            trash_dir = self.home
+        else:
+            trash_dir = TrashDir(path, mount_path(path))
+        self._trash_dirs[path] = trash_dir
+        return trash_dir
+
+    def info(self, trashed_path):
+        """Return the TrashInfo of a path inside a files/ directory or None"""
+        trash_dir = self.trash_dir_of(trashed_path)
+        if trash_dir is None:
+            return None
+        return trash_dir.index().get(os.path.basename(trashed_path))
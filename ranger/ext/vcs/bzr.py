@@ -103,7 +103,10 @@ class Bzr(Vcs):
 
         return 'sync'
 
-    def data_status_subpaths(self):
+    def data_status_subpaths(self, paths=None):
+        if paths is not None:
+            return None
+
         statuses = {}
 
         # Ignored
@@ -143,3 +146,16 @@ class Bzr(Vcs):
             return log[0]
         else:
             raise VcsError('More than one instance of revision {0:s}'.format(rev))
+
+    def data_state_paths(self):
+        return [
+            self.repodir,
+            os.path.join(self.repodir, 'checkout', 'dirstate'),
+            os.path.join(self.repodir, 'branch', 'last-revision'),
+        ]
+
+    def data_state_changes(self, old, new):
+        return None
+
+    def data_modified_paths(self, relpath):
+        return None
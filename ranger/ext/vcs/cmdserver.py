@@ -0,0 +1,184 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Persistent Mercurial command servers
+
+Starting hg takes a lot longer than most of the queries ranger makes.  A
+command server ("hg serve --cmdserver pipe") loads Mercurial once and then
+runs any number of commands, see "hg help internals.cmdserver".  There is
+one server per repository.  It is stopped after it has been idle for
+IDLE_TIMEOUT seconds and started again when it's needed.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import struct
+import subprocess
+import threading
+import time
+from io import open
+
+IDLE_TIMEOUT = 60
+
+HEADER = struct.Struct('>cI')
+LENGTH = struct.Struct('>I')
+RESULT = struct.Struct('>i')
+
+
+class CommandServerError(Exception):
+    """The command server failed or can't be used"""
+
+
+class HgCommandServer(object):
+    """A command server for the repository at root, started on demand"""
+
+    def __init__(self, root, idle_timeout=IDLE_TIMEOUT):
+        self.root = root
+        self.idle_timeout = idle_timeout
+        self.encoding = 'utf-8'
+        self._process = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_used = 0
+        # Don't try again if the server can't even be started
+        self._usable = True
+
+    def _start(self):
+        env = dict(os.environ, HGPLAIN='1')
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            self._process = subprocess.Popen(
+                ['hg', 'serve', '--cmdserver', 'pipe', '--config', 'ui.interactive=False'],
+                cwd=self.root, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=devnull)
+        channel, hello = self._read_message()
+        if channel != b'o':
+            raise CommandServerError("Unexpected hello message")
+        fields = dict(line.split(b': ', 1) for line in hello.split(b'\n') if b': ' in line)
+        if b'runcommand' not in fields.get(b'capabilities', b'').split():
+            raise CommandServerError("The command server can't run commands")
+        self.encoding = fields.get(b'encoding', b'utf-8').decode('ascii')
+
+    def _read_exact(self, size):
+        chunks = []
+        while size > 0:
+            chunk = self._process.stdout.read(size)
+            if not chunk:
+                raise CommandServerError("The command server exited")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _read_message(self):
+        """Returns (channel, data).  For input requests, data is the
+        requested size."""
+        channel, length = HEADER.unpack(self._read_exact(HEADER.size))
+        if channel in (b'I', b'L'):
+            return channel, length
+        return channel, self._read_exact(length)
+
+    def _runcommand(self, args):
+        data = b'\0'.join(arg.encode(self.encoding) for arg in args)
+        self._process.stdin.write(b'runcommand\n' + LENGTH.pack(len(data)) + data)
+        self._process.stdin.flush()
+        output = []
+        errors = []
+        while True:
+            channel, data = self._read_message()
+            if channel == b'o':
+                output.append(data)
+            elif channel == b'e':
+                errors.append(data)
+            elif channel == b'r':
+                return RESULT.unpack(data)[0], b''.join(output), b''.join(errors)
+            elif channel in (b'I', b'L'):
+                # No input is available, an empty answer means EOF
+                self._process.stdin.write(LENGTH.pack(0))
+                self._process.stdin.flush()
+            elif channel.isupper():
+                # Unknown channels in upper case must not be ignored
+                raise CommandServerError("Unsupported channel %r" % channel)
+
+    def runcommand(self, args):
+        """
+        Run hg with args, returns (exit code, output, error output)
+
+        The output is returned as bytes.  Raises CommandServerError if the
+        server couldn't run the command.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            if not self._usable:
+                raise CommandServerError("The command server can't be started")
+            try:
+                if self._process is None or self._process.poll() is not None:
+                    try:
+                        self._start()
+                    except Exception:
+                        self._usable = False
+                        raise
+                return self._runcommand(args)
+            except (CommandServerError, OSError, IOError, ValueError, struct.error) as ex:
+                self._stop()
+                raise CommandServerError(str(ex))
+            finally:
+                self._last_used = time.time()
+                if self._process is not None:
+                    self._timer = threading.Timer(self.idle_timeout, self._expire)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _expire(self):
+        with self._lock:
+            if time.time() - self._last_used >= self.idle_timeout:
+                self._stop()
+
+    def _stop(self):
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            # The server exits at the end of its input
+            process.stdin.close()
+        except (OSError, IOError):
+            pass
+        for _ in range(20):
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+        else:
+            process.terminate()
+        process.wait()
+        process.stdout.close()
+
+    def close(self):
+        """Stop the server"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._stop()
+
+
+SERVERS = {}
+SERVERS_LOCK = threading.Lock()
+
+
+def get_server(root):
+    """Returns the command server of the repository at root"""
+    with SERVERS_LOCK:
+        try:
+            return SERVERS[root]
+        except KeyError:
+            server = SERVERS[root] = HgCommandServer(root)
+            return server
+
+
+def close_servers():
+    """Stop all command servers"""
+    with SERVERS_LOCK:
+        servers = list(SERVERS.values())
+        SERVERS.clear()
+    for server in servers:
+        server.close()
@@ -6,10 +6,13 @@
 from __future__ import (absolute_import, division, print_function)
 
 from datetime import datetime
+from io import open
 import os
 import re
 import unicodedata
 
+from .gitindex import GitIndex, GitIndexError, stat_key
+from .gitrefs import GitRefs, GitRefsError
 from .vcs import Vcs, VcsError
 
 
@@ -34,17 +37,114 @@ class Git(Vcs):
         ('!', '!', 'ignored'),
     )
 
-    # Generic
+    # More paths than this are updated by querying the whole status
+    MAX_PATHSPECS = 256
+
+    # The parsed index and the stat data of the paths git was asked about
+    # since it was read, so the same racy or unrefreshed files aren't
+    # queried over and over.  The last parsed index is kept even when
+    # _index is reset, to be reused while its checksum stays the same.
+    _index = None
+    _parsed_index = None
+    _verified = None
+
+    # The ref reader and the last info and remote status, which are reused
+    # while the commits they were computed from stay the same
+    _refs = None
+    _head_info = None
+    _remote_status = None
 
-    def _head_ref(self):
-        """Returns HEAD reference"""
-        return self._run(['symbolic-ref', self.HEAD]) or None
+    # Generic
 
-    def _remote_ref(self, ref):
-        """Returns remote reference associated to given ref"""
-        if ref is None:
+    def _git_dirs(self):
+        """Returns the git directory and the directory shared by all worktrees"""
+        gitdir = self.repodir
+        if os.path.isfile(gitdir):
+            # Worktrees and submodules have a file pointing to the git directory
+            try:
+                with open(gitdir, 'r', encoding='utf-8') as fobj:
+                    line = fobj.readline().strip()
+            except (IOError, OSError):
+                line = ''
+            if line.startswith('gitdir: '):
+                gitdir = os.path.normpath(os.path.join(self.root, line[8:]))
+        commondir = gitdir
+        try:
+            with open(os.path.join(gitdir, 'commondir'), 'r', encoding='utf-8') as fobj:
+                commondir = os.path.normpath(os.path.join(gitdir, fobj.readline().strip()))
+        except (IOError, OSError):
+            pass
+        return gitdir, commondir
+
+    def _hash_size(self, commondir):
+        """Returns the size of object ids in the repository"""
+        try:
+            with open(os.path.join(commondir, 'config'), 'r', encoding='utf-8') as fobj:
+                config = fobj.read()
+        except (IOError, OSError):
+            return 20
+        match = re.search(r'^\s*objectformat\s*=\s*sha256\s*$', config,
+                          flags=re.MULTILINE | re.IGNORECASE)  # pylint: disable=no-member
+        return 32 if match else 20
+
+    def _load_index(self):
+        """Reads the index, returns None if it can't be used"""
+        gitdir, commondir = self._git_dirs()
+        try:
+            self._index = GitIndex.read(os.path.join(gitdir, 'index'),
+                                        self._hash_size(commondir), self._parsed_index)
+        except GitIndexError:
+            self._index = None
+        self._parsed_index = self._index
+        self._verified = {}
+        return self._index
+
+    def _get_refs(self):
+        """Returns the GitRefs of the repository or None if git must be asked"""
+        gitdir, commondir = self._git_dirs()
+        refs = self._refs
+        if refs is None or refs.gitdir != gitdir or refs.commondir != commondir:
+            try:
+                refs = GitRefs(gitdir, commondir)
+            except GitRefsError:
+                refs = None
+            self._refs = refs
+        return refs
+
+    def _rev_parse(self, ref):
+        try:
+            return self._run(['rev-parse', '--verify', '-q', ref]) or None
+        except VcsError:
             return None
-        return self._run(['for-each-ref', '--format=%(upstream)', ref]) or None
+
+    def _head(self):
+        """Returns (HEAD reference or None if detached, commit hash or None)"""
+        refs = self._get_refs()
+        if refs is not None:
+            try:
+                return refs.head()
+            except GitRefsError:
+                pass
+        try:
+            ref = self._run(['symbolic-ref', '-q', self.HEAD]) or None
+        except VcsError:
+            ref = None
+        return ref, self._rev_parse(self.HEAD)
+
+    def _upstream(self, ref):
+        """Returns (remote reference associated to given ref, commit hash)"""
+        refs = self._get_refs()
+        if refs is not None:
+            try:
+                remote = refs.upstream(ref)
+                return remote, remote and refs.resolve(remote)[1]
+            except GitRefsError:
+                pass
+        try:
+            remote = self._run(['for-each-ref', '--format=%(upstream)', ref]) or None
+        except VcsError:
+            remote = None
+        return remote, remote and self._rev_parse(remote)
 
     def _log(self, refspec=None, maxres=None, filelist=None):
         """Returns an array of dicts containing revision info for refspec"""
@@ -82,6 +182,41 @@ class Git(Vcs):
                 return status
         return 'unknown'
 
+    def _status_entries(self, ignored=False, pathspecs=None):
+        """Yields (path, status) for all paths not in sync
+
+        Parses the output of a single "git status --porcelain=v2" while it is
+        running.  With ignored, ignored files and directories are included.
+        Directories are reported with a trailing slash.
+        """
+        args = ['status', '--porcelain=v2', '-z', '--untracked-files=normal',
+                '--ignored' if ignored else '--ignored=no']
+        if pathspecs:
+            args += ['--'] + pathspecs
+        records = self._run_records(args)
+        for record in records:
+            kind = record[:1]
+            if kind == '1':
+                # 1 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <path>
+                fields = record.split(' ', 8)
+            elif kind == '2':
+                # 2 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <X><score> <path>\0<origPath>
+                fields = record.split(' ', 9)
+                next(records, None)
+            elif kind == 'u':
+                # u <XY> <sub> <m1> <m2> <m3> <mW> <h1> <h2> <h3> <path>
+                fields = record.split(' ', 10)
+            elif kind == '?':
+                yield record[2:], 'untracked'
+                continue
+            elif kind == '!':
+                yield record[2:], 'ignored'
+                continue
+            else:
+                continue
+            # Porcelain v2 uses "." instead of " " for unmodified
+            yield fields[-1], self._status_translate(fields[1].replace('.', ' '))
+
     # Action interface
 
     def action_add(self, filelist=None):
@@ -99,20 +234,9 @@ class Git(Vcs):
     # Data Interface
 
     def data_status_root(self):
-        statuses = set()
-
-        # Paths with status
-        skip = False
-        lines = self._run(['status', '--porcelain', '-z']).split('\0')[:-1]
-        if not lines:
+        statuses = set(status for _, status in self._status_entries())
+        if not statuses:
             return 'sync'
-        for line in lines:
-            if skip:
-                skip = False
-                continue
-            statuses.add(self._status_translate(line[:2]))
-            if line.startswith('R'):
-                skip = True
 
         for status in self.DIRSTATUSES:
             if status in statuses:
@@ -120,60 +244,65 @@ class Git(Vcs):
 
         return 'sync'
 
-    def data_status_subpaths(self):
-        statuses = {}
-
-        # Ignored directories
-        paths = self._run([
-            'ls-files', '-z', '--others', '--directory', '--ignored', '--exclude-standard'
-        ]).split('\0')[:-1]
-        for path in paths:
-            if path.endswith('/'):
-                statuses[os.path.normpath(path)] = 'ignored'
-
-        # Empty directories
-        paths = self._run(
-            ['ls-files', '-z', '--others', '--directory', '--exclude-standard']).split('\0')[:-1]
-        for path in paths:
-            if path.endswith('/'):
-                statuses[os.path.normpath(path)] = 'none'
-
-        # Paths with status
-        lines = self._run(['status', '--porcelain', '-z', '--ignored']).split('\0')[:-1]
-        skip = False
-        for line in lines:
-            if skip:
-                skip = False
-                continue
-            statuses[os.path.normpath(line[3:])] = self._status_translate(line[:2])
-            if line.startswith('R'):
-                skip = True
+    def data_status_subpaths(self, paths=None):
+        if paths is None:
+            # git status refreshes the index, so read it again when needed
+            self._index = None
+        elif len(paths) > self.MAX_PATHSPECS:
+            return None
+        else:
+            pathspecs = []
+            for path in paths:
+                if path.endswith('/'):
+                    # Only the entries directly inside the directory
+                    pattern = re.sub(r'([*?[\\])', r'\\\1', path.lstrip('/'))
+                    pathspecs.append(':(glob)' + pattern + '*')
+                else:
+                    pathspecs.append(':(literal)' + path)
 
+        statuses = {}
+        for path, status in self._status_entries(
+                ignored=True, pathspecs=None if paths is None else pathspecs):
+            statuses[os.path.normpath(path)] = status
+
+        if paths is not None and self._verified is not None:
+            for path in paths:
+                if not path.endswith('/'):
+                    try:
+                        self._verified[path] = stat_key(os.lstat(os.path.join(self.path, path)))
+                    except OSError:
+                        self._verified[path] = None
         return statuses
 
     def data_status_remote(self):
-        try:
-            head = self._head_ref()
-            remote = self._remote_ref(head)
-        except VcsError:
-            head = remote = None
-        if not head or not remote:
+        head, head_hash = self._head()
+        if not head or not head_hash:
+            return 'none'
+        remote, remote_hash = self._upstream(head)
+        if not remote or not remote_hash:
             return 'none'
 
-        output = self._run(['rev-list', '--left-right', '{0:s}...{1:s}'.format(remote, head)])
-        # pylint: disable=no-member
-        ahead = re.search(r'^>', output, flags=re.MULTILINE)
-        behind = re.search(r'^<', output, flags=re.MULTILINE)
-        # pylint: enable=no-member
-        if ahead:
-            return 'diverged' if behind else 'ahead'
-        return 'behind' if behind else 'sync'
+        commits = (head_hash, remote_hash)
+        if self._remote_status is not None and self._remote_status[0] == commits:
+            return self._remote_status[1]
+        if head_hash == remote_hash:
+            status = 'sync'
+        else:
+            output = self._run(['rev-list', '--left-right', '--count',
+                                '{0:s}...{1:s}'.format(remote_hash, head_hash)])
+            try:
+                behind, ahead = (int(count) for count in output.split())
+            except ValueError:
+                raise VcsError('Unexpected output of rev-list: {0:s}'.format(output))
+            if ahead:
+                status = 'diverged' if behind else 'ahead'
+            else:
+                status = 'behind' if behind else 'sync'
+        self._remote_status = (commits, status)
+        return status
 
     def data_branch(self):
-        try:
-            head = self._head_ref()
-        except VcsError:
-            head = None
+        head, _ = self._head()
         if head is None:
             return 'detached'
 
@@ -183,14 +312,58 @@ class Git(Vcs):
     def data_info(self, rev=None):
         if rev is None:
             rev = self.HEAD
+        if rev == self.HEAD:
+            _, commit_hash = self._head()
+            if commit_hash is None:
+                return None
+            if self._head_info is not None and self._head_info[0] == commit_hash:
+                return self._head_info[1]
+            log = self._log(refspec=commit_hash)
+            info = log[0] if log else None
+            self._head_info = (commit_hash, info)
+            return info
 
         log = self._log(refspec=rev)
         if not log:
-            if rev == self.HEAD:
-                return None
-            else:
-                raise VcsError('Revision {0:s} does not exist'.format(rev))
+            raise VcsError('Revision {0:s} does not exist'.format(rev))
         elif len(log) == 1:
             return log[0]
         else:
             raise VcsError('More than one instance of revision {0:s}'.format(rev))
+
+    def data_state_paths(self):
+        gitdir, commondir = self._git_dirs()
+        # Git replaces refs and the index by renaming lock files, which
+        # changes the mtime of their directories too
+        paths = [
+            gitdir,
+            os.path.join(gitdir, 'index'),
+            os.path.join(gitdir, 'HEAD'),
+            os.path.join(commondir, 'packed-refs'),
+        ]
+        paths.extend(dirpath for dirpath, _, _ in os.walk(os.path.join(commondir, 'refs')))
+        return paths
+
+    def data_state_changes(self, old, new):
+        gitdir, _ = self._git_dirs()
+        index_paths = (gitdir, os.path.join(gitdir, 'index'))
+        changed = set(path for path in set(old) | set(new) if old.get(path) != new.get(path))
+        previous = self._index
+        if previous is None or not changed.issubset(index_paths):
+            return None
+        # Only the index changed, so only paths with changed entries matter
+        index = self._load_index()
+        if index is None:
+            return None
+        if index is previous:
+            # Written again without changes
+            return set()
+        return previous.changed_paths(index)
+
+    def data_modified_paths(self, relpath):
+        index = self._index if self._index is not None else self._load_index()
+        if index is None:
+            return None
+        verified = self._verified
+        return set(path for path, key in index.modified_in(self.path, relpath).items()
+                   if path not in verified or verified[path] != key)
@@ -0,0 +1,280 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Read-only parser for the git index (.git/index), versions 2 to 4
+
+The index caches the stat data of every tracked file.  Comparing it with the
+stat data of the work tree tells which files are certainly unchanged, so git
+only has to be asked about the others.  See gitformat-index(5).
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import stat
+import struct
+from collections import namedtuple
+from io import open
+
+from ranger.ext.lazy_property import lazy_property
+from ranger.ext.spawn import ENCODING
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None  # pylint: disable=invalid-name
+
+HEADER = struct.Struct('>4sLL')
+ENTRY = struct.Struct('>10L')
+FLAGS = struct.Struct('>H')
+EXTENSION = struct.Struct('>4sL')
+
+FLAG_ASSUME_VALID = 0x8000
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE = 0x3000
+FLAG_NAME_LENGTH = 0x0fff
+EXTENDED_SKIP_WORKTREE = 0x4000
+EXTENDED_INTENT_TO_ADD = 0x2000
+
+# Modes of entries which don't correspond to a regular file or symlink
+MODE_GITLINK = 0o160000
+MODE_DIRECTORY = 0o040000
+
+
+class GitIndexError(Exception):
+    """The index can't be read"""
+
+
+class IndexEntry(namedtuple('IndexEntry', (
+        'ctime', 'ctime_ns', 'mtime', 'mtime_ns', 'dev', 'ino', 'mode', 'uid', 'gid',
+        'size', 'sha', 'flags', 'extended_flags'))):
+    """A cached entry of the index"""
+    __slots__ = ()
+
+    @property
+    def stage(self):
+        return (self.flags & FLAG_STAGE) >> 12
+
+    @property
+    def content(self):
+        """What determines the status of this entry, apart from the work tree"""
+        return (self.sha, self.mode, self.flags & ~FLAG_NAME_LENGTH, self.extended_flags)
+
+    def matches(self, path_stat):
+        """Does the stat result of the work tree file match this entry?
+
+        This is a simplified version of git's ie_match_stat().  Like git
+        with core.trustctime disabled, it misses changes that keep the size,
+        mtime and inode of a file.
+        """
+        if self.flags & FLAG_ASSUME_VALID \
+                or self.extended_flags & EXTENDED_SKIP_WORKTREE:
+            return True
+        mode = path_stat.st_mode
+        if stat.S_ISLNK(mode):
+            if self.mode & 0o170000 != 0o120000:
+                return False
+        elif stat.S_ISREG(mode):
+            if self.mode & 0o170000 != 0o100000 or (self.mode ^ mode) & 0o100:
+                return False
+        else:
+            return False
+        if path_stat.st_size & 0xffffffff != self.size \
+                or path_stat.st_ino & 0xffffffff != self.ino:
+            return False
+        mtime_ns = getattr(path_stat, 'st_mtime_ns', None)
+        if mtime_ns is None:
+            return int(path_stat.st_mtime) == self.mtime
+        return mtime_ns // 1000000000 == self.mtime and \
+            (not self.mtime_ns or mtime_ns % 1000000000 == self.mtime_ns)
+
+
+def _varint(data, offset):
+    """Decode the offset varint used by index version 4"""
+    byte = ord(data[offset:offset + 1])
+    offset += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = ord(data[offset:offset + 1])
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, offset
+
+
+class GitIndex(object):  # pylint: disable=too-few-public-methods
+    """
+    The parsed index file
+
+    entries maps the paths, relative to the work tree, to IndexEntry objects
+    of stage 0 or the lowest stage for conflicts.  directories maps every
+    directory (with '' for the top level) to the names of its tracked
+    entries.  extensions maps the signatures of the index extensions to their
+    size.  The untracked cache ("UNTR") and fsmonitor ("FSMN") extensions are
+    only recognized as hints and are not decoded.  checksum is the hash at
+    the end of the file, which changes whenever git writes something else.
+    """
+
+    def __init__(self, version, entries, extensions,  # pylint: disable=too-many-arguments
+                 mtime, checksum=None):
+        self.version = version
+        self.entries = entries
+        self.extensions = extensions
+        self.mtime = mtime
+        self.checksum = checksum
+
+    @lazy_property
+    def directories(self):
+        directories = {}
+        for path in self.entries:
+            dirname, _, basename = path.rpartition('/')
+            directories.setdefault(dirname, []).append(basename)
+        return directories
+
+    @property
+    def untracked_cache(self):
+        return 'UNTR' in self.extensions
+
+    @property
+    def fsmonitor(self):
+        return 'FSMN' in self.extensions
+
+    @classmethod
+    def read(cls, path, hash_size=20, previous=None):
+        """
+        Parse the index at path, raising GitIndexError if it can't be used
+
+        If the file still ends with the checksum of previous, an index read
+        before, previous is returned instead of parsing the file again.
+        """
+        try:
+            with open(path, 'rb') as fobj:
+                path_stat = os.fstat(fobj.fileno())
+                mtime = path_stat.st_mtime
+                if previous is not None and previous.checksum is not None \
+                        and path_stat.st_size >= HEADER.size + hash_size:
+                    fobj.seek(-hash_size, os.SEEK_END)
+                    if fobj.read(hash_size) == previous.checksum:
+                        # Rewritten without changes, mtime matters for racy files
+                        previous.mtime = mtime
+                        return previous
+                    fobj.seek(0)
+                data = fobj.read()
+        except (IOError, OSError) as ex:
+            raise GitIndexError(str(ex))
+        return cls.parse(data, mtime, hash_size)
+
+    @classmethod
+    def parse(cls, data, mtime=None, hash_size=20):  # pylint: disable=too-many-locals
+        """Parse the contents of an index file"""
+        try:
+            signature, version, count = HEADER.unpack_from(data)
+        except struct.error:
+            raise GitIndexError("Truncated index")
+        if signature != b'DIRC' or version not in (2, 3, 4):
+            raise GitIndexError("Unsupported index version %r" % version)
+
+        entries = {}
+        offset = HEADER.size
+        previous = b''
+        sha_end = ENTRY.size + hash_size
+        try:
+            for _ in range(count):
+                start = offset
+                fields = ENTRY.unpack_from(data, offset)
+                sha = data[offset + ENTRY.size:offset + sha_end]
+                flags, = FLAGS.unpack_from(data, offset + sha_end)
+                offset += sha_end + FLAGS.size
+                extended_flags = 0
+                if flags & FLAG_EXTENDED:
+                    extended_flags, = FLAGS.unpack_from(data, offset)
+                    offset += FLAGS.size
+                if version == 4:
+                    strip, offset = _varint(data, offset)
+                    end = data.index(b'\0', offset)
+                    name = previous[:len(previous) - strip] + data[offset:end]
+                    offset = end + 1
+                else:
+                    end = data.index(b'\0', offset)
+                    name = data[offset:end]
+                    # Entries are padded with 1-8 NUL bytes to a multiple of 8
+                    offset = start + ((end - start + 8) & ~7)
+                previous = name
+                mode = fields[6]
+                if mode in (MODE_GITLINK, MODE_DIRECTORY):
+                    continue
+                path = name.decode(ENCODING)
+                entry = IndexEntry(*(fields + (sha, flags, extended_flags)))
+                if path not in entries or entry.stage < entries[path].stage:
+                    entries[path] = entry
+
+            extensions = {}
+            while offset + EXTENSION.size <= len(data) - hash_size:
+                name, size = EXTENSION.unpack_from(data, offset)
+                extensions[name.decode('ascii', 'replace')] = size
+                offset += EXTENSION.size + size
+        except (struct.error, ValueError, TypeError):
+            # UnicodeDecodeError is a ValueError too
+            raise GitIndexError("Corrupt index")
+        if 'link' in extensions:
+            # The entries live in a shared index, we only have the changes
+            raise GitIndexError("Split indexes are not supported")
+        return cls(version, entries, extensions, mtime, data[len(data) - hash_size:])
+
+    def changed_paths(self, other):
+        """Returns the paths whose entries differ between the two indexes,
+        ignoring differences in their cached stat data"""
+        changed = set(self.entries) ^ set(other.entries)
+        for path, entry in self.entries.items():
+            try:
+                if entry.content != other.entries[path].content:
+                    changed.add(path)
+            except KeyError:
+                pass
+        return changed
+
+    def _is_racy(self, path_stat):
+        """Files changed in the same second the index was written could have
+        been modified again without a visible change of their stat data"""
+        return self.mtime is None or path_stat.st_mtime >= self.mtime
+
+    def modified_in(self, workdir, relpath):
+        """
+        Returns the tracked paths in the directory relpath that may have been
+        modified, deleted or replaced since the index was written
+
+        The result maps the paths to a key of their current stat data, or
+        None if they're missing.  Other files are certainly unchanged.  The
+        directory is read with os.scandir(), so this needs one lstat() per
+        tracked file.
+        """
+        names = self.directories.get(relpath)
+        if not names:
+            return {}
+        prefix = relpath + '/' if relpath else ''
+        dirpath = os.path.join(workdir, relpath)
+        candidates = {}
+        found = None
+        if scandir is not None:
+            try:
+                found = dict((entry.name, entry) for entry in scandir(dirpath))
+            except OSError:
+                return dict((prefix + name, None) for name in names)
+        for name in names:
+            path = prefix + name
+            try:
+                if found is not None:
+                    path_stat = found[name].stat(follow_symlinks=False)
+                else:
+                    path_stat = os.lstat(os.path.join(dirpath, name))
+            except (KeyError, OSError):
+                candidates[path] = None
+                continue
+            if not self.entries[path].matches(path_stat) or self._is_racy(path_stat):
+                candidates[path] = stat_key(path_stat)
+        return candidates
+
+
+def stat_key(path_stat):
+    """The parts of a stat result that change when a file is modified"""
+    return (path_stat.st_mtime, path_stat.st_ctime, path_stat.st_size, path_stat.st_ino,
+            path_stat.st_mode)
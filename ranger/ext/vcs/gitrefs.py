@@ -0,0 +1,231 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""Read-only access to git references and configuration
+
+Resolving HEAD, branches and their upstreams only needs a few small files
+(HEAD, loose refs, packed-refs and config), which is a lot cheaper than
+starting git for each of them.  See gitrepository-layout(5).
+
+>>> config = parse_config(u'[branch "main"]\\n\\tremote = origin ; comment\\n'
+...                       u'[remote "origin"]\\n  fetch = "+refs/heads/*:refs/remotes/origin/*"')
+>>> config[('branch', 'main', 'remote')], config[('remote', 'origin', 'fetch')]
+(['origin'], ['+refs/heads/*:refs/remotes/origin/*'])
+>>> map_refspec('+refs/heads/*:refs/remotes/origin/*', 'refs/heads/topic/a')
+'refs/remotes/origin/topic/a'
+>>> map_refspec('refs/heads/main:refs/remotes/origin/main', 'refs/heads/other')
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import re
+from io import open
+
+# Refs which belong to a worktree instead of the shared repository
+PER_WORKTREE_PREFIXES = ('refs/bisect/', 'refs/worktree/', 'refs/rewritten/')
+MAX_SYMREF_DEPTH = 5
+HEX = re.compile('^[0-9a-f]{40}([0-9a-f]{24})?$')
+
+
+class GitRefsError(Exception):
+    """The references can't be read without git"""
+
+
+def _read_first_line(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='surrogateescape') as fobj:
+            return fobj.readline().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _config_value(value):
+    """Unquote a config value without its key"""
+    result = []
+    quoted = False
+    escape = False
+    for char in value:
+        if escape:
+            result.append({'n': '\n', 't': '\t', 'b': '\b'}.get(char, char))
+            escape = False
+        elif char == '\\':
+            escape = True
+        elif char == '"':
+            quoted = not quoted
+        elif char in '#;' and not quoted:
+            break
+        else:
+            result.append(char)
+    return ''.join(result).strip()
+
+
+def parse_config(text):
+    """
+    Parse a git config file into a dict mapping (section, subsection, key)
+    to the list of values
+
+    Section and key names are lower case, subsections keep their case.
+    Raises GitRefsError for include directives, since the included files
+    would have to be read as well.
+    """
+    config = {}
+    section = subsection = None
+    lines = iter(text.splitlines())
+    for line in lines:
+        while line.endswith('\\') and not line.endswith('\\\\'):
+            line = line[:-1] + next(lines, '')
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        if line.startswith('['):
+            match = re.match(r'\[\s*([-\w.]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]\s*(.*)', line)
+            if match is None:
+                continue
+            section, subsection, line = match.groups()
+            section = section.lower()
+            if subsection is not None:
+                subsection = re.sub(r'\\(.)', r'\1', subsection)
+            elif '.' in section:
+                # Deprecated [section.subsection] syntax
+                section, subsection = section.split('.', 1)
+            if section in ('include', 'includeif'):
+                raise GitRefsError("Config includes other files")
+            if not line:
+                continue
+        if section is None:
+            continue
+        key, equals, value = line.partition('=')
+        # A key without a value means true
+        config.setdefault((section, subsection, key.strip().lower()), []).append(
+            _config_value(value) if equals else 'true')
+    return config
+
+
+def map_refspec(refspec, ref):
+    """Map ref with the source of a fetch refspec to its destination"""
+    src, _, dst = refspec.lstrip('+').partition(':')
+    if '*' not in src:
+        return (dst or None) if src == ref else None
+    prefix, _, suffix = src.partition('*')
+    if not ref.startswith(prefix) or not ref.endswith(suffix) \
+            or len(ref) < len(prefix) + len(suffix):
+        return None
+    return dst.replace('*', ref[len(prefix):len(ref) - len(suffix)], 1)
+
+
+class GitRefs(object):
+    """
+    Resolves references of a repository by reading its files
+
+    gitdir is the git directory of the worktree, commondir the one shared by
+    all worktrees.  The parsed packed-refs and config files are cached until
+    they change.  Raises GitRefsError if the repository stores its refs in a
+    format that isn't supported, like reftable.
+    """
+
+    def __init__(self, gitdir, commondir):
+        self.gitdir = gitdir
+        self.commondir = commondir
+        self._packed = (None, {})
+        self._config = (None, {})
+        if self._get_config('extensions', None, 'refstorage') not in (None, 'files'):
+            raise GitRefsError("Unsupported ref storage")
+
+    @staticmethod
+    def _file_key(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size, stat.st_ino
+
+    def _packed_refs(self):
+        path = os.path.join(self.commondir, 'packed-refs')
+        key = self._file_key(path)
+        if key == self._packed[0]:
+            return self._packed[1]
+        packed = {}
+        try:
+            with open(path, 'r', encoding='utf-8', errors='surrogateescape') as fobj:
+                for line in fobj:
+                    if line[:1] in ('#', '^'):
+                        continue
+                    sha, _, name = line.rstrip('\n').partition(' ')
+                    if name:
+                        packed[name] = sha
+        except (IOError, OSError):
+            pass
+        self._packed = (key, packed)
+        return packed
+
+    def _get_config(self, section, subsection, key):
+        """Returns the last value of a config key or None"""
+        path = os.path.join(self.commondir, 'config')
+        file_key = self._file_key(path)
+        if file_key != self._config[0]:
+            try:
+                with open(path, 'r', encoding='utf-8', errors='surrogateescape') as fobj:
+                    config = parse_config(fobj.read())
+            except (IOError, OSError):
+                config = {}
+            self._config = (file_key, config)
+        values = self._config[1].get((section, subsection, key.lower()))
+        return values[-1] if values else None
+
+    def _get_config_all(self, section, subsection, key):
+        self._get_config(section, subsection, key)
+        return self._config[1].get((section, subsection, key.lower()), [])
+
+    def resolve(self, name):
+        """
+        Returns (refname, sha) for a ref like HEAD or refs/heads/main
+
+        Symbolic refs are followed, refname is the ref they end at.  sha is
+        None for refs which don't exist (yet), like the branch of a new
+        repository.
+        """
+        for _ in range(MAX_SYMREF_DEPTH):
+            if name == 'HEAD' or name.startswith(PER_WORKTREE_PREFIXES):
+                base = self.gitdir
+            else:
+                base = self.commondir
+            content = _read_first_line(os.path.join(base, name))
+            if content is None or content == '':
+                return name, self._packed_refs().get(name)
+            if content.startswith('ref:'):
+                name = content[4:].strip()
+                continue
+            if not HEX.match(content):
+                raise GitRefsError("Can't read ref %s" % name)
+            return name, content
+        raise GitRefsError("Symbolic refs nested too deeply")
+
+    def head(self):
+        """Returns (branch ref or None if detached, sha)"""
+        content = _read_first_line(os.path.join(self.gitdir, 'HEAD'))
+        if content is None:
+            raise GitRefsError("Can't read HEAD")
+        if content.startswith('ref:'):
+            return self.resolve('HEAD')
+        if not HEX.match(content):
+            raise GitRefsError("Can't read HEAD")
+        return None, content
+
+    def upstream(self, ref):
+        """Returns the remote-tracking ref of the branch ref, like
+        git for-each-ref --format=%(upstream)"""
+        if not ref or not ref.startswith('refs/heads/'):
+            return None
+        branch = ref[len('refs/heads/'):]
+        remote = self._get_config('branch', branch, 'remote')
+        merge = self._get_config('branch', branch, 'merge')
+        if not remote or not merge:
+            return None
+        if remote == '.':
+            return merge
+        for refspec in self._get_config_all('remote', remote, 'fetch'):
+            mapped = map_refspec(refspec, merge)
+            if mapped:
+                return mapped
+        return None
@@ -9,6 +9,7 @@ from datetime import datetime
 import json
 import os
 
+from .cmdserver import CommandServerError, get_server
 from .vcs import Vcs, VcsError
 
 
@@ -25,8 +26,36 @@ class Hg(Vcs):
         ('I', 'ignored'),
     )
 
+    # More paths than this are updated by querying the whole status
+    MAX_PATTERNS = 256
+
     # Generic
 
+    def _run(self, args, path=None,  # pylint: disable=too-many-arguments
+             catchout=True, retbytes=False, rstrip_newline=True):
+        """Run a command with the command server of the repository
+
+        Falls back to running hg if the command server can't be used.
+        """
+        if path is None:
+            path = self.path
+        server = get_server(self.root)
+        try:
+            returncode, output, _ = server.runcommand(['--cwd', path] + args)
+        except CommandServerError:
+            return super(Hg, self)._run(args, path=path, catchout=catchout, retbytes=retbytes,
+                                        rstrip_newline=rstrip_newline)
+        if returncode != 0:
+            raise VcsError('{0:s}: {1:s}'.format(str(['hg'] + args), path))
+        if not catchout:
+            return None
+        if retbytes:
+            return output
+        output = output.decode(server.encoding, 'replace')
+        if rstrip_newline and output.endswith('\n'):
+            return output[:-1]
+        return output
+
     def _log(self, refspec=None, maxres=None, filelist=None):
 
         args = ['log', '--template', 'json']
@@ -102,11 +131,23 @@ class Hg(Vcs):
                     return status
         return 'sync'
 
-    def data_status_subpaths(self):
+    def data_status_subpaths(self, paths=None):
+        args = ['status', '--all', '--template', 'json']
+        if paths is not None:
+            if len(paths) > self.MAX_PATTERNS:
+                return None
+            args.append('--')
+            for path in paths:
+                if path.endswith('/'):
+                    # Only the files directly inside the directory
+                    args.append('rootfilesin:' + (path.strip('/') or '.'))
+                else:
+                    args.append('path:' + path)
+
         statuses = {}
 
         # Paths with status
-        for entry in json.loads(self._run(['status', '--all', '--template', 'json'])):
+        for entry in json.loads(self._run(args, path=self.root)):
             if entry['status'] == 'C':
                 continue
             statuses[os.path.normpath(entry['path'])] = self._status_translate(entry['status'])
@@ -135,3 +176,18 @@ class Hg(Vcs):
             return log[0]
         else:
             raise VcsError('More than one instance of revision {0:s}'.format(rev))
+
+    def data_state_paths(self):
+        return [
+            self.repodir,
+            os.path.join(self.repodir, 'dirstate'),
+            os.path.join(self.repodir, 'branch'),
+            os.path.join(self.repodir, 'bookmarks'),
+            os.path.join(self.repodir, 'store', '00changelog.i'),
+        ]
+
+    def data_state_changes(self, old, new):
+        return None
+
+    def data_modified_paths(self, relpath):
+        return None
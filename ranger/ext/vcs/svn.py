@@ -25,6 +25,29 @@ class SVN(Vcs):
         ('!', 'deleted'),
     )
 
+    # The item attribute of "svn status --xml" mapped to the codes above
+    _status_items = {
+        'added': 'A',
+        'conflicted': 'C',
+        'deleted': 'D',
+        'external': 'X',
+        'ignored': 'I',
+        'incomplete': '!',
+        'merged': 'M',
+        'missing': '!',
+        'modified': 'M',
+        'obstructed': '~',
+        'replaced': 'R',
+        'unversioned': '?',
+    }
+
+    # More paths than this are updated by querying the whole status
+    MAX_TARGETS = 256
+
+    # The remote url with the mtime of the working copy database it was
+    # read at, it only changes with "svn switch" or "svn relocate"
+    _remote = None
+
     def _log(self, refspec=None, maxres=None, filelist=None):
         """Retrieves log message and parses it"""
         args = ['log', '--xml']
@@ -67,13 +90,43 @@ class SVN(Vcs):
 
     def _remote_url(self):
         """Remote url"""
+        try:
+            mtime = os.stat(os.path.join(self.repodir, 'wc.db')).st_mtime
+        except OSError:
+            mtime = None
+        if self._remote is not None and self._remote[0] == mtime:
+            return self._remote[1]
         try:
             output = self._run(['info', '--xml'])
         except VcsError:
             return None
         if not output:
             return None
-        return etree.fromstring(output).find('./entry/url').text or None
+        url = etree.fromstring(output).find('./entry/url').text or None
+        self._remote = (mtime, url)
+        return url
+
+    def _status_entries(self, targets=None, depth='infinity'):
+        """Yields (path, status) for all paths not in sync, from the output
+        of "svn status --xml" for the targets"""
+        args = ['status', '--xml', '--non-interactive', '--depth', depth]
+        if targets:
+            args += ['--'] + targets
+        output = self._run(args, path=self.root)
+        for entry in etree.fromstring(output).iter('entry'):
+            wc_status = entry.find('./wc-status')
+            if wc_status is None:
+                continue
+            if wc_status.get('tree-conflicted') == 'true':
+                code = 'C'
+            else:
+                code = self._status_items.get(wc_status.get('item'), ' ')
+                if code == ' ':
+                    # Only the properties may be changed
+                    code = {'modified': 'M', 'conflicted': 'C'}.get(
+                        wc_status.get('props'), ' ')
+            if code != ' ':
+                yield os.path.normpath(entry.get('path')), self._status_translate(code)
 
     # Action Interface
 
@@ -94,36 +147,34 @@ class SVN(Vcs):
     # Data Interface
 
     def data_status_root(self):
-        statuses = set()
-
-        # Paths with status
-        lines = self._run(['status']).split('\n')
-        lines = list(filter(None, lines))
-        if not lines:
-            return 'sync'
-        for line in lines:
-            code = line[0]
-            if code == ' ':
-                continue
-            statuses.add(self._status_translate(code))
-
+        statuses = set(status for _, status in self._status_entries())
         for status in self.DIRSTATUSES:
             if status in statuses:
                 return status
         return 'sync'
 
-    def data_status_subpaths(self):
-        statuses = {}
-
-        # Paths with status
-        lines = self._run(['status']).split('\n')
-        lines = list(filter(None, lines))
-        for line in lines:
-            code, path = line[0], line[8:]
-            if code == ' ':
-                continue
-            statuses[os.path.normpath(path)] = self._status_translate(code)
+    def data_status_subpaths(self, paths=None):
+        if paths is None:
+            return dict(self._status_entries())
+        if len(paths) > self.MAX_TARGETS:
+            return None
 
+        statuses = {}
+        directories = [path.strip('/') or '.' for path in paths if path.endswith('/')]
+        others = [path for path in paths if not path.endswith('/')]
+        try:
+            if directories:
+                # The depth "immediates" includes the directories themselves
+                directories_set = set(directories)
+                for path, status in self._status_entries(directories, depth='immediates'):
+                    if path not in directories_set \
+                            and (os.path.dirname(path) or '.') in directories_set:
+                        statuses[path] = status
+            if others:
+                statuses.update(self._status_entries(others))
+        except VcsError:
+            # Most likely a path that was removed and never versioned
+            return None
         return statuses
 
     def data_status_remote(self):
@@ -149,3 +200,12 @@ class SVN(Vcs):
             return log[0]
         else:
             raise VcsError('More than one instance of revision {0:s}'.format(rev))
+
+    def data_state_paths(self):
+        return [self.repodir, os.path.join(self.repodir, 'wc.db')]
+
+    def data_state_changes(self, old, new):
+        return None
+
+    def data_modified_paths(self, relpath):
+        return None
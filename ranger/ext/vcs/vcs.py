@@ -5,13 +5,18 @@
 
 from __future__ import (absolute_import, division, print_function)
 
+import json
 import os
 import subprocess
 import threading
 import time
+from datetime import datetime
+from hashlib import sha1
 from io import open
 
+import ranger
 from ranger.ext import spawn
+from .cmdserver import close_servers
 
 # Python 2 compatibility
 try:
@@ -46,6 +51,9 @@ class Vcs(object):  # pylint: disable=too-many-instance-attributes
     HEAD = 'HEAD'
     NONE = 'NONE'
 
+    # Bytes to read at once from the output of streamed commands
+    READ_SIZE = 64 * 1024
+
     # Backends
     REPOTYPES = {
         'bzr': {'class': 'Bzr', 'setting': 'vcs_backend_bzr'},
@@ -112,14 +120,17 @@ class Vcs(object):  # pylint: disable=too-many-instance-attributes
 
     # Generic
 
+    def _command(self, args):
+        """Returns the command line for args"""
+        if self.repotype == 'hg':
+            # use "chg", a faster built-in client
+            return ['chg'] + args
+        return [self.repotype] + args
+
     def _run(self, args, path=None,  # pylint: disable=too-many-arguments
              catchout=True, retbytes=False, rstrip_newline=True):
         """Run a command"""
-        if self.repotype == 'hg':
-            # use "chg", a faster built-in client
-            cmd = ['chg'] + args
-        else:
-            cmd = [self.repotype] + args
+        cmd = self._command(args)
         if path is None:
             path = self.path
 
@@ -136,6 +147,45 @@ class Vcs(object):  # pylint: disable=too-many-instance-attributes
         except (subprocess.CalledProcessError, OSError):
             raise VcsError('{0:s}: {1:s}'.format(str(cmd), path))
 
+    def _run_records(self, args, path=None, separator=b'\0'):
+        """Run a command and yield its output split at separator
+
+        The records are decoded and yielded while the command is still
+        running, so huge outputs are never held in memory at once.
+        """
+        cmd = self._command(args)
+        if path is None:
+            path = self.path
+
+        try:
+            with open(os.devnull, mode='w', encoding="utf-8") as fd_devnull:
+                process = subprocess.Popen(  # pylint: disable=consider-using-with
+                    cmd, cwd=path, stdout=subprocess.PIPE, stderr=fd_devnull)
+        except OSError:
+            raise VcsError('{0:s}: {1:s}'.format(str(cmd), path))
+
+        try:
+            fd_stdout = process.stdout.fileno()
+            rest = b''
+            while True:
+                chunk = os.read(fd_stdout, self.READ_SIZE)
+                if not chunk:
+                    break
+                records = (rest + chunk).split(separator)
+                rest = records.pop()
+                for record in records:
+                    yield record.decode(spawn.ENCODING)
+            if rest:
+                yield rest.decode(spawn.ENCODING)
+        except GeneratorExit:
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            process.wait()
+        if process.returncode != 0:
+            raise VcsError('{0:s}: {1:s}'.format(str(cmd), path))
+
     def _get_repotype(self, path):
         """Get type for path"""
         for repotype in self.repotypes_settings:
@@ -189,10 +239,15 @@ class Vcs(object):  # pylint: disable=too-many-instance-attributes
         """Returns status of self.root cheaply"""
         raise NotImplementedError
 
-    def data_status_subpaths(self):
+    def data_status_subpaths(self, paths=None):
         """
         Returns a dict indexed by subpaths not in sync with their status as values.
         Paths are given relative to self.root
+
+        If paths is given, only the statuses of these paths are returned.  Paths
+        ending with a slash stand for the entries directly inside a directory,
+        "/" for the top level.  Other directories stand for everything below
+        them.  Backends that can't do this return None.
         """
         raise NotImplementedError
 
@@ -211,52 +266,412 @@ class Vcs(object):  # pylint: disable=too-many-instance-attributes
         """Returns info string about revision rev. None in special cases"""
         raise NotImplementedError
 
+    def data_state_paths(self):
+        """
+        Returns paths inside the repository directory whose mtimes change
+        whenever the state of the repository (index, HEAD, refs) changes
+        """
+        raise NotImplementedError
+
+    def data_state_changes(self, old, new):
+        """
+        Given the mtimes of data_state_paths() before and after a change,
+        returns the set of subpaths whose status may have changed, or None if
+        the whole repository has to be updated
+        """
+        raise NotImplementedError
+
+    def data_modified_paths(self, relpath):
+        """
+        Returns the set of tracked subpaths directly inside the directory
+        relpath ('' for the top level) that may have been modified since the
+        last update, or None if the backend can't tell cheaply
+        """
+        raise NotImplementedError
+
+
+class StatusTree(object):
+    """
+    The statuses of subpaths, stored in a tree of path components
+
+    Every node is a list [status, rank, children] where rank is the index in
+    order of the most important status below the node, so the status of a
+    path or directory is found in O(depth) steps.
+    """
+
+    def __init__(self, statuses, order):
+        self.order = order
+        self._norank = len(order)
+        ranks = dict((status, rank) for rank, status in enumerate(order))
+        self.root = [None, self._norank, {}]
+        for path, status in statuses.items():
+            rank = ranks.get(status, self._norank)
+            node = self.root
+            for name in path.split('/'):
+                if rank < node[1]:
+                    node[1] = rank
+                children = node[2]
+                try:
+                    node = children[name]
+                except KeyError:
+                    node = children[name] = [None, self._norank, {}]
+            node[0] = status
+
+    def aggregate(self, default='sync'):
+        """Returns the most important status of all paths"""
+        if self.root[1] == self._norank:
+            return default
+        return self.order[self.root[1]]
+
+    def lookup(self, relpath, is_directory=False):
+        """
+        Returns the status of relpath or of its closest parent with a status.
+        For directories without one, the most important status of the paths
+        inside is returned.
+        """
+        node = self.root
+        status = None
+        for name in relpath.split('/'):
+            node = node[2].get(name)
+            if node is None:
+                break
+            if node[0] is not None:
+                status = node[0]
+        if status is not None:
+            return status
+        if is_directory and node is not None and node[1] != self._norank:
+            return self.order[node[1]]
+        return 'sync'
+
 
-class VcsRoot(Vcs):  # pylint: disable=abstract-method
+class VcsRoot(Vcs):  # pylint: disable=abstract-method,too-many-public-methods
     """Vcs root"""
+    STATUS_CACHE_VERSION = 1
+    # Seconds between writes of the status cache, the last statuses are
+    # written when the VCS thread stops
+    STATUS_CACHE_INTERVAL = 60
+
     rootinit = False
     head = None
     branch = None
     updatetime = None
-    status_subpaths = None
+    # The statuses were loaded from the status cache and not updated yet
+    provisional = False
+    _status_cache_loaded = False
+    # The status cache to write, its time of the last write
+    _status_cache = None
+    _status_cache_saved = None
+    _state = None
+    _directory_mtimes = None
+    _refresh_paths = None
+    # The subpaths whose statuses are known with vcs_scoped_status, None if
+    # all are
+    _scope = None
+    _status_subpaths = None
+    _status_tree = None
+
+    @property
+    def status_subpaths(self):
+        """Dict of subpaths not in sync with their status as values"""
+        return self._status_subpaths
+
+    @status_subpaths.setter
+    def status_subpaths(self, statuses):
+        self._set_status_subpaths(
+            statuses, None if statuses is None else StatusTree(statuses, self.DIRSTATUSES))
+
+    def _set_status_subpaths(self, statuses, tree):
+        self._status_subpaths = statuses
+        self._status_tree = tree
 
     def _status_root(self):
         """Returns root status"""
-        if self.status_subpaths is None:
+        if self._status_tree is None:
             return 'none'
+        return self._status_tree.aggregate()
 
-        statuses = set(status for path, status in self.status_subpaths.items())
-        for status in self.DIRSTATUSES:
-            if status in statuses:
-                return status
-        return 'sync'
+    def _state_signature(self):
+        """Returns the mtimes of the repository state paths"""
+        signature = {}
+        for path in self.data_state_paths():
+            try:
+                signature[path] = os.stat(path).st_mtime
+            except OSError:
+                signature[path] = None
+        return signature
+
+    def _status_cache_path(self):
+        path = self.path
+        if not isinstance(path, bytes):
+            path = path.encode('utf-8', 'surrogateescape')
+        name = sha1(path).hexdigest()
+        return os.path.join(ranger.args.cachedir, 'vcs', name + '.json')
+
+    def _status_cache_key(self):
+        """Returns the (path, mtime, size) of the repository state paths"""
+        key = []
+        for path in sorted(self.data_state_paths()):
+            try:
+                path_stat = os.stat(path)
+            except OSError:
+                key.append([path, None, None])
+            else:
+                key.append([path, path_stat.st_mtime, path_stat.st_size])
+        return key
 
-    def init_root(self):
-        """Initialize root cheaply"""
+    def read_status_cache(self):
+        """
+        Returns the statuses saved by save_status_cache() if the repository
+        state (index, HEAD, refs) is unchanged since then, or None
+
+        Only tried once per root.  Apply them with apply_status_cache().
+        """
+        if self._status_cache_loaded or self.status_subpaths is not None:
+            return None
+        self._status_cache_loaded = True
         try:
-            self.head = self.data_info(self.HEAD)
-            self.branch = self.data_branch()
-            self.obj.vcsremotestatus = self.data_status_remote()
-            self.obj.vcsstatus = self.data_status_root()
+            with open(self._status_cache_path(), 'r', encoding='utf-8') as fobj:
+                cache = json.load(fobj)
+            if cache.get('version') != self.STATUS_CACHE_VERSION \
+                    or cache['root'] != self.path \
+                    or cache['key'] != self._status_cache_key():
+                return None
+            head = cache['head']
+            if head is not None:
+                head['date'] = datetime.fromtimestamp(head['date'])
+            statuses = cache['statuses']
+            return (head, cache['branch'], cache['remotestatus'], statuses,
+                    StatusTree(statuses, self.DIRSTATUSES))
+        except (IOError, OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def apply_status_cache(self, cache):
+        """
+        Use the statuses returned by read_status_cache()
+
+        The statuses are marked as provisional until the next update, because
+        the work tree may have changed.  Returns whether they were used.
+        """
+        if cache is None or self.status_subpaths is not None:
+            return False
+        self.head, self.branch, self.obj.vcsremotestatus, statuses, tree = cache
+        self._set_status_subpaths(statuses, tree)
+        self.obj.vcsstatus = self._status_root()
+        self.provisional = True
+        return True
+
+    def load_status_cache(self):
+        """Use the saved statuses, see read_status_cache()"""
+        return self.apply_status_cache(self.read_status_cache())
+
+    def _set_status_cache(self, key):
+        """Remember the shown statuses for save_status_cache()"""
+        head = self.head
+        if head is not None:
+            head = dict(head)
+            head['date'] = time.mktime(head['date'].timetuple())
+        self._status_cache = {
+            'version': self.STATUS_CACHE_VERSION,
+            'root': self.path,
+            'key': key,
+            'head': head,
+            'branch': self.branch,
+            'remotestatus': self.obj.vcsremotestatus,
+            'statuses': self.status_subpaths,
+        }
+
+    def save_status_cache(self, force=False):
+        """
+        Save the statuses of the last full update for the next start
+
+        Statuses of scoped updates (vcs_scoped_status) aren't saved.  Unless
+        force is True, this writes at most once per STATUS_CACHE_INTERVAL
+        seconds.  Returns whether the cache was written.
+        """
+        cache = self._status_cache
+        if cache is None:
+            return False
+        now = time.time()
+        if not force and self._status_cache_saved is not None \
+                and now - self._status_cache_saved < self.STATUS_CACHE_INTERVAL:
+            return False
+        self._status_cache = None
+        self._status_cache_saved = now
+        path = self._status_cache_path()
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path + '.tmp', 'w', encoding='utf-8') as fobj:
+                fobj.write(json.dumps(cache))
+            os.rename(path + '.tmp', path)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def fetch_init(self):
+        """
+        Query what init_root() needs, without changing anything
+
+        Returns the argument for apply_root(), or None on errors.
+        """
+        if self.obj.settings.vcs_scoped_status:
+            return self.fetch_root()
+        try:
+            return {'info': self._fetch_info(), 'status': self.data_status_root()}
         except VcsError as ex:
             self.obj.fm.notify('VCS Exception: View log for more info', bad=True, exception=ex)
+            return None
+
+    def init_root(self):
+        """Initialize root cheaply"""
+        return self.apply_root(self.fetch_init())
+
+    def _merge_status_subpaths(self, paths, statuses):
+        """Returns the current statuses with the ones of the given paths
+        replaced, see data_status_subpaths()"""
+        directories = set(path[:-1] for path in paths if path.endswith('/'))
+
+        def replaced(path):
+            if path.rpartition('/')[0] in directories:
+                return True
+            while path:
+                if path in paths:
+                    return True
+                path = os.path.dirname(path)
             return False
-        self.rootinit = True
-        return True
 
-    def update_root(self):
-        """Update root state"""
+        merged = dict(
+            (path, status) for path, status in self.status_subpaths.items()
+            if not replaced(path)
+        )
+        merged.update(statuses)
+        return merged
+
+    def _status_scope(self):
+        """
+        Returns the subpaths shown in the browser, see data_status_subpaths()
+
+        These are the current directory and the directory in the preview
+        column with everything below them, and the entries of the parent
+        directory.  Returns None if the whole repository is shown.
+        """
+        def relpath(path):
+            path = os.path.relpath(path, self.path)
+            if path == os.pardir or path.startswith(os.pardir + os.sep):
+                return None
+            return '' if path == os.curdir else path
+
+        fm = self.obj.fm
+        thisdir = fm.thisdir
+        if thisdir is None:
+            return set(['/'])
+        scope = set()
+        current = relpath(thisdir.path)
+        if current == '':
+            return None
+        elif current is not None:
+            scope.add(current)
+            scope.add(os.path.dirname(current) + '/')
+        thisfile = fm.thisfile
+        if thisfile is not None and thisfile.is_directory:
+            preview = relpath(thisfile.path)
+            if preview == '':
+                return None
+            elif preview is not None:
+                scope.add(preview)
+        return scope or set(['/'])
+
+    def _in_scope(self, path):
+        """Is the status of path known?  See _status_scope()"""
+        if self._scope is None or path in self._scope:
+            return True
+        path = path.rstrip('/')
+        for scope_path in self._scope:
+            if not scope_path.endswith('/') \
+                    and (path == scope_path or path.startswith(scope_path + '/')):
+                return True
+        return False
+
+    def _fetch_info(self):
+        return self.data_info(self.HEAD), self.data_branch(), self.data_status_remote()
+
+    def fetch_root(self):  # pylint: disable=too-many-branches
+        """
+        Query the statuses for update_root(), without changing what is shown
+
+        Only the statuses of the paths found by check_outdated() are queried,
+        if the backend supports that.  With vcs_scoped_status, a full update
+        only asks for the subpaths that are shown.  Returns the argument for
+        apply_root(), or None on errors.
+        """
+        paths = self._refresh_paths
+        self._refresh_paths = None
+        # Taken before the update, so changes during the update aren't missed
+        directory_mtimes = self._loaded_directory_mtimes()
+        result = {'info': None, 'scope': self._scope, 'mtimes': directory_mtimes}
         try:
-            self.head = self.data_info(self.HEAD)
-            self.branch = self.data_branch()
-            self.status_subpaths = self.data_status_subpaths()
-            self.obj.vcsremotestatus = self.data_status_remote()
-            self.obj.vcsstatus = self._status_root()
+            statuses = None
+            if paths and self.status_subpaths is not None:
+                statuses = self.data_status_subpaths(sorted(paths))
+                if statuses is not None:
+                    statuses = self._merge_status_subpaths(paths, statuses)
+                    if self._scope is not None:
+                        result['scope'] = self._scope | paths
+            if statuses is None and self.obj.settings.vcs_scoped_status:
+                paths = self._status_scope()
+                if paths is not None:
+                    statuses = self.data_status_subpaths(sorted(paths))
+                if statuses is not None:
+                    # Statuses outside of the scope may be outdated
+                    result['scope'] = set(paths)
+                    result['info'] = self._fetch_info()
+            if statuses is None:
+                result['info'] = self._fetch_info()
+                statuses = self.data_status_subpaths()
+                result['scope'] = None
+            result['statuses'] = statuses
+            result['tree'] = StatusTree(statuses, self.DIRSTATUSES)
+            # Taken afterwards, because querying the status may refresh the index
+            result['state'] = self._state_signature()
+            if result['scope'] is None:
+                result['key'] = self._status_cache_key()
         except VcsError as ex:
             self.obj.fm.notify('VCS Exception: View log for more info', bad=True, exception=ex)
+            return None
+        return result
+
+    def apply_root(self, result):
+        """
+        Show the result of fetch_root() or fetch_init()
+
+        This only changes attributes and is quick, so it can be done while
+        holding the lock of the UI.  Returns False if the result is None.
+        """
+        if result is None:
             return False
+        if result['info'] is not None:
+            self.head, self.branch, self.obj.vcsremotestatus = result['info']
+        if 'statuses' not in result:
+            self.obj.vcsstatus = result['status']
+            self.rootinit = True
+            return True
+        self._set_status_subpaths(result['statuses'], result['tree'])
+        self._scope = result['scope']
+        self.obj.vcsstatus = self._status_root()
+        self._state = result['state']
         self.rootinit = True
+        self.provisional = False
         self.updatetime = time.time()
+        self._directory_mtimes = result['mtimes']
+        if self._scope is None:
+            self._set_status_cache(result['key'])
+        return True
+
+    def update_root(self):
+        """Update root state, see fetch_root()"""
+        if not self.apply_root(self.fetch_root()):
+            return False
+        self.save_status_cache()
         return True
 
     def _update_walk(self, path, purge):  # pylint: disable=too-many-branches
@@ -328,25 +743,89 @@ class VcsRoot(Vcs):  # pylint: disable=abstract-method
         if purge:
             self.__init__(self.obj)
 
+    def _loaded_directories(self):
+        """Yields the loaded directories of this repository with their subpaths"""
+        for dirobj in list(self.obj.fm.directories.values()):
+            if not dirobj.content_loaded:
+                continue
+            vcs = dirobj.vcs
+            if vcs is None or vcs.rootvcs is not self or not vcs.track:
+                continue
+            relpath = os.path.relpath(vcs.path, self.path)
+            yield dirobj, '' if relpath == '.' else relpath
+
+    def _loaded_directory_mtimes(self):
+        mtimes = {}
+        for dirobj, _ in self._loaded_directories():
+            try:
+                mtimes[dirobj.path] = os.stat(dirobj.path).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
     def check_outdated(self):
-        """Check if root is outdated"""
-        if self.updatetime is None:
+        """
+        Check if root is outdated
+
+        Instead of walking the work tree, only the repository state paths and
+        the directories of this repository that ranger has loaded are checked.
+        The paths that need to be updated are remembered for update_root().
+        With vcs_scoped_status, shown subpaths whose status isn't known yet
+        are outdated too.
+        """
+        self._refresh_paths = None
+        if self.updatetime is None or self._state is None or self.status_subpaths is None \
+                or self._directory_mtimes is None:
             return True
 
-        for wroot, wdirs, _ in os.walk(self.path):
-            wrootobj = self.obj.fm.get_directory(wroot)
-            wrootobj.load_if_outdated()
-            if wroot != self.path and wrootobj.vcs.is_root_pointer:
-                wdirs[:] = []
-                continue
+        paths = set()
+        if self._scope is not None:
+            scope = self._status_scope()
+            if scope is None:
+                return True
+            paths.update(path for path in scope if not self._in_scope(path))
 
-            if wrootobj.stat and self.updatetime < wrootobj.stat.st_mtime:
+        state = self._state_signature()
+        if state != self._state:
+            changed = self.data_state_changes(self._state, state)
+            if changed is None:
                 return True
-            if wrootobj.files_all:
-                for wfile in wrootobj.files_all:
-                    if wfile.stat and self.updatetime < wfile.stat.st_mtime:
-                        return True
-        return False
+            paths.update(changed)
+            self._state = state
+
+        for dirobj, relpath in self._loaded_directories():
+            try:
+                mtime = os.stat(dirobj.path).st_mtime
+            except OSError:
+                return True
+            # Directories loaded after the last update are compared with its
+            # time, which is less precise
+            if mtime != self._directory_mtimes.get(dirobj.path, mtime) \
+                    or (dirobj.path not in self._directory_mtimes
+                        and self.updatetime < mtime):
+                paths.add(relpath + '/')
+                continue
+            modified = self.data_modified_paths(relpath)
+            if modified is not None:
+                paths.update(modified)
+            elif dirobj.files_all:
+                # The backend can't tell, so compare the cached stats
+                for fsobj in dirobj.files_all:
+                    if fsobj.stat and self.updatetime < fsobj.stat.st_mtime:
+                        paths.add(relpath + '/')
+                        break
+
+        # Paths inside directories that are reported as a whole (untracked or
+        # ignored) can't be updated on their own
+        for path in paths:
+            parent = os.path.dirname(path.rstrip('/'))
+            while parent:
+                if parent in self.status_subpaths:
+                    return True
+                parent = os.path.dirname(parent)
+
+        self._refresh_paths = paths
+        return bool(paths)
 
     def status_subpath(self, path, is_directory=False):
         """
@@ -354,30 +833,30 @@ class VcsRoot(Vcs):  # pylint: disable=abstract-method
 
         path needs to be self.obj.path or subpath thereof
         """
-        if self.status_subpaths is None:
+        if self._status_tree is None:
             return 'none'
-
-        relpath = os.path.relpath(path, self.path)
-
-        # check if relpath or its parents has a status
-        tmppath = relpath
-        while tmppath:
-            if tmppath in self.status_subpaths:
-                return self.status_subpaths[tmppath]
-            tmppath = os.path.dirname(tmppath)
-
-        # check if path contains some file in status
-        if is_directory:
-            statuses = set(status for subpath, status in self.status_subpaths.items()
-                           if subpath.startswith(relpath + '/'))
-            for status in self.DIRSTATUSES:
-                if status in statuses:
-                    return status
-        return 'sync'
+        return self._status_tree.lookup(os.path.relpath(path, self.path), is_directory)
 
 
 class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attributes
-    """VCS thread"""
+    """
+    VCS thread
+
+    Directories to process are queued with process().  Updating the status
+    of a repository is handed to a pool of worker threads, one repository
+    per worker at a time, so a slow repository doesn't hold up the others.
+    Requests for a repository that is already queued or being updated are
+    merged, and the repository of the current directory goes first.  Once
+    the workers are done, this thread marks the affected widgets for
+    redrawing; the main loop draws them with its next frame, since curses
+    must only be used by one thread.
+
+    The workers run the VCS commands without any lock and then apply their
+    results while holding UI.drawlock, so a frame never shows half of an
+    update.  While the thread is paused, no job is started.
+    """
+
+    workers = 4
 
     def __init__(self, ui):
         super(VcsThread, self).__init__()
@@ -391,7 +870,19 @@ class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attribut
         self.paused = threading.Event()
         self._awoken = threading.Event()
         self._redraw = False
-        self._roots = set()
+
+        self._jobs_lock = threading.Lock()
+        # Notified when a job is done or jobs may be started again
+        self._jobs_changed = threading.Condition(self._jobs_lock)
+        self._jobs_held = False
+        self._jobs_queue = queue.PriorityQueue()
+        self._jobs_counter = 0
+        self._pending = {}
+        self._running = {}
+        # The roots with jobs so far, to save their status caches on stop()
+        self._roots = {}
+        self._workers = []
+        ui.fm.signal_bind('cd', self._on_cd, weak=True)
 
     def _is_targeted(self, dirobj):
         """Check if dirobj is targeted"""
@@ -399,6 +890,123 @@ class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attribut
             return True
         return False
 
+    def _priority(self, rootvcs):
+        """Lower is more urgent: the repository of the current directory first"""
+        thisdir = self._ui.fm.thisdir
+        vcs = thisdir.vcs if thisdir is not None else None
+        if vcs is not None and vcs.rootvcs is rootvcs:
+            return 0
+        return 1
+
+    def _submit(self, rootvcs, update, links=()):
+        """
+        Queue a job for the repository rootvcs.  If update is False, the root
+        is only initialized cheaply.  The statuses of the directory objects in
+        links are set to the root's status afterwards.
+        """
+        priority = self._priority(rootvcs)
+        with self._jobs_lock:
+            self._roots[rootvcs.path] = rootvcs
+            if rootvcs.path in self._running:
+                # Run it again afterwards, things may have changed meanwhile
+                job = self._running[rootvcs.path]
+                if job['again'] is None:
+                    job['again'] = {'vcs': rootvcs, 'update': False, 'links': set(),
+                                    'priority': priority, 'again': None}
+                job = job['again']
+            else:
+                job = self._pending.get(rootvcs.path)
+                if job is None:
+                    job = self._pending[rootvcs.path] = {
+                        'vcs': rootvcs, 'update': False, 'links': set(),
+                        'priority': priority, 'again': None}
+                    self._put(rootvcs.path, priority)
+                elif priority < job['priority']:
+                    job['priority'] = priority
+                    self._put(rootvcs.path, priority)
+            job['update'] = job['update'] or update
+            job['links'].update(links)
+
+            busy = len(self._pending) + len(self._running)
+        while len(self._workers) < min(self.workers, busy):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _put(self, path, priority):
+        self._jobs_counter += 1
+        self._jobs_queue.put((priority, self._jobs_counter, path))
+
+    def _run_job(self, job):
+        """Run a job, returns whether something changed"""
+        rootvcs = job['vcs']
+        changed = False
+        cache = rootvcs.read_status_cache()
+        if cache is not None:
+            with self._ui.drawlock:
+                if rootvcs.apply_status_cache(cache):
+                    # Show the cached statuses while the real ones are computed
+                    rootvcs.update_tree()
+                    self._redraw = True
+                    self._awoken.set()
+        if job['update']:
+            if rootvcs.check_outdated():
+                result = rootvcs.fetch_root()
+                with self._ui.drawlock:
+                    if rootvcs.apply_root(result):
+                        rootvcs.update_tree()
+                    else:
+                        rootvcs.update_tree(purge=True)
+                if result is not None:
+                    rootvcs.save_status_cache()
+                changed = True
+        elif not rootvcs.rootinit:
+            result = rootvcs.fetch_init()
+            with self._ui.drawlock:
+                if not rootvcs.apply_root(result):
+                    rootvcs.update_tree(purge=True)
+            changed = True
+        if job['links']:
+            with self._ui.drawlock:
+                for fsobj in job['links']:
+                    fsobj.vcsstatus = rootvcs.obj.vcsstatus
+                    fsobj.vcsremotestatus = rootvcs.obj.vcsremotestatus
+            changed = True
+        return changed
+
+    def _work(self):
+        """Worker thread, running the queued jobs"""
+        while True:
+            path = self._jobs_queue.get()[2]
+            with self._jobs_lock:
+                while self._jobs_held and not self.__stop.is_set():
+                    self._jobs_changed.wait()
+                if path is None or self.__stop.is_set():
+                    return
+                job = self._pending.pop(path, None)
+                if job is None:
+                    # Queued again with a higher priority and done already
+                    continue
+                self._running[path] = job
+            changed = False
+            try:
+                changed = self._run_job(job)
+            except Exception as ex:  # pylint: disable=broad-except
+                self._ui.fm.notify('VCS Exception: View log for more info',
+                                   bad=True, exception=ex)
+            finally:
+                with self._jobs_lock:
+                    del self._running[path]
+                    again = job['again']
+                    if again is not None:
+                        self._pending[path] = again
+                        self._put(path, again['priority'])
+                    self._jobs_changed.notify_all()
+            if changed:
+                self._redraw = True
+                self._awoken.set()
+
     def _update_subroots(self, fsobjs):
         """Update subroots"""
         if not fsobjs:
@@ -412,23 +1020,20 @@ class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attribut
             rootvcs = fsobj.vcs.rootvcs
             if fsobj.vcs.is_root_pointer:
                 has_vcschild = True
+                links = (fsobj,) if fsobj.is_link else ()
                 if not rootvcs.rootinit and not self._is_targeted(rootvcs.obj):
-                    self._roots.add(rootvcs.path)
-                    if not rootvcs.init_root():
-                        rootvcs.update_tree(purge=True)
-                    self._redraw = True
-                if fsobj.is_link:
+                    self._submit(rootvcs, False, links)
+                elif links:
                     fsobj.vcsstatus = rootvcs.obj.vcsstatus
                     fsobj.vcsremotestatus = rootvcs.obj.vcsremotestatus
                     self._redraw = True
 
         return has_vcschild
 
-    def _queue_process(self):  # pylint: disable=too-many-branches
+    def _queue_process(self):
         """Process queue"""
         dirobjs = []
         paths = set()
-        self._roots.clear()
 
         while True:
             try:
@@ -443,14 +1048,7 @@ class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attribut
 
             dirobj.vcs.reinit()
             if dirobj.vcs.track:
-                rootvcs = dirobj.vcs.rootvcs
-                if rootvcs.path not in self._roots and rootvcs.check_outdated():
-                    self._roots.add(rootvcs.path)
-                    if rootvcs.update_root():
-                        rootvcs.update_tree()
-                    else:
-                        rootvcs.update_tree(purge=True)
-                    self._redraw = True
+                self._submit(dirobj.vcs.rootvcs, True)
 
             has_vcschild = self._update_subroots(dirobj.files_all)
 
@@ -463,42 +1061,72 @@ class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attribut
             self.paused.set()
             self._advance.wait()
             self._awoken.wait()
+            # Cleared before checking _advance, so pause() either sees that
+            # this thread is busy or this thread sees that it's paused
+            self.paused.clear()
             if self.__stop.is_set():
+                with self._jobs_lock:
+                    for _ in self._workers:
+                        self._put(None, -1)
+                    self._jobs_changed.notify_all()
                 self.stopped.set()
                 return
             if not self._advance.is_set():
                 continue
             self._awoken.clear()
-            self.paused.clear()
 
             try:
-                self._queue_process()
-
-                if self._redraw:
-                    self._redraw = False
-                    for column in self._ui.browser.columns:
-                        if column.target and column.target.is_directory:
-                            column.need_redraw = True
-                    self._ui.titlebar.need_redraw = True   # edgeEdit
-                    self._ui.redraw()
+                with self._ui.drawlock:
+                    self._queue_process()
+
+                    if self._redraw:
+                        self._redraw = False
+                        for column in self._ui.browser.columns:
+                            if column.target and column.target.is_directory:
+                                column.need_redraw = True
+                        self._ui.titlebar.need_redraw = True   # edgeEdit
             except Exception as ex:  # pylint: disable=broad-except
                 self._ui.fm.notify('VCS Exception: View log for more info', bad=True, exception=ex)
 
-    def stop(self):
-        """Stop thread synchronously"""
+    def stop(self, timeout=5):
+        """
+        Stop thread and workers synchronously, then the command servers
+
+        The status caches not written yet are saved afterwards.
+        """
+        deadline = time.time() + timeout
         self.__stop.set()
-        self.paused.wait(5)
+        self.paused.wait(timeout)
         self._advance.set()
         self._awoken.set()
         self.stopped.wait(1)
-        return self.stopped.is_set()
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.time()))
+        close_servers()
+        stopped = self.stopped.is_set() and not any(worker.is_alive() for worker in self._workers)
+        if stopped:
+            for rootvcs in self._roots.values():
+                rootvcs.save_status_cache(force=True)
+        return stopped
 
     def pause(self):
-        """Pause thread"""
+        """Pause thread
+
+        No more jobs are started, and this waits until the running ones are
+        done.  Wait for the paused event afterwards to be sure that this
+        thread is idle too.
+        """
         self._advance.clear()
+        with self._jobs_lock:
+            self._jobs_held = True
+            while self._running:
+                self._jobs_changed.wait()
 
     def unpause(self):
         """Unpause thread"""
+        with self._jobs_lock:
+            self._jobs_held = False
+            self._jobs_changed.notify_all()
         self._advance.set()
 
     def process(self, dirobj):
@@ -506,6 +1134,13 @@ class VcsThread(threading.Thread):  # pylint: disable=too-many-instance-attribut
         self._queue.put(dirobj)
         self._awoken.set()
 
+    def _on_cd(self, signal):
+        """With vcs_scoped_status, entering a directory changes what's shown"""
+        dirobj = signal.new
+        if dirobj.content_loaded and dirobj.vcs and dirobj.vcs.track \
+                and dirobj.vcs.rootvcs.obj.settings.vcs_scoped_status:
+            self.process(dirobj)
+
 
 # Backend imports
 from .bzr import Bzr  # NOQA pylint: disable=wrong-import-position
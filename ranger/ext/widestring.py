@@ -13,13 +13,43 @@ ASCIIONLY = set(chr(c) for c in range(1, 128))
 NARROW = 1
 WIDE = 2
 WIDE_SYMBOLS = set('WF')
+# The number of widths and slices of non-ASCII strings that are remembered
+CACHE_SIZE = 4096
+
+_WIDTHS = {}
+_SLICES = {}
+
+try:
+    _isascii = str.isascii  # pylint: disable=invalid-name
+except AttributeError:  # Python < 3.7
+    def _isascii(string):
+        return not set(string) - ASCIIONLY
+
+
+def _remember(cache, key, value):
+    if len(cache) >= CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+    return value
 
 
 def uwid(string):
-    """Return the width of a string"""
-    if not PY3:
-        string = string.decode('utf-8', 'ignore')
-    return sum(utf_char_width(c) for c in string)
+    """Return the width of a string
+
+    >>> uwid("poo"), uwid("モヒカン"), uwid("aモ")
+    (3, 8, 3)
+    """
+    if _isascii(string):
+        return len(string)
+    try:
+        return _WIDTHS[string]
+    except KeyError:
+        pass
+    if PY3:
+        width = sum(utf_char_width(c) for c in string)
+    else:
+        width = sum(utf_char_width(c) for c in string.decode('utf-8', 'ignore'))
+    return _remember(_WIDTHS, string, width)
 
 
 def utf_char_width(string):
@@ -55,6 +85,53 @@ def string_to_charlist(string):
     return result
 
 
+def _slice_chars(chars, start, stop):
+    """Join chars[start:stop], replacing halves of wide characters with
+    spaces"""
+    if start >= stop:
+        return ''
+    if stop < len(chars) and chars[stop] == '':
+        if chars[start] == '':
+            return ' ' + ''.join(chars[start:stop - 1]) + ' '
+        return ''.join(chars[start:stop - 1]) + ' '
+    if chars[start] == '':
+        return ' ' + ''.join(chars[start:stop - 1])
+    return ''.join(chars[start:stop])
+
+
+def width_slice(string, start=None, stop=None):
+    """Return the part of string between the columns start and stop
+
+    Negative values of stop count from the end, negative values of start
+    mean 0.  Wide characters that are cut in half become spaces.
+
+    >>> width_slice("asdf", 1, 3)
+    'sd'
+    >>> width_slice("asdf", None, -1)
+    'asd'
+    >>> width_slice("モヒカン", 1, 5)
+    ' ヒ '
+    >>> width_slice("aモ", 0, 2)
+    'a '
+    """
+    width = uwid(string)
+    if stop is None or stop > width:
+        stop = width
+    if stop < 0:
+        stop = width + stop
+    if stop < 0:
+        return ''
+    if start is None or start < 0:
+        start = 0
+    if _isascii(string):
+        return string[start:stop]
+    key = (string, start, stop)
+    try:
+        return _SLICES[key]
+    except KeyError:
+        return _remember(_SLICES, key, _slice_chars(string_to_charlist(string), start, stop))
+
+
 class WideString(object):  # pylint: disable=too-few-public-methods
 
     def __init__(self, string, chars=None):
@@ -64,10 +141,14 @@ class WideString(object):  # pylint: disable=too-few-public-methods
             # Here I assume that string is a "unicode" object, because why else
             # would str(string) raise a UnicodeEncodeError?
             self.string = string.encode('latin-1', 'ignore')
-        if chars is None:
-            self.chars = string_to_charlist(string)
-        else:
-            self.chars = chars
+        # The list of characters is only built when it's needed
+        self._chars = chars
+
+    @property
+    def chars(self):
+        if self._chars is None:
+            self._chars = string_to_charlist(self.string)
+        return self._chars
 
     def __add__(self, string):
         """
@@ -81,7 +162,7 @@ class WideString(object):  # pylint: disable=too-few-public-methods
         if isinstance(string, str):
             return WideString(self.string + string)
         elif isinstance(string, WideString):
-            return WideString(self.string + string.string, self.chars + string.chars)
+            return WideString(self.string + string.string)
         return None
 
     def __radd__(self, string):
@@ -92,7 +173,7 @@ class WideString(object):  # pylint: disable=too-few-public-methods
         if isinstance(string, str):
             return WideString(string + self.string)
         elif isinstance(string, WideString):
-            return WideString(string.string + self.string, string.chars + self.chars)
+            return WideString(string.string + self.string)
         return None
 
     def __str__(self):
@@ -124,21 +205,18 @@ class WideString(object):  # pylint: disable=too-few-public-methods
         >>> WideString("aモ")[0:1]
         <WideString 'a'>
         """
-        if stop is None or stop > len(self.chars):
-            stop = len(self.chars)
+        if PY3:
+            return WideString(width_slice(self.string, start, stop))
+        length = len(self.chars)
+        if stop is None or stop > length:
+            stop = length
         if stop < 0:
-            stop = len(self.chars) + stop
+            stop = length + stop
         if stop < 0:
             return WideString("")
         if start is None or start < 0:
             start = 0
-        if stop < len(self.chars) and self.chars[stop] == '':
-            if self.chars[start] == '':
-                return WideString(' ' + ''.join(self.chars[start:stop - 1]) + ' ')
-            return WideString(''.join(self.chars[start:stop - 1]) + ' ')
-        if self.chars[start] == '':
-            return WideString(' ' + ''.join(self.chars[start:stop - 1]))
-        return WideString(''.join(self.chars[start:stop]))
+        return WideString(_slice_chars(self.chars, start, stop))
 
     def __getitem__(self, i):
         """
@@ -160,6 +238,8 @@ class WideString(object):  # pylint: disable=too-few-public-methods
         >>> len(WideString("モヒカン"))
         8
         """
+        if PY3 and self._chars is None:
+            return uwid(self.string)
         return len(self.chars)
 
 
@@ -8,7 +8,7 @@ from __future__ import (absolute_import, division, print_function)
 
 import re
 
-from ranger.ext.widestring import WideString
+from ranger.ext.widestring import WideString, uwid
 from ranger.gui import color
 
 
@@ -119,7 +119,7 @@ def char_len(ansi_text):
     >>> char_len("")
     0
     """
-    return len(WideString(ansi_re.sub('', ansi_text)))
+    return uwid(ansi_re.sub('', ansi_text))
 
 
 def char_slice(ansi_text, start, length):
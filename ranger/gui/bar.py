@@ -120,10 +120,12 @@ class ColoredString(object):
         self.string = WideString(string)
         self.lst = lst
         self.fixed = False
-        if not string or not self.string.chars:
+        if not string:
             self.min_size = 0
         elif PY3:
             self.min_size = utf_char_width(string[0])
+        elif not self.string.chars:
+            self.min_size = 0
         else:
             self.min_size = utf_char_width(self.string.chars[0].decode('utf-8'))
 
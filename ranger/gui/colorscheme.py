@@ -22,6 +22,9 @@ associated with either True or False.
 
 Define which colorscheme in your settings (e.g. ~/.config/ranger/rc.conf):
 set colorscheme yourschemename
+
+The colors are computed once for each combination of context keys and kept
+in tables indexed by the bitmask of the keys (see ranger.gui.context).
 """
 
 from __future__ import (absolute_import, division, print_function)
@@ -33,11 +36,13 @@ from io import open
 
 import ranger
 from ranger.gui.color import get_color
-from ranger.gui.context import Context
+from ranger.gui.context import Context, context_keys, context_mask
 from ranger.core.main import allow_access_to_confdir
-from ranger.ext.cached_function import cached_function
 from ranger.ext.iter_tools import flatten
 
+# How many combinations of keys each table holds before it starts over
+MAX_TABLE_SIZE = 4096
+
 
 class ColorSchemeError(Exception):
     pass
@@ -50,28 +55,57 @@ class ColorScheme(object):
     which fits to the given keys.
     """
 
-    @cached_function
+    def _table(self, name):
+        """Returns the table with the given name, which is emptied when it
+        got too large"""
+        table = self.__dict__.setdefault(name, {})
+        if len(table) >= MAX_TABLE_SIZE:
+            table.clear()
+        return table
+
     def get(self, *keys):
         """Returns the (fg, bg, attr) for the given keys.
 
         Using this function rather than use() will cache all
         colors for faster access.
         """
-        context = Context(keys)
+        return self.get_by_mask(context_mask(keys))
+
+    def get_by_mask(self, mask):
+        """Returns the (fg, bg, attr) for the bitmask of context keys"""
+        try:
+            return self.__dict__['_colors'][mask]
+        except KeyError:
+            pass
+        context = Context(context_keys(mask))
         color = self.use(context)
         if len(color) != 3 or not all(isinstance(value, int) for value in color):
             raise ValueError("Bad Value from colorscheme.  Need "
                              "a tuple of (foreground_color, background_color, attribute).")
+        self._table('_colors')[mask] = color
         return color
 
-    @cached_function
     def get_attr(self, *keys):
         """Returns the curses attribute for the specified keys
 
         Ready to use for curses.setattr()
         """
-        fg, bg, attr = self.get(*flatten(keys))
-        return attr | color_pair(get_color(fg, bg))
+        try:
+            mask = self.__dict__['_key_masks'][keys]
+        except KeyError:
+            mask = self._table('_key_masks')[keys] = context_mask(flatten(keys))
+        return self.get_attr_by_mask(mask)
+
+    def get_attr_by_mask(self, mask):
+        """Returns the curses attribute for the bitmask of context keys"""
+        try:
+            return self.__dict__['_attrs'][mask]
+        except KeyError:
+            pass
+        fg, bg, attr = self.get_by_mask(mask)
+        attr |= color_pair(get_color(fg, bg))
+        self._table('_attrs')[mask] = attr
+        return attr
 
     @abstractmethod
     def use(self, context):
@@ -1,8 +1,22 @@
 # This file is part of ranger, the console file manager.
 # License: GNU GPL version 3, see the file "AUTHORS" for details.
 
+"""The contexts a colorscheme is asked about
+
+A set of context keys can be represented by an integer with one bit per key,
+which is how the colorschemes cache their colors:
+
+>>> mask = context_mask(['in_browser', 'selected'])
+>>> sorted(context_keys(mask))
+['in_browser', 'selected']
+>>> context_mask(['selected', 'in_browser', 'selected']) == mask
+True
+"""
+
 from __future__ import (absolute_import, division, print_function)
 
+import threading
+
 
 CONTEXT_KEYS = [    # edgeNote colorNames
     'reset', 'error', 'badinfo',
@@ -25,10 +39,42 @@ CONTEXT_KEYS = [    # edgeNote colorNames
     'infostring',
     'vcsfile', 'vcsremote', 'vcsinfo', 'vcscommit', 'vcsdate',
     'vcsconflict', 'vcschanged', 'vcsunknown', 'vcsignored', 'vcsuntracked',
-    'vcsstaged', 'vcssync', 'vcsnone', 'vcsbehind', 'vcsahead', 'vcsdiverged', 'info'   # edgeEdit
+    'vcsstaged', 'vcssync', 'vcsnone', 'vcsbehind', 'vcsahead', 'vcsdiverged', 'info',  # edgeEdit
+    'vcsprovisional',
 ]
 
 
+# Maps context keys to their bits.  Keys which aren't in CONTEXT_KEYS, like
+# the ones added by plugins, get the next free bit when they're first used.
+CONTEXT_BITS = {}
+_BITS_LOCK = threading.Lock()
+
+
+def context_bit(key):
+    """Returns the bit of a context key"""
+    try:
+        return CONTEXT_BITS[key]
+    except KeyError:
+        with _BITS_LOCK:
+            return CONTEXT_BITS.setdefault(key, 1 << len(CONTEXT_BITS))
+
+
+def context_mask(keys):
+    """Returns the bitmask of an iterable of context keys"""
+    mask = 0
+    for key in keys:
+        try:
+            mask |= CONTEXT_BITS[key]
+        except KeyError:
+            mask |= context_bit(key)
+    return mask
+
+
+def context_keys(mask):
+    """Returns the list of context keys in a bitmask"""
+    return [key for key, bit in list(CONTEXT_BITS.items()) if mask & bit]
+
+
 class Context(object):  # pylint: disable=too-few-public-methods
 
     def __init__(self, keys):
@@ -42,6 +88,7 @@ def _context_init():
     # set all keys to False
     for key in CONTEXT_KEYS:
         setattr(Context, key, False)
+        context_bit(key)
 
 
 _context_init()
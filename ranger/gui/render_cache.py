@@ -0,0 +1,152 @@
+# This file is part of ranger, the console file manager.
+# License: GNU GPL version 3, see the file "AUTHORS" for details.
+
+"""A size-bounded cache for the rendered rows of the browser columns
+
+Rows are stored per object and key, where the key describes everything the
+row depends on.  Rows with the same texts share one tuple of them, so the
+variants of a row which only differ in their colors, like the selected and
+the unselected one, cost little more than one.  The least recently used
+rows are evicted when the estimated memory use exceeds max_size.
+
+>>> class Obj(object):
+...     pass
+>>> cache = RenderCache()
+>>> obj = Obj()
+>>> texts, attrs = cache.set(obj, ('key',), False, [['name', 0], [' 4 K', 1]])
+>>> cache.get(obj, ('key',), False)
+(('name', ' 4 K'), (0, 1))
+>>> cache.set(obj, ('key',), True, [['name', 8], [' 4 K', 9]])[0] is texts
+True
+>>> cache.get(Obj(), ('key',), False) is None
+True
+>>> cache.forget(obj)
+>>> (len(cache), cache.get(obj, ('key',), True))
+(0, None)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+
+import sys
+import weakref
+from collections import OrderedDict
+
+MAX_SIZE = 4 * 1024 * 1024
+# The estimated size of an entry, apart from its texts: the key tuples,
+# the weak reference and the slots in the dicts
+ENTRY_OVERHEAD = 400
+MAX_INTERNED_ATTRS = 4096
+
+
+def _texts_size(texts):
+    return sys.getsizeof(texts) + sum(sys.getsizeof(text) for text in texts)
+
+
+class RenderCache(object):
+    """
+    Maps (object, key, variant) to the rendered row, as a tuple of texts and
+    a tuple of curses attributes
+
+    Objects are compared by identity.  The cache only keeps weak references
+    to them, so a different object that got the id of a deleted one doesn't
+    get its rows.
+    """
+
+    def __init__(self, max_size=MAX_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (id, key, variant) -> (weak reference, texts, attrs)
+        self._entries = OrderedDict()
+        # id -> set of the (id, key, variant) keys of its entries
+        self._keys_by_id = {}
+        # texts -> [texts, number of entries using them, size]
+        self._texts = {}
+        self._attrs = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, obj, key, variant):
+        """Returns (texts, attrs) or None"""
+        entry_key = (id(obj), key, variant)
+        try:
+            ref, texts, attrs = self._entries[entry_key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if ref() is not obj:
+            self._remove(entry_key)
+            self.misses += 1
+            return None
+        self._move_to_end(entry_key)
+        self.hits += 1
+        return texts, attrs
+
+    def set(self, obj, key, variant, display_data):
+        """Store the row given as a list of [text, attr] pairs and return
+        it as (texts, attrs)"""
+        entry_key = (id(obj), key, variant)
+        if entry_key in self._entries:
+            self._remove(entry_key)
+        texts = tuple(text for text, _ in display_data)
+        attrs = tuple(attr for _, attr in display_data)
+        attrs = self._attrs.setdefault(attrs, attrs)
+        if len(self._attrs) > MAX_INTERNED_ATTRS:
+            self._attrs.clear()
+
+        try:
+            ref = weakref.ref(obj)
+        except TypeError:
+            return texts, attrs
+        shared = self._texts.get(texts)
+        if shared is None:
+            size = _texts_size(texts)
+            self._texts[texts] = [texts, 1, size]
+            self.size += size
+        else:
+            texts = shared[0]
+            shared[1] += 1
+        self._entries[entry_key] = (ref, texts, attrs)
+        self._keys_by_id.setdefault(entry_key[0], set()).add(entry_key)
+        self.size += ENTRY_OVERHEAD
+        self._evict()
+        return texts, attrs
+
+    def forget(self, obj):
+        """Remove the rows of obj"""
+        for entry_key in list(self._keys_by_id.get(id(obj), ())):
+            self._remove(entry_key)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_id.clear()
+        self._texts.clear()
+        self._attrs.clear()
+        self.size = 0
+
+    def _move_to_end(self, entry_key):
+        try:
+            self._entries.move_to_end(entry_key)
+        except AttributeError:  # Python 2
+            self._entries[entry_key] = self._entries.pop(entry_key)
+
+    def _remove(self, entry_key):
+        _, texts, _ = self._entries.pop(entry_key)
+        keys = self._keys_by_id[entry_key[0]]
+        keys.discard(entry_key)
+        if not keys:
+            del self._keys_by_id[entry_key[0]]
+        self.size -= ENTRY_OVERHEAD
+        shared = self._texts[texts]
+        shared[1] -= 1
+        if shared[1] <= 0:
+            del self._texts[texts]
+            self.size -= shared[2]
+
+    def _evict(self):
+        while self.size > self.max_size and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
@@ -4,6 +4,7 @@
 from __future__ import (absolute_import, division, print_function)
 
 import os
+import select
 import sys
 import time
 import threading
@@ -18,6 +19,7 @@ from ranger.ext.spawn import check_output
 
 from .displayable import DisplayableContainer
 from .mouse_event import MouseEvent
+from .render_cache import RenderCache
 
 
 MOUSEMASK = curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION
@@ -28,6 +30,9 @@ MOUSEMASK = curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION
 # (WM_NAME).
 ESCAPE_ICON_TITLE = '\033]1;'
 
+# How long a frame may be put off while more input is waiting, in seconds
+MAX_FRAME_DELAY = 0.25
+
 _ASCII = ''.join(chr(c) for c in range(32, 127))
 
 
@@ -75,6 +80,9 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.keymaps = KeyMaps(self.keybuffer)
         self.redrawlock = threading.Event()
         self.redrawlock.set()
+        # Held while drawing.  Other threads change what is shown only while
+        # holding it, so a frame never shows half of an update.
+        self.drawlock = threading.RLock()
 
         self.titlebar = None
         self._viewmode = None
@@ -84,10 +92,15 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.pager = None
         self.multiplexer = None
         self._draw_title = None
+        self._title_caps = None
+        self._title_key = None
         self._tmux_automatic_rename = None
         self._multiplexer_title = None
         self.browser = None
+        self.render_cache = RenderCache()
         self.last_image_preview_time = time.time()
+        self._last_frame = 0
+        self._frame_pending = False
 
         if fm is not None:
             self.fm = fm
@@ -132,7 +145,10 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
             self.win.addstr("loading...")
             self.win.refresh()
             self._draw_title = curses.tigetflag('hs')  # has_status_line
+            self._title_caps = self._get_title_caps()
 
+        # Programs that ran in the meantime may have changed the title
+        self._title_key = None
         self.update_size()
         self.is_on = True
 
@@ -238,6 +254,10 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
             self.handle_key(key)
 
     def handle_input(self):  # pylint: disable=too-many-branches
+        if self._frame_pending and not self.load_mode \
+                and not self._input_pending(self._next_frame() - time.time()):
+            # Draw the frame that was put off first
+            return
         key = self.win.getch()
         if key == curses.KEY_ENTER:
             key = ord('\n')
@@ -327,24 +347,58 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         thread.start()
         return thread
 
+    @staticmethod
+    def _input_pending(timeout=0):
+        """Is there input on stdin, or will there be within timeout seconds?"""
+        try:
+            return bool(select.select([sys.stdin], [], [], max(0, timeout))[0])
+        except (OSError, ValueError, select.error):
+            return False
+
+    def _next_frame(self):
+        """The earliest time for the next frame"""
+        if self.settings.max_fps > 0:
+            return self._last_frame + 1.0 / self.settings.max_fps
+        return self._last_frame
+
+    def frame_due(self):
+        """Should the main loop draw a frame now?
+
+        Frames are drawn at most max_fps times per second, and are put off
+        for up to MAX_FRAME_DELAY seconds while there is more input to
+        handle.  A frame that was put off is drawn as soon as handle_input()
+        finds no more input.  With max_fps set to 0, every frame is drawn.
+        """
+        if self.settings.max_fps <= 0:
+            return True
+        now = time.time()
+        if now < self._next_frame() \
+                or (now - self._last_frame < MAX_FRAME_DELAY and self._input_pending()):
+            self._frame_pending = True
+            return False
+        return True
+
     def redraw(self):
         """Redraw all widgets"""
         self.redrawlock.wait()
         self.redrawlock.clear()
-        self.poke()
-
-        # determine which widgets are shown
-        if self.console.wait_for_command_input or self.console.question_queue:
-            self.console.focused = True
-            self.console.visible = True
-            # self.status.visible = False   # edgeEdit
-        else:
-            self.console.focused = False
-            self.console.visible = False
-            # self.status.visible = True    # edgeEdit
+        with self.drawlock:
+            self._frame_pending = False
+            self.poke()
+
+            # determine which widgets are shown
+            if self.console.wait_for_command_input or self.console.question_queue:
+                self.console.focused = True
+                self.console.visible = True
+                # self.status.visible = False   # edgeEdit
+            else:
+                self.console.focused = False
+                self.console.visible = False
+                # self.status.visible = True    # edgeEdit
 
-        self.draw()
-        self.finalize()
+            self.draw()
+            self.finalize()
+            self._last_frame = time.time()
         self.redrawlock.set()
 
     def redraw_window(self):
@@ -354,6 +408,8 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         self.win.refresh()
         self.win.redrawwin()
         self.need_redraw = True
+        if self.browser is not None:
+            self.browser.request_clear()
 
     def update_size(self):
         """resize all widgets"""
@@ -371,41 +427,57 @@ class UI(  # pylint: disable=too-many-instance-attributes,too-many-public-method
         """Draw all objects in the container"""
         self.win.touchwin()
         DisplayableContainer.draw(self)
-        if self._draw_title and self.settings.update_title:
-            cwd = self.fm.thisdir.path
-            if self.settings.tilde_in_titlebar \
-               and (cwd == self.fm.home_path
-                    or cwd.startswith(self.fm.home_path + "/")):
-                cwd = '~' + cwd[len(self.fm.home_path):]
-            if self.settings.shorten_title:
-                split = cwd.rsplit(os.sep, self.settings.shorten_title)
-                if os.sep in split[0]:
-                    cwd = os.sep.join(split[1:])
-            try:
-                fixed_cwd = cwd.encode('utf-8', 'surrogateescape'). \
-                    decode('utf-8', 'replace')
-                titlecap = curses.tigetstr('tsl')
-                escapes = (
-                    [titlecap.decode("latin-1")]
-                    if titlecap is not None
-                    else [] + [ESCAPE_ICON_TITLE]
-                )
-                belcap = curses.tigetstr('fsl')
-                bel = belcap.decode('latin-1') if belcap is not None else ""
-                fmt_tups = [(e, fixed_cwd, bel) for e in escapes]
-            except UnicodeError:
-                pass
-            else:
-                for fmt_tup in fmt_tups:
-                    sys.stdout.write("%sranger:%s%s" % fmt_tup)
-                    sys.stdout.flush()
 
-        self.win.refresh()
+    @staticmethod
+    def _get_title_caps():
+        """Returns the escape sequences that start the title and the one that
+        ends it, which are looked up only once"""
+        titlecap = curses.tigetstr('tsl')
+        escapes = (
+            [titlecap.decode("latin-1")]
+            if titlecap is not None
+            else [] + [ESCAPE_ICON_TITLE]
+        )
+        belcap = curses.tigetstr('fsl')
+        bel = belcap.decode('latin-1') if belcap is not None else ""
+        return escapes, bel
+
+    def update_title(self):
+        """Set the title of the terminal to the current directory, if it
+        changed since it was set last"""
+        if not (self._draw_title and self.settings.update_title) or self.fm.thisdir is None:
+            self._title_key = None
+            return
+        key = (self.fm.thisdir.path, self.settings.tilde_in_titlebar,
+               self.settings.shorten_title)
+        if key == self._title_key:
+            return
+        self._title_key = key
+
+        cwd = self.fm.thisdir.path
+        if self.settings.tilde_in_titlebar \
+           and (cwd == self.fm.home_path
+                or cwd.startswith(self.fm.home_path + "/")):
+            cwd = '~' + cwd[len(self.fm.home_path):]
+        if self.settings.shorten_title:
+            split = cwd.rsplit(os.sep, self.settings.shorten_title)
+            if os.sep in split[0]:
+                cwd = os.sep.join(split[1:])
+        try:
+            fixed_cwd = cwd.encode('utf-8', 'surrogateescape'). \
+                decode('utf-8', 'replace')
+        except UnicodeError:
+            return
+        escapes, bel = self._title_caps
+        sys.stdout.write(''.join("%sranger:%s%s" % (escape, fixed_cwd, bel)
+                                 for escape in escapes))
+        sys.stdout.flush()
 
     def finalize(self):
         """Finalize every object in container and refresh the window"""
         DisplayableContainer.finalize(self)
         self.win.refresh()
+        self.update_title()
 
     # def draw_images(self):
     def image_thread_target(self):
@@ -10,8 +10,9 @@ import stat
 from time import time
 from os.path import splitext
 
-from ranger.ext.widestring import WideString
+from ranger.ext.widestring import uwid, width_slice
 from ranger.core import linemode
+from ranger.gui.context import context_mask
 
 from . import Widget
 from .pager import Pager
@@ -31,6 +32,11 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
 
     old_dir = None
     old_thisfile = None
+    # What each row of the window shows, as a tuple of (text, attr) pairs,
+    # () for empty rows and None for unknown ones.  Only rows that change
+    # are drawn again.
+    _rows = None
+    _rows_scroll_begin = 0
 
     def __init__(self, win, level, tab=None):
         """Initializes a Browser Column Widget
@@ -57,6 +63,72 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
     def request_redraw(self):
         self.need_redraw = True
 
+    def forget_rows(self):
+        """The window was erased, so every row has to be drawn again"""
+        self._rows = None
+        self.need_redraw = True
+
+    def _erase(self):
+        self.win.erase()
+        self._rows = None
+
+    def _scroll_rows(self):
+        """Scroll the window along with the listing, instead of drawing every
+        row again"""
+        amount = self.scroll_begin - self._rows_scroll_begin
+        self._rows_scroll_begin = self.scroll_begin
+        if self._rows is None or amount == 0:
+            return
+        if abs(amount) >= self.hei:
+            self._rows = [None] * self.hei
+            return
+        try:
+            self.win.scrollok(True)
+            self.win.scroll(amount)
+            self.win.scrollok(False)
+        except curses.error:
+            self._rows = None
+            return
+        if amount > 0:
+            self._rows = self._rows[amount:] + [()] * amount
+        else:
+            self._rows = [()] * -amount + self._rows[:amount]
+
+    def _draw_row(self, line, texts, attrs):
+        """Draw a row unless it shows the same already"""
+        row = tuple(zip(texts, attrs))
+        if self._rows[line] == row:
+            return
+        self._rows[line] = row
+        try:
+            self.win.move(line, 0)
+            self.win.clrtoeol()
+        except curses.error:
+            return
+        self.execute_curses_batch(line, row)
+        self.color_reset()
+
+    def _draw_cached_row(self, line, cached, line_number_text):
+        texts, attrs = cached
+        if line_number_text is not None:
+            texts = (line_number_text,) + texts[1:]
+        self._draw_row(line, texts, attrs)
+
+    def _clear_rows(self, start):
+        """Clear the rows from start on which aren't empty"""
+        for line in range(start, self.hei):
+            if self._rows[line] != ():
+                self._rows[line] = ()
+                try:
+                    self.win.move(line, 0)
+                    self.win.clrtoeol()
+                except curses.error:
+                    pass
+
+    def resize(self, y, x, hei=None, wid=None):
+        Pager.resize(self, y, x, hei, wid)
+        self._rows = None
+
     def click(self, event):     # pylint: disable=too-many-branches
         """Handle a MouseEvent"""
         direction = event.mouse_wheel_direction()
@@ -142,6 +214,8 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
         self.level = self.original_level
 
     def poke(self):
+        if self._old_visible != self.visible:
+            self._rows = None
         Widget.poke(self)
         if self.tab is None:
             tab = self.fm.thistab
@@ -157,6 +231,7 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             self.need_redraw = True
             self.old_dir = target
             self.scroll_extra = 0  # reset scroll start
+            self._rows = None
 
         if target:
             target.use()
@@ -176,10 +251,10 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
                 self.need_redraw |= self.last_redraw_time < target.last_load_time
 
         if self.need_redraw:
-            self.win.erase()
             if target is None:
-                pass
+                self._erase()
             elif target.is_file:
+                self._erase()
                 Pager.open(self)
                 self._draw_file()
             elif target.is_directory:
@@ -233,6 +308,7 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             Pager.clear_image(self)
 
         if self.level > 0 and not self.settings.preview_directories:
+            self._erase()
             return
 
         base_color = ['in_browser']
@@ -246,7 +322,10 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
         else:
             active_pane = False
 
-        self.win.move(0, 0)
+        if not self.target.content_loaded or not self.target.accessible \
+                or self.target.empty():
+            self._erase()
+            self.win.move(0, 0)
 
         if not self.target.content_loaded:
             self.color(tuple(base_color))
@@ -270,6 +349,9 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             return
 
         self._set_scroll_begin()
+        self._scroll_rows()
+        if self._rows is None:
+            self._rows = [None] * self.hei
 
         copied = [f.path for f in self.fm.copy_buffer]
 
@@ -295,13 +377,17 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
         else:
             linum_text_len = nr_of_digits(scroll_end + one_indexed_offset)
         linum_format = "{0:>" + str(linum_text_len) + "}"
+        vcs_provisional = self._vcs_provisional()
+        render_cache = self.fm.ui.render_cache
 
+        line = 0
         for line in range(self.hei):
             i = line + self.scroll_begin
 
             try:
                 drawn = self.target.files[i]
             except IndexError:
+                line -= 1
                 break
 
             tagged = self.fm.tags and drawn.realpath in self.fm.tags
@@ -319,27 +405,26 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
                            for tag in current_linemode.required_metadata):
                     current_linemode = drawn.linemode_dict[linemode.DEFAULT_LINEMODE]
 
-            metakey = hash(repr(sorted(metadata.items()))) if metadata else 0
-            key = (self.wid, selected_i == i, drawn.marked, self.main_column,
+            metakey = metadata.version if metadata else 0
+            key = (self.wid, drawn.display_version, drawn.marked, self.main_column,
                    drawn.path in copied, tagged_marker, drawn.infostring,
                    drawn.vcsstatus, drawn.vcsremotestatus, self.target.has_vcschild,
-                   self.fm.do_cut, current_linemode.name, metakey, active_pane,
+                   vcs_provisional,
+                   self.fm.do_cut, current_linemode.name, metakey,
                    self.settings.line_numbers.lower(), linum_text_len)
+            # Only the colors depend on these
+            variant = (selected_i == i, active_pane)
 
-            # Check if current line has not already computed and cached
-            if key in drawn.display_data:
-                # Recompute line numbers because they can't be reliably cached.
-                if (
-                    self.main_column
-                    and self.settings.line_numbers.lower() != 'false'
-                ):
-                    line_number_text = self._format_line_number(linum_format,
-                                                                i,
-                                                                selected_i)
-                    drawn.display_data[key][0][0] = line_number_text
+            # Recompute line numbers because they can't be reliably cached.
+            line_number_text = None
+            if self.main_column and self.settings.line_numbers.lower() != 'false' \
+                    and self.wid - linum_text_len > 2:
+                line_number_text = self._format_line_number(linum_format, i, selected_i)
 
-                self.execute_curses_batch(line, drawn.display_data[key])
-                self.color_reset()
+            # Check if current line has not already computed and cached
+            cached = render_cache.get(drawn, key, variant)
+            if cached is not None:
+                self._draw_cached_row(line, cached, line_number_text)
                 continue
 
             text = current_linemode.filetitle(drawn, metadata)
@@ -418,17 +503,24 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
             this_color = base_color + list(drawn.mimetype_tuple) + \
                 self._draw_directory_color(i, drawn, copied)
             display_data = []
-            drawn.display_data[key] = display_data
 
             drawn, this_color = hook_before_drawing(drawn, this_color)
 
+            # Look the attributes up by the bitmask of the context keys
+            colorscheme = self.settings.colorscheme
+            row_mask = context_mask(this_color)
             predisplay = predisplay_left + predisplay_right
             for txt, color in predisplay:
-                attr = self.settings.colorscheme.get_attr(*(this_color + color))
+                attr = colorscheme.get_attr_by_mask(row_mask | context_mask(color))
                 display_data.append([txt, attr])
 
-            self.execute_curses_batch(line, display_data)
-            self.color_reset()
+            if line_number_text is not None:
+                # Let the rows of all line numbers share their texts
+                display_data[0][0] = ''
+            cached = render_cache.set(drawn, key, variant, display_data)
+            self._draw_cached_row(line, cached, line_number_text)
+
+        self._clear_rows(line + 1)
 
     def _get_index_of_selected_file(self):
         if self.fm.ui.viewmode == 'multipane' and self.tab != self.fm.thistab:
@@ -437,20 +529,20 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
 
     @staticmethod
     def _total_len(predisplay):
-        return sum([len(WideString(s)) for s, _ in predisplay])
+        return sum(uwid(s) for s, _ in predisplay)
 
     def _draw_text_display(self, text, space):
         bidi_text = self.bidi_transpose(text)
-        wtext = WideString(bidi_text)
-        wext = WideString(splitext(bidi_text)[1])
-        wellip = WideString(self.ellipsis[self.settings.unicode_ellipsis])
-        if len(wtext) > space:
-            wtext = wtext[:max(1, space - len(wext) - len(wellip))] + wellip + wext
-        # Truncate again if still too long.
-        if len(wtext) > space:
-            wtext = wtext[:max(0, space - len(wellip))] + wellip
+        if uwid(bidi_text) > space:
+            ext = splitext(bidi_text)[1]
+            ellipsis = self.ellipsis[self.settings.unicode_ellipsis]
+            bidi_text = width_slice(bidi_text, 0, max(1, space - uwid(ext) - uwid(ellipsis))) \
+                + ellipsis + ext
+            # Truncate again if still too long.
+            if uwid(bidi_text) > space:
+                bidi_text = width_slice(bidi_text, 0, max(0, space - uwid(ellipsis))) + ellipsis
 
-        return [[str(wtext), []]]
+        return [[bidi_text, []]]
 
     def _draw_tagged_display(self, tagged, tagged_marker):
         tagged_display = []
@@ -471,18 +563,24 @@ class BrowserColumn(Pager):  # pylint: disable=too-many-instance-attributes
                 infostring_display.append([infostring, ['infostring']])
         return infostring_display
 
+    def _vcs_provisional(self):
+        """Are the VCS statuses of this directory still the cached ones?"""
+        vcs = self.target.vcs
+        return bool(vcs and vcs.track and vcs.rootvcs.provisional)
+
     def _draw_vcsstring_display(self, drawn):
         vcsstring_display = []
         if (self.target.vcs and self.target.vcs.track) \
                 or (drawn.is_directory and drawn.vcs and drawn.vcs.track):
+            provisional = ['vcsprovisional'] if self._vcs_provisional() else []
             if drawn.vcsremotestatus:
                 vcsstr, vcscol = self.vcsremotestatus_symb[drawn.vcsremotestatus]
-                vcsstring_display.append([vcsstr, ['vcsremote'] + vcscol])
+                vcsstring_display.append([vcsstr, ['vcsremote'] + vcscol + provisional])
             elif self.target.has_vcschild:
                 vcsstring_display.append([' ', []])
             if drawn.vcsstatus:
                 vcsstr, vcscol = self.vcsstatus_symb[drawn.vcsstatus]
-                vcsstring_display.append([vcsstr, ['vcsfile'] + vcscol])
+                vcsstring_display.append([vcsstr, ['vcsfile'] + vcscol + provisional])
             elif self.target.has_vcschild:
                 vcsstring_display.append([' ', []])
         elif self.target.has_vcschild:
@@ -7,9 +7,13 @@ from __future__ import (absolute_import, division, print_function)
 
 import curses
 import logging
+import os
+import stat
 
 from ranger.gui import ansi
+from ranger.gui.color import get_color
 from ranger.ext.direction import Direction
+from ranger.ext.mapped_lines import TruncatedError, get_mapped_lines, release_mapped_lines
 from ranger.ext.img_display import ImgDisplayUnsupportedException
 
 from . import Widget
@@ -17,11 +21,17 @@ from . import Widget
 
 LOG = logging.getLogger(__name__)
 
+# How many parsed lines the pager remembers before it starts over
+MAX_PARSED_LINES = 4096
+# Regular files of at least this size are memory-mapped instead of read
+MAP_THRESHOLD = 1 << 20
+
 
 # TODO: Scrolling in embedded pager
 class Pager(Widget):  # pylint: disable=too-many-instance-attributes
     source = None
     source_is_stream = False
+    source_is_mapped = False
 
     old_source = None
     old_scroll_begin = 0
@@ -40,14 +50,25 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
         self.lines = []
         self.image = None
         self.image_drawn = False
+        # Maps (line index, startx, width, wrap) to the parts of the line,
+        # each a tuple of (curses attribute or None, text) runs
+        self._parsed = {}
+        self._parsed_strip = None
 
     def _close_source(self):
-        if self.source and self.source_is_stream:
+        if self.source and (self.source_is_stream or self.source_is_mapped):
             try:
                 self.source.close()
             except OSError as ex:
                 LOG.error('Unable to close pager source')
                 LOG.exception(ex)
+        self._release_mapped()
+
+    def _release_mapped(self):
+        if self.source_is_mapped:
+            release_mapped_lines(self.lines)
+            self.source_is_mapped = False
+            self.lines = []
 
     def open(self):
         self.scroll_begin = 0
@@ -102,11 +123,11 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
 
             if not self.image:
                 scroll_pos = self.scroll_begin + self.scroll_extra
-                line_gen = self._generate_lines(
+                runs_gen = self._generate_runs(
                     starty=scroll_pos, startx=self.startx)
 
-                for line, i in zip(line_gen, range(self.hei)):
-                    self._draw_line(i, line)
+                for runs, i in zip(runs_gen, range(self.hei)):
+                    self._draw_runs(i, runs)
 
             self.need_redraw = False
 
@@ -125,20 +146,37 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
             # else:
             self.image_drawn = True
 
-    def _draw_line(self, i, line):
-        if self.markup is None:
-            self.addstr(i, 0, line)
-        elif self.markup == 'ansi':
-            try:
-                self.win.move(i, 0)
-            except curses.error:
-                pass
-            else:
-                for chunk in ansi.text_with_fg_bg_attr(line):
-                    if isinstance(chunk, tuple):
-                        self.set_fg_bg_attr(*chunk)
-                    else:
-                        self.addstr(chunk)
+    def _draw_runs(self, i, runs):
+        try:
+            self.win.move(i, 0)
+        except curses.error:
+            return
+        for attr, text in runs:
+            if attr is not None:
+                try:
+                    self.win.attrset(attr)
+                except curses.error:
+                    pass
+            if text:
+                self.addstr(text)
+
+    def _parse_line(self, line):
+        """Split a line into (curses attribute or None, text) runs"""
+        if self.markup != 'ansi':
+            return ((None, line),)
+        runs = []
+        attr = None
+        for chunk in ansi.text_with_fg_bg_attr(line):
+            if isinstance(chunk, tuple):
+                fg, bg, chunk_attr = chunk
+                attr = curses.color_pair(get_color(fg, bg)) | chunk_attr
+                continue
+            if chunk or attr is not None:
+                runs.append((attr, chunk))
+            attr = None
+        if attr is not None:
+            runs.append((attr, ''))
+        return tuple(runs)
 
     def move(self, narg=None, **kw):
         direction = Direction(kw)
@@ -181,14 +219,38 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
         self._close_source()
         self.source = None
         self.source_is_stream = False
+        self.source_is_mapped = False
+
+    @staticmethod
+    def _map_source(source):
+        """Returns the MappedLines of a large regular file, or None"""
+        try:
+            fileno = source.fileno()
+            if not stat.S_ISREG(os.fstat(fileno).st_mode) \
+                    or os.fstat(fileno).st_size < MAP_THRESHOLD:
+                return None
+            return get_mapped_lines(os.path.realpath(source.name),
+                                    getattr(source, 'encoding', None) or 'utf-8')
+        except (AttributeError, TypeError, ValueError, IOError, OSError, LookupError):
+            return None
 
     def set_source(self, source, strip=False):
         if self.image:
             self.image = None
             self.need_clear_image = True
+        mapped = self._map_source(source) if hasattr(source, 'readline') else None
+        # Previews set the same source again on every redraw
+        if mapped is not None:
+            keep_parsed = mapped is self.lines
+        else:
+            keep_parsed = source is self.source and not self.source_is_stream
+        if not keep_parsed or strip != self._parsed_strip:
+            self._parsed = {}
+            self._parsed_strip = strip
         self._close_source()
 
         self.max_width = 0
+        self.source_is_mapped = False
         if isinstance(source, str):
             self.source_is_stream = False
             self.lines = source.splitlines()
@@ -199,6 +261,12 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
             self.lines = source
             if self.lines:
                 self.max_width = max(len(line) for line in source)
+        elif mapped is not None:
+            # Only the lines that are drawn are read from the map
+            self.source_is_stream = False
+            self.source_is_mapped = True
+            self.lines = mapped
+            self.max_width = mapped.max_width
         elif hasattr(source, 'readline'):
             self.source_is_stream = True
             self.lines = []
@@ -208,7 +276,7 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
             return False
         self.markup = 'ansi'
 
-        if not self.source_is_stream and strip:
+        if not self.source_is_stream and not self.source_is_mapped and strip:
             self.lines = [line.strip() for line in self.lines]
 
         self.source = source
@@ -221,10 +289,28 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
             self.move(down=direction * n)
         return True
 
+    def _unmap_source(self):
+        """Read the mapped file as a stream from now on"""
+        self._release_mapped()
+        self.source_is_stream = True
+        self.lines = []
+        self._parsed = {}
+        try:
+            self.source.seek(0)
+        except (AttributeError, ValueError, IOError, OSError):
+            pass
+
     def _get_line(self, n, attempt_to_read=True):
         assert isinstance(n, int), n
         try:
-            return self.lines[n]
+            line = self.lines[n]
+            if self.source_is_mapped and len(line) > self.max_width:
+                self.max_width = len(line)
+            return line
+        except TruncatedError:
+            # The file got shorter, reading the map could crash ranger
+            self._unmap_source()
+            return self._get_line(n, attempt_to_read)
         except (KeyError, IndexError):
             if attempt_to_read and self.source_is_stream:
                 try:
@@ -239,25 +325,42 @@ class Pager(Widget):  # pylint: disable=too-many-instance-attributes
                 return self._get_line(n, attempt_to_read=False)
             return ""
 
-    def _generate_lines(self, starty, startx):
+    def _line_parts(self, i, startx):
+        """Returns the parts of line i, which are several if it's wrapped"""
+        line = self._get_line(i).expandtabs(4)
+        parts = []
+        for part in ((0,) if not
+                     self.fm.settings.wrap_plaintext_previews else
+                     range(max(1, ((len(line) - 1) // self.wid) + 1))):
+            shift = part * self.wid
+            if self.markup == 'ansi':
+                line_bit = (ansi.char_slice(line, startx + shift,
+                                            self.wid + shift)
+                            + ansi.reset)
+            else:
+                line_bit = line[startx + shift:self.wid + startx
+                                + shift]
+            parts.append(line_bit.rstrip().replace('\r\n', '\n'))
+        return parts
+
+    def _generate_runs(self, starty, startx):
+        """Yields the parsed runs of the parts of the lines from starty on,
+        which are parsed only once"""
         i = starty
         if not self.source:
             return
+        wrap = self.fm.settings.wrap_plaintext_previews
         while True:
+            key = (i, startx, self.wid, wrap, self.markup)
             try:
-                line = self._get_line(i).expandtabs(4)
-                for part in ((0,) if not
-                             self.fm.settings.wrap_plaintext_previews else
-                             range(max(1, ((len(line) - 1) // self.wid) + 1))):
-                    shift = part * self.wid
-                    if self.markup == 'ansi':
-                        line_bit = (ansi.char_slice(line, startx + shift,
-                                                    self.wid + shift)
-                                    + ansi.reset)
-                    else:
-                        line_bit = line[startx + shift:self.wid + startx
-                                        + shift]
-                    yield line_bit.rstrip().replace('\r\n', '\n')
-            except IndexError:
-                return
+                parsed = self._parsed[key]
+            except KeyError:
+                parsed = [self._parse_line(line_bit) for line_bit in self._line_parts(i, startx)]
+                # Lines past the end may still be read from a stream
+                if i < len(self.lines):
+                    if len(self._parsed) >= MAX_PARSED_LINES:
+                        self._parsed.clear()
+                    self._parsed[key] = parsed
+            for runs in parsed:
+                yield runs
             i += 1
@@ -198,22 +198,23 @@ class StatusBar(Widget):  # pylint: disable=too-many-instance-attributes
         directory = target if target.is_directory else \
             target.fm.get_directory(os.path.dirname(target.path))
         if directory.vcs and directory.vcs.track:
+            provisional = ['vcsprovisional'] if directory.vcs.rootvcs.provisional else []
             if directory.vcs.rootvcs.branch:
                 vcsinfo = '({0:s}: {1:s})'.format(
                     directory.vcs.rootvcs.repotype, directory.vcs.rootvcs.branch)
             else:
                 vcsinfo = '({0:s})'.format(directory.vcs.rootvcs.repotype)
             left.add_space()
-            left.add(vcsinfo, 'vcsinfo')
+            left.add(vcsinfo, 'vcsinfo', *provisional)
 
             left.add_space()
             if directory.vcs.rootvcs.obj.vcsremotestatus:
                 vcsstr, vcscol = self.vcsremotestatus_symb[
                     directory.vcs.rootvcs.obj.vcsremotestatus]
-                left.add(vcsstr.strip(), 'vcsremote', *vcscol)
+                left.add(vcsstr.strip(), 'vcsremote', *(vcscol + provisional))
             if target.vcsstatus:
                 vcsstr, vcscol = self.vcsstatus_symb[target.vcsstatus]
-                left.add(vcsstr.strip(), 'vcsfile', *vcscol)
+                left.add(vcsstr.strip(), 'vcsfile', *(vcscol + provisional))
             if directory.vcs.rootvcs.head:
                 left.add_space()
                 left.add(directory.vcs.rootvcs.head['date'].strftime(self.timeformat), 'vcsdate')
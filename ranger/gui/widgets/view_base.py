@@ -20,7 +20,6 @@ class ViewBase(Widget, DisplayableContainer):  # pylint: disable=too-many-instan
     def __init__(self, win):  # pylint: disable=super-init-not-called
         DisplayableContainer.__init__(self, win)
 
-        self.fm.signal_bind('move', self.request_clear)
         self.old_draw_borders = self.settings.draw_borders
 
         self.columns = None
@@ -30,11 +29,17 @@ class ViewBase(Widget, DisplayableContainer):  # pylint: disable=too-many-instan
     def request_clear(self):
         self.need_clear = True
 
+    def clear(self):
+        """Erase the window, so the columns have to draw every row again"""
+        self.win.erase()
+        self.need_redraw = True
+        self.need_clear = False
+        for column in self.columns or ():
+            column.forget_rows()
+
     def draw(self):
         if self.need_clear:
-            self.win.erase()
-            self.need_redraw = True
-            self.need_clear = False
+            self.clear()
         for tab in self.fm.tabs.values():
             directory = tab.thisdir
             if directory:
@@ -196,4 +201,7 @@ class ViewBase(Widget, DisplayableContainer):  # pylint: disable=too-many-instan
         DisplayableContainer.resize(self, y, x, hei, wid)
 
     def poke(self):
+        if self._old_visible != self.visible:
+            # The window was erased while it was hidden
+            self.need_clear = True
         DisplayableContainer.poke(self)
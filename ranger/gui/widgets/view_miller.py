@@ -89,9 +89,7 @@ class ViewMiller(ViewBase):  # pylint: disable=too-many-ancestors,too-many-insta
 
     def draw(self):
         if self.need_clear:
-            self.win.erase()
-            self.need_redraw = True
-            self.need_clear = False
+            self.clear()
         for tab in self.fm.tabs.values():
             directory = tab.thisdir
             if directory:
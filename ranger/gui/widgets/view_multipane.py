@@ -57,9 +57,7 @@ class ViewMultipane(ViewBase):  # pylint: disable=too-many-ancestors
 
     def draw(self):
         if self.need_clear:
-            self.win.erase()
-            self.need_redraw = True
-            self.need_clear = False
+            self.clear()
 
         ViewBase.draw(self)
 
@@ -0,0 +1,52 @@
+from __future__ import (absolute_import, division, print_function)
+
+import os
+
+from ranger.container.checksums import Checksums
+
+
+def write(path, content=b'data'):
+    with open(path, 'wb') as fobj:
+        fobj.write(content)
+
+
+def test_checksums_are_limited(tmp_path):
+    checksums = Checksums(max_checksums=2)
+    for name in ('a', 'b', 'c'):
+        write(str(tmp_path / name))
+        checksums.add(str(tmp_path / name), name)
+    assert checksums.get(str(tmp_path / 'a')) is None
+    assert checksums.get(str(tmp_path / 'c')) == 'c'
+
+
+def test_dump_prunes_and_only_writes_changes(tmp_path):
+    filename = str(tmp_path / 'checksums')
+    write(str(tmp_path / 'kept'))
+    write(str(tmp_path / 'removed'))
+    checksums = Checksums(filename)
+    checksums.add(str(tmp_path / 'kept'), 'k')
+    checksums.add(str(tmp_path / 'removed'), 'r')
+    os.remove(str(tmp_path / 'removed'))
+    checksums.dump()
+    with open(filename) as fobj:
+        assert [line.split(' ')[0] for line in fobj] == ['k']
+
+    mtime = os.stat(filename).st_mtime
+    os.utime(filename, (mtime - 100, mtime - 100))
+    checksums.add(str(tmp_path / 'kept'), 'k')
+    checksums.dump()
+    assert os.stat(filename).st_mtime == mtime - 100
+
+
+def test_paths_in_any_encoding_are_saved_and_loaded(tmp_path):
+    filename = str(tmp_path / 'checksums')
+    digests = {u'd\xefr': 'utf8', b'latin\xef'.decode('utf-8', 'surrogateescape'): 'latin'}
+    checksums = Checksums(filename)
+    for name, digest in digests.items():
+        write(str(tmp_path / name))
+        checksums.add(str(tmp_path / name), digest)
+    checksums.dump()
+
+    loaded = Checksums(filename)
+    for name, digest in digests.items():
+        assert loaded.get(str(tmp_path / name)) == digest
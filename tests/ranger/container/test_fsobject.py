@@ -0,0 +1,27 @@
+from __future__ import (absolute_import, division, print_function)
+
+from ranger.container.fsobject import FileSystemObject
+from ranger.core.shared import FileManagerAware
+from ranger.ext.openstruct import OpenStruct
+from ranger.gui.render_cache import RenderCache
+
+
+def test_resetting_display_data_forgets_rendered_rows(monkeypatch):
+    render_cache = RenderCache()
+    fm = OpenStruct(ui=OpenStruct(render_cache=render_cache))
+    monkeypatch.setattr(FileManagerAware, 'fm', fm, raising=False)
+    fsobj = FileSystemObject('/tmp/file', path_is_abs=True)
+    other = FileSystemObject('/tmp/other', path_is_abs=True)
+    render_cache.set(fsobj, ('key',), False, [['file', 0]])
+    render_cache.set(other, ('key',), False, [['other', 0]])
+    version = fsobj.display_version
+
+    assert not fsobj.display_data
+    assert fsobj.display_version == version
+    assert render_cache.get(fsobj, ('key',), False) is not None
+
+    fsobj.display_data = {}  # The way old plugins redraw an object
+
+    assert fsobj.display_version > version
+    assert render_cache.get(fsobj, ('key',), False) is None
+    assert render_cache.get(other, ('key',), False) is not None
@@ -0,0 +1,33 @@
+from __future__ import (absolute_import, division, print_function)
+
+import os
+
+from ranger.core import metadata
+from ranger.core.metadata import MetadataManager
+
+
+def test_setting_metadata_only_forgets_entries_of_its_directory(tmp_path):
+    for name in ('a', 'b'):
+        os.mkdir(str(tmp_path / name))
+    manager = MetadataManager()
+    first = str(tmp_path / 'a' / 'first')
+    second = str(tmp_path / 'a' / 'second')
+    other = str(tmp_path / 'b' / 'other')
+    manager.set_metadata(other, {'title': 'Other'})
+    other_entry = manager.get_metadata(other)
+    manager.get_metadata(second)
+
+    manager.set_metadata(first, {'title': 'First'})
+    manager.set_metadata(second, {'title': 'Second'})
+
+    assert manager.get_metadata(first).title == 'First'
+    assert manager.get_metadata(second).title == 'Second'
+    assert manager.get_metadata(other) is other_entry
+
+
+def test_entries_are_limited(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata, 'MAX_ENTRIES', 2)
+    manager = MetadataManager()
+    for name in ('a', 'b', 'c'):
+        manager.get_metadata(str(tmp_path / name))
+    assert list(manager.entries) == [str(tmp_path / 'b'), str(tmp_path / 'c')]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import os
+
+from ranger.ext.copy_journal import CopyJournal
+
+
+def test_journal_is_written_and_reloaded(tmp_path):
+    directory = str(tmp_path / 'journals')
+    src = str(tmp_path / 'src' / 'dïr')
+    dst = str(tmp_path / 'dst' / 'dïr')
+    journal = CopyJournal.create(directory, str(tmp_path / 'dst'), [src], do_cut=True)
+    journal.set_pair(src, dst)
+    journal.mark_done(os.path.join(src, 'file'))
+    journal.mark_complete(src)
+
+    loaded = CopyJournal.load(journal.path)
+    assert loaded.sources == [src]
+    assert loaded.do_cut
+    assert loaded.pairs == {src: dst}
+    assert loaded.done == set([os.path.join(src, 'file')])
+    assert loaded.complete == set([src])
+    assert loaded.pending_sources() == []
+
+    journal.finish()
+    assert not os.path.exists(journal.path)
@@ -0,0 +1,53 @@
+from __future__ import (absolute_import, division, print_function)
+
+import pytest
+
+from ranger.ext import mapped_lines
+from ranger.ext.mapped_lines import (
+    MappedLines, TruncatedError, get_mapped_lines, release_mapped_lines)
+
+
+def write_lines(path, count):
+    with open(path, 'wb') as fobj:
+        fobj.write(b''.join(b'line %d\n' % i for i in range(count)))
+
+
+def test_truncated_file_raises_instead_of_crashing(tmp_path):
+    path = str(tmp_path / 'big')
+    write_lines(path, 400000)
+    lines = MappedLines(path)
+    assert lines.wait(10)
+    assert lines[300000] == 'line 300000'
+    with open(path, 'r+b') as fobj:
+        fobj.truncate(100)
+    with pytest.raises(TruncatedError):
+        lines[300000]  # pylint: disable=pointless-statement
+    assert lines.truncated
+
+
+def test_truncated_file_is_mapped_again(tmp_path):
+    path = str(tmp_path / 'big')
+    write_lines(path, 400000)
+    lines = get_mapped_lines(path)
+    write_lines(path, 10)
+    again = get_mapped_lines(path)
+    assert again is not lines
+    assert again.wait(10)
+    assert len(again) == 10
+
+
+def test_evicted_lines_are_closed_once_released(tmp_path, monkeypatch):
+    monkeypatch.setattr(mapped_lines, 'MAX_MAPPED_FILES', 1)
+    first, second, third = [str(tmp_path / name) for name in ('first', 'second', 'third')]
+    for path in (first, second, third):
+        write_lines(path, 10)
+    unused = get_mapped_lines(first)
+    release_mapped_lines(unused)
+    held = get_mapped_lines(second)  # Evicts first, which nobody uses
+    assert unused._map.closed  # pylint: disable=protected-access
+
+    release_mapped_lines(get_mapped_lines(third))  # Evicts second, still held
+    assert not held._map.closed  # pylint: disable=protected-access
+    assert held[3] == 'line 3'
+    release_mapped_lines(held)
+    assert held._map.closed  # pylint: disable=protected-access
@@ -0,0 +1,48 @@
+from __future__ import (absolute_import, division, print_function)
+
+import os
+
+import pytest
+
+from ranger.ext import shutil_generatorized as shutil_g
+
+
+def truncate_copies_of(name, monkeypatch):
+    """Make copyfile() leave a short copy of the files with the given name"""
+    copyfile = shutil_g.copyfile
+
+    def truncating_copyfile(src, dst, hasher=None):
+        for done in copyfile(src, dst, hasher=hasher):
+            yield done
+        if os.path.basename(src) == name:
+            with open(dst, 'r+b') as fobj:
+                fobj.truncate(10)
+
+    monkeypatch.setattr(shutil_g, 'copyfile', truncating_copyfile)
+
+
+def make_tree(path):
+    os.makedirs(os.path.join(path, 'sub'))
+    for name in ('a', os.path.join('sub', 'b'), os.path.join('sub', 'c')):
+        with open(os.path.join(path, name), 'wb') as fobj:
+            fobj.write(b'x' * 100)
+
+
+def test_movetree_with_truncated_destination(tmp_path, monkeypatch):
+    src, dst = str(tmp_path / 'src'), str(tmp_path / 'dst')
+    make_tree(src)
+    truncate_copies_of('b', monkeypatch)
+
+    with pytest.raises(shutil_g.Error) as info:
+        for _ in shutil_g.movetree(src, dst):
+            pass
+
+    errors = info.value.args[0]
+    assert [error[:2] for error in errors] == [
+        (os.path.join(src, 'sub', 'b'), os.path.join(dst, 'sub', 'b'))]
+    assert 'incomplete' in errors[0][2]
+    # The short copy keeps its source, the other files were moved
+    assert os.path.exists(os.path.join(src, 'sub', 'b'))
+    assert not os.path.exists(os.path.join(src, 'a'))
+    assert not os.path.exists(os.path.join(src, 'sub', 'c'))
+    assert os.path.getsize(os.path.join(dst, 'sub', 'c')) == 100
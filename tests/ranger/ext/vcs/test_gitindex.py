@@ -0,0 +1,49 @@
+from __future__ import (absolute_import, division, print_function)
+
+import os
+import subprocess
+
+import pytest
+
+from ranger.ext.vcs.gitindex import GitIndex
+
+
+def git(repo, *args):
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(['git', '-c', 'user.name=ranger', '-c',
+                               'user.email=ranger@localhost'] + list(args),
+                              cwd=repo, stdout=devnull)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    try:
+        git(str(tmp_path), 'init', '-q')
+    except OSError:
+        pytest.skip('git is not installed')
+    for name in ('a', 'b'):
+        with open(str(tmp_path / name), 'w') as fobj:
+            fobj.write(name)
+    git(str(tmp_path), 'add', 'a', 'b')
+    return str(tmp_path)
+
+
+def test_unchanged_index_is_reused(repo):
+    path = os.path.join(repo, '.git', 'index')
+    index = GitIndex.read(path)
+    assert sorted(index.entries) == ['a', 'b']
+    os.utime(path, (0, 0))
+    again = GitIndex.read(path, previous=index)
+    assert again is index
+    assert again.mtime == 0
+
+
+def test_changed_index_is_parsed_again(repo):
+    path = os.path.join(repo, '.git', 'index')
+    index = GitIndex.read(path)
+    with open(os.path.join(repo, 'a'), 'w') as fobj:
+        fobj.write('changed')
+    git(repo, 'add', 'a')
+    again = GitIndex.read(path, previous=index)
+    assert again is not index
+    assert index.changed_paths(again) == set(['a'])